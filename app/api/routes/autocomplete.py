@@ -0,0 +1,23 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.services.autocomplete import get_autocomplete, AUTOCOMPLETE_KINDS
+
+router = APIRouter()
+
+@router.get("/autocomplete")
+async def autocomplete(
+    kind: str = Query(..., enum=list(AUTOCOMPLETE_KINDS)),
+    q: str = "",
+    district: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+):
+    index = get_autocomplete()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Catalog is not loaded yet.")
+    if district and index.resolve_district(district) is None:
+        raise HTTPException(status_code=404, detail="Unknown district.")
+
+    return {"kind": kind, "q": q, "suggestions": index.suggest(q, kind, district, limit)}
+
+autocomplete_router = router
@@ -1,20 +1,85 @@
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from app.config import CHAT_DEADLINE_SECONDS
 from app.schemas.chat_schema import ChatInput
 from app.services.chatbot_langgraph import flow
+from app.services.model_router import deadline
+from app.services.thread_notices import take_notices
+from app.utils.admission import admission, AdmissionRejected
 from app.utils.chat_memory import create_or_get_thread, store_message
+from app.utils.profiler import current_profile, profile_trigger, RequestProfile, set_current_profile
+from app.utils.thread_serializer import thread_serializer
 
 router = APIRouter()
 
-@router.post("/chat")
-async def chat_endpoint(data: ChatInput):
-    # Ensure thread exists
-    thread_id = create_or_get_thread(data.user_id, data.thread_id)
-    state = {"user_message": data.message, "thread_id": thread_id}
-    out = flow.invoke(state)
 
-    # Save chat to MongoDB
-    store_message(thread_id, data.message, out["result"])
+def _run_turn(state, config, profile=None):
+    # Model routing budgets every LLM call against what's left of the turn
+    with deadline(CHAT_DEADLINE_SECONDS):
+        if profile is None:
+            return flow.invoke(state, config, durability="exit")
+        set_current_profile(profile)
+        try:
+            with profile.section("graph"):
+                return flow.invoke(state, config, durability="exit")
+        finally:
+            set_current_profile(None)
+
+
+async def _turn(thread_id: str, message: str):
+    state = {"user_message": message, "thread_id": thread_id}
+    # The checkpointer restores the rest of ChatState for this thread;
+    # it's written once, when the turn finishes
+    config = {"configurable": {"thread_id": thread_id}}
+    out = await run_in_threadpool(_run_turn, state, config, current_profile())
+
+    # Operator changes to this thread's bookings (cancelled/moved trips) lead the reply
+    notices = await run_in_threadpool(take_notices, thread_id)
+    response = "\n\n".join(notices + [out["result"]]) if notices else out["result"]
+
+    # Save chat transcript to MongoDB
+    store_message(thread_id, message, response)
+    return {"thread_id": thread_id, "response": response}
+
+
+async def _admitted_turn(user_id: str, thread_id: str, message: str):
+    # Entered once this thread's turn is up, so a turn queued behind its own
+    # thread never holds one of the global in-flight slots while it waits
+    async with admission.admit(user_id, rate_checked=True):
+        return await _turn(thread_id, message)
+
+
+@router.post("/chat")
+async def chat_endpoint(data: ChatInput, response: Response, x_profile: Optional[str] = Header(None)):
+    # Opt-in profiling: per-node wall/CPU time and stack samples of this
+    # turn, kept for /admin/profiles
+    trigger = profile_trigger(x_profile)
+    profile = RequestProfile(trigger, data.thread_id) if trigger else None
+    set_current_profile(profile)
+    try:
+        admission.check_rate(data.user_id)
+        # Ensure thread exists
+        thread_id = create_or_get_thread(data.user_id, data.thread_id)
+        if profile is not None:
+            profile.thread_id = thread_id
+        # One turn per thread at a time (across workers); a double send
+        # of the same message gets the running turn's reply
+        reply = await thread_serializer.run(
+            thread_id, data.message, _admitted_turn, data.user_id, thread_id, data.message
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many requests ({e.reason}). Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    finally:
+        if profile is not None:
+            profile.finish()
+            response.headers["X-Profile-Id"] = profile.id
 
-    return {"thread_id": thread_id, "response": out["result"]}
+    return reply
 
-chat_router = router
\ No newline at end of file
+chat_router = router
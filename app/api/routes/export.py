@@ -0,0 +1,40 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.services.booking_export import EXPORT_FORMATS, encode, export_rows
+from app.utils.admin_auth import require_admin
+
+router = APIRouter()
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+# Passenger names and phones: operators only
+@router.get("/bookings/export", dependencies=[Depends(require_admin)])
+def export_bookings(
+    provider: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[str] = None,
+    format: str = Query("ndjson", enum=list(EXPORT_FORMATS)),
+    batch_size: int = Query(1000, ge=100, le=10000),
+):
+    rows = export_rows(
+        provider,
+        date_from.isoformat() if date_from else None,
+        date_to.isoformat() if date_to else None,
+        status,
+        batch_size=batch_size,
+    )
+    # Starlette iterates the (sync) generator in a worker thread, chunk by chunk
+    filename = f"bookings-{provider or 'all'}-{date_from or 'start'}-{date_to or 'end'}.{format}".replace(" ", "_")
+    return StreamingResponse(
+        encode(rows, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+export_router = router
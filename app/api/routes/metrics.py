@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from app.utils import metrics
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    return metrics.snapshot()
+
+metrics_router = router
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.schemas.operator_schema import TripCancel, TripReschedule
+from app.services.booking_export import resolve_provider
+from app.services.gazetteer import get_gazetteer
+from app.services.trip_operations import cancel_trip, reschedule_trip
+from app.utils.admin_auth import require_admin
+
+# Bulk changes to other people's bookings: operators only
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+def _trip(body) -> dict:
+    gazetteer = get_gazetteer()
+    trip = {"provider": resolve_provider(body.provider)}
+    for field in ("district_from", "district_to"):
+        value = getattr(body, field)
+        match = gazetteer.canonical(value, kind="district") if gazetteer else None
+        if gazetteer and not match:
+            raise HTTPException(status_code=404, detail=f"Unknown district: {value}")
+        trip[field] = match["name"] if match else value
+    return trip
+
+
+@router.post("/operator/trips/cancel")
+async def cancel_trip_endpoint(body: TripCancel):
+    """Cancel every confirmed booking on a provider/route/date (or one departure)."""
+    return await run_in_threadpool(
+        cancel_trip, **_trip(body), date=body.date, reason=body.reason, departure=body.departure
+    )
+
+
+@router.post("/operator/trips/reschedule")
+async def reschedule_trip_endpoint(body: TripReschedule):
+    """Move every confirmed booking on a provider/route/date to another date/departure."""
+    if (body.new_date, body.new_departure) == (body.date, body.departure):
+        raise HTTPException(status_code=400, detail="The new date/departure is the same as the old one")
+    return await run_in_threadpool(
+        reschedule_trip,
+        **_trip(body),
+        date=body.date,
+        new_date=body.new_date,
+        reason=body.reason,
+        departure=body.departure,
+        new_departure=body.new_departure,
+    )
+
+operator_router = router
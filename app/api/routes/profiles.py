@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
+
+from app.utils.admin_auth import require_admin
+from app.utils.profiler import profile_store
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/admin/profiles")
+async def list_profiles():
+    """Summaries (wall/CPU per node) of the profiled /chat turns still in the buffer, newest first."""
+    return [p.summary() for p in profile_store.list()]
+
+
+@router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """One profile as a speedscope file (open it at https://www.speedscope.app)."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No such profile (it may have left the buffer)")
+    return JSONResponse(
+        profile.to_speedscope(),
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'},
+    )
+
+profiles_router = router
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.services.route_planner import get_route_planner, OPTIMIZE_FOR
+
+router = APIRouter()
+
+@router.get("/routes")
+async def plan_routes(
+    from_district: str,
+    to_district: str,
+    optimize: str = Query("fare", enum=list(OPTIMIZE_FOR)),
+    k: int = Query(3, ge=1, le=3),
+):
+    planner = get_route_planner()
+    if planner is None:
+        raise HTTPException(status_code=503, detail="Route catalog is not loaded yet.")
+
+    origin, destination = planner.resolve(from_district), planner.resolve(to_district)
+    if not origin or not destination:
+        raise HTTPException(status_code=404, detail="Unknown district.")
+
+    return {
+        "from_district": origin,
+        "to_district": destination,
+        "optimize": optimize,
+        "itineraries": planner.itineraries(origin, destination, optimize, k),
+    }
+
+route_planner_router = router
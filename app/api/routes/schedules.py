@@ -0,0 +1,62 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.schemas.schedule_schema import Schedule
+from app.services.catalog import canonical_provider
+from app.services.gazetteer import get_gazetteer
+from app.services.schedules import search_departures, upsert_schedules
+from app.utils.admin_auth import require_admin
+
+router = APIRouter()
+
+
+def _district(name: str) -> str:
+    gazetteer = get_gazetteer()
+    match = gazetteer.canonical(name, kind="district") if gazetteer else None
+    if gazetteer and not match:
+        raise HTTPException(status_code=404, detail=f"Unknown district: {name}")
+    return match["name"] if match else name
+
+
+def _provider(name: str) -> str:
+    # Seat reservations match the provider exactly, so store the catalog's spelling
+    provider = canonical_provider(name)
+    if not provider:
+        raise HTTPException(status_code=404, detail=f"Unknown bus provider: {name}")
+    return provider
+
+
+# Timetable and capacity writes: operators only; search stays public
+@router.post("/schedules", dependencies=[Depends(require_admin)])
+def load_schedules(schedules: List[Schedule]):
+    """Bulk load / update departures (keyed by provider, route, date, time, coach type)."""
+    items = []
+    for s in schedules:
+        item = s.model_dump()
+        item["from_district"] = _district(s.from_district)
+        item["to_district"] = _district(s.to_district)
+        item["provider"] = _provider(s.provider)
+        items.append(item)
+    return upsert_schedules(items)
+
+
+@router.get("/schedules/search")
+def search_schedules(
+    from_district: str,
+    to_district: str,
+    date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    after: Optional[str] = Query(None, pattern=r"^\d{2}:\d{2}$"),
+    before: Optional[str] = Query(None, pattern=r"^\d{2}:\d{2}$"),
+    coach_type: Optional[str] = None,
+    provider: Optional[str] = None,
+    seats: int = Query(1, ge=1, le=40),
+    limit: int = Query(5, ge=1, le=50),
+):
+    departures = search_departures(
+        _district(from_district), _district(to_district), date, after, before,
+        coach_type, canonical_provider(provider) or provider, seats, limit,
+    )
+    return {"departures": departures}
+
+schedules_router = router
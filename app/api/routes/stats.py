@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.services.booking_export import resolve_provider
+from app.services.booking_rollups import GROUP_BY, read_stats
+from app.utils.admin_auth import require_admin
+from app.utils.clock import local_today
+
+router = APIRouter()
+
+MAX_DAYS = 366
+
+
+# Per-provider revenue: operators only
+@router.get("/stats", dependencies=[Depends(require_admin)])
+def booking_stats(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    provider: Optional[str] = None,
+    district_from: Optional[str] = None,
+    district_to: Optional[str] = None,
+    group_by: str = Query("day", enum=list(GROUP_BY)),
+):
+    """Seats sold, revenue and cancellations per travel day (default: last 30 days)."""
+    date_to = date_to or date.fromisoformat(local_today())
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+    if (date_to - date_from).days >= MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DAYS} days per request")
+    return read_stats(
+        date_from.isoformat(),
+        date_to.isoformat(),
+        resolve_provider(provider),
+        district_from,
+        district_to,
+        group_by,
+    )
+
+stats_router = router
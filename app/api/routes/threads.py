@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from app.utils.chat_memory import get_messages, get_turn_count
+
+router = APIRouter()
+
+
+def _etag(thread_id: str, total: int, after: int, limit: int) -> str:
+    return f'W/"{thread_id}:{total}:{after}:{limit}"'
+
+
+@router.get("/threads/{thread_id}/messages")
+async def thread_messages(
+    thread_id: str,
+    request: Request,
+    response: Response,
+    after: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+):
+    # The transcript is append-only, so the turn count pins down this page;
+    # check it before slicing so an unchanged poll skips the aggregation
+    if request.headers.get("if-none-match"):
+        total = await run_in_threadpool(get_turn_count, thread_id)
+        if total is None:
+            raise HTTPException(status_code=404, detail="Unknown thread.")
+        etag = _etag(thread_id, total, after, limit)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+    found = await run_in_threadpool(get_messages, thread_id, after, limit)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Unknown thread.")
+    total, messages = found
+    response.headers["ETag"] = _etag(thread_id, total, after, limit)
+
+    return {
+        "thread_id": thread_id,
+        "messages": messages,
+        "total": total,
+        "next_after": messages[-1]["seq"] if messages else after,
+        "has_more": after + len(messages) < total,
+    }
+
+threads_router = router
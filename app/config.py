@@ -9,16 +9,114 @@ load_dotenv()
 API_KEY = os.getenv("OPENAI_API_KEY")
 client = OpenAI(api_key=API_KEY)
 
+# Embeddings: concurrent calls are micro-batched into one request
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+# How long a caller waits for its vector before giving up
+EMBED_TIMEOUT_SECONDS = float(os.getenv("EMBED_TIMEOUT_SECONDS", "30"))
+
+# Per-task model registry and routing (see config/config.yaml)
+MODEL_CONFIG_PATH = os.getenv("MODEL_CONFIG_PATH", "config/config.yaml")
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", "25"))
+
+# Local time for travel dates and departures (Asia/Dhaka, no DST)
+LOCAL_UTC_OFFSET_HOURS = float(os.getenv("LOCAL_UTC_OFFSET_HOURS", "6"))
+
 # MongoDB
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 mongo = MongoClient(MONGO_URI)
-db = mongo["BussTicketBD"]
+# Overridable so offline evaluation (app/eval) runs against its own database
+MONGO_DB = os.getenv("MONGO_DB", "BussTicketBD")
+db = mongo[MONGO_DB]
 
 bus_collection = db["busses"]
 chat_collection = db["chat_memory"]
+# chat writes the server kept rejecting, parked after CHAT_WRITE_MAX_ATTEMPTS
+chat_dead_letters_collection = db["chat_write_dead_letters"]
+# LangGraph checkpoints of ChatState, one document per thread
+checkpoint_collection = db["chat_checkpoints"]
+
+# Bookings: upcoming trips stay hot, past trips move to the archive
+bookings_collection = db["bookings"]
+bookings_archive_collection = db["bookings_archive"]
+BOOKING_ARCHIVE_INTERVAL = float(os.getenv("BOOKING_ARCHIVE_INTERVAL", "3600"))
+
+# Per-provider/route/day booking counters for dashboards
+booking_rollups_collection = db["booking_rollups"]
+ROLLUP_REBUILD_WORKERS = int(os.getenv("ROLLUP_REBUILD_WORKERS", "4"))
+# a rebuild holds a lease (in thread_leases) so only one worker runs it at a time
+ROLLUP_REBUILD_LEASE_TTL = float(os.getenv("ROLLUP_REBUILD_LEASE_TTL", "300"))
+
+# Payment reconciliation: PAYMENT_GATEWAY is "fake" (in-memory) or
+# "module:Class" of a PaymentGateway; empty leaves the worker off
+PAYMENT_GATEWAY = os.getenv("PAYMENT_GATEWAY", "")
+PAYMENT_RECONCILE_INTERVAL = float(os.getenv("PAYMENT_RECONCILE_INTERVAL", "60"))
+PAYMENT_RECONCILE_BATCH = int(os.getenv("PAYMENT_RECONCILE_BATCH", "500"))
+
+# Departures with capacity and seats booked
+schedules_collection = db["schedules"]
+
+# Operator trip cancel/reschedule: bookings per bulk_write, and the notices
+# affected threads see on their next turn
+TRIP_OP_CHUNK = int(os.getenv("TRIP_OP_CHUNK", "1000"))
+thread_notices_collection = db["thread_notices"]
+
+# Provider facts (address, numbers, policy link) extracted from data/*.txt
+provider_facts_collection = db["provider_facts"]
+
+# Normalized catalog (ingested from data.json)
+districts_collection = db["districts"]
+dropping_points_collection = db["dropping_points"]
+providers_collection = db["providers"]
+catalog_meta_collection = db["catalog_meta"]
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "30"))
+
+# Admission control for /chat
+USER_RATE_PER_SEC = float(os.getenv("USER_RATE_PER_SEC", "0.5"))
+USER_RATE_BURST = int(os.getenv("USER_RATE_BURST", "5"))
+USER_CONCURRENCY_LIMIT = int(os.getenv("USER_CONCURRENCY_LIMIT", "2"))
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+
+# Per-thread turn ordering: identical in-flight messages share one turn, and a
+# lease document per thread keeps workers from running its turns concurrently
+thread_leases_collection = db["thread_leases"]
+THREAD_DEDUP = os.getenv("THREAD_DEDUP", "1") == "1"
+THREAD_LEASE_TTL = float(os.getenv("THREAD_LEASE_TTL", str(CHAT_DEADLINE_SECONDS + 15)))
+THREAD_LEASE_WAIT = float(os.getenv("THREAD_LEASE_WAIT", "60"))
+
+# Operator/admin endpoints require `X-Admin-Token: <ADMIN_TOKEN>`; unset, they are closed
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Opt-in profiling of /chat turns: sent with `X-Profile: <ADMIN_TOKEN>` or
+# picked at PROFILE_SAMPLE_RATE; the last PROFILE_BUFFER_SIZE profiles are
+# served at /admin/profiles
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+
+# Write-behind of chat documents
+CHAT_WRITE_FLUSH_INTERVAL = float(os.getenv("CHAT_WRITE_FLUSH_INTERVAL", "0.05"))
+CHAT_WRITE_MAX_PENDING = int(os.getenv("CHAT_WRITE_MAX_PENDING", "500"))
+CHAT_WRITE_MAX_ATTEMPTS = int(os.getenv("CHAT_WRITE_MAX_ATTEMPTS", "3"))
 
 __all__ = [
     "client",
     "bus_collection",
     "chat_collection",
+    "chat_dead_letters_collection",
+    "checkpoint_collection",
+    "bookings_collection",
+    "bookings_archive_collection",
+    "booking_rollups_collection",
+    "schedules_collection",
+    "thread_leases_collection",
+    "thread_notices_collection",
+    "provider_facts_collection",
+    "districts_collection",
+    "dropping_points_collection",
+    "providers_collection",
+    "catalog_meta_collection",
 ]
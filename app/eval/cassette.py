@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+from app.utils.clock import local_today
+
+CASSETTE_MODES = ("replay", "record", "auto")
+# Top-level key of the cassette file holding {"upstream": ...}; entry keys are "<kind>:<sha256>"
+META_KEY = "_meta"
+
+# Parts of a prompt that change from run to run without changing its
+# meaning; masked in the request key so a recording replays on any day
+_UUID_RE = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b")
+_TIMESTAMP_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?\b")
+# Per-call settings that don't change the answer
+_IGNORED_KWARGS = {"timeout"}
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def _namespace(value: Any) -> Any:
+    """JSON -> objects with attribute access, like the SDK's response models."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+def _plain(response: Any) -> Any:
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json")
+    if hasattr(response, "to_dict"):  # Pinecone responses
+        return json.loads(json.dumps(response.to_dict(), default=str))
+    if isinstance(response, dict):
+        return response
+    return json.loads(json.dumps(response, default=lambda o: getattr(o, "__dict__", str(o))))
+
+
+class Cassette:
+    """
+    Records model/embedding/vector-index responses to a JSON file keyed by a
+    hash of the (normalized) request, and replays them offline.
+
+    Modes: "replay" only reads (a request not on the cassette raises
+    CassetteMiss), "record" always calls upstream and overwrites, "auto"
+    replays what is there and records the rest.
+
+    `upstream` names what record/auto call; once anything is recorded from
+    the scripted "fake" upstream, the file says so under META_KEY and
+    `scripted` is True for good.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", upstream: str = "real"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.upstream = upstream
+        self.meta: Dict[str, Any] = {}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+            self.meta = self.entries.pop(META_KEY, {})
+
+    @property
+    def scripted(self) -> bool:
+        return self.meta.get("upstream") == "fake"
+
+    def key(self, kind: str, request: Dict[str, Any]) -> str:
+        body = json.dumps(
+            {k: v for k, v in request.items() if k not in _IGNORED_KWARGS},
+            sort_keys=True, ensure_ascii=False, default=str,
+        )
+        body = _UUID_RE.sub("<uuid>", body)
+        body = _TIMESTAMP_RE.sub("<timestamp>", body)
+        body = body.replace(local_today(), "<today>")
+        return f"{kind}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+    def call(self, kind: str, upstream: Optional[Callable], request: Dict[str, Any]) -> Dict[str, Any]:
+        """The entry {"response", "latency_ms", "replayed"} for this request."""
+        key = self.key(kind, request)
+        if self.mode != "record" and key in self.entries:
+            self.hits += 1
+            return dict(self.entries[key], replayed=True)
+        if self.mode == "replay" or upstream is None:
+            self.misses += 1
+            raise CassetteMiss(f"No recorded {kind} response for this request ({key}); re-run with --mode auto")
+
+        start = time.perf_counter()
+        response = upstream(**request)
+        entry = {"response": _plain(response), "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+        with self._lock:
+            self.entries[key] = entry
+            if self.upstream == "fake":
+                self.meta["upstream"] = "fake"
+            self.dirty = True
+        return dict(entry, replayed=False)
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            body = dict(self.entries, **{META_KEY: self.meta}) if self.meta else self.entries
+            json.dump(body, f, ensure_ascii=False, indent=1, sort_keys=True)
+        self.dirty = False
+
+
+class CallLog:
+    """Model calls made during the current turn (calls, tokens, recorded latency)."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = []
+
+    def add(self, kind: str, model: Optional[str], entry: Dict[str, Any]):
+        usage = (entry["response"] or {}).get("usage") or {}
+        self.calls.append({
+            "kind": kind,
+            "model": model,
+            "prompt_tokens": usage.get("prompt_tokens", 0) or 0,
+            "completion_tokens": usage.get("completion_tokens", 0) or 0,
+            "latency_ms": entry.get("latency_ms", 0.0),
+            "replayed": entry.get("replayed", False),
+        })
+
+
+# ---------- Wrappers with the SDK's call shapes ---------- #
+class _Completions:
+    def __init__(self, cassette: Cassette, log: CallLog, upstream):
+        self._cassette, self._log, self._upstream = cassette, log, upstream
+
+    def create(self, **kwargs):
+        entry = self._cassette.call("chat", self._upstream.chat.completions.create if self._upstream else None, kwargs)
+        self._log.add("chat", kwargs.get("model"), entry)
+        return _namespace(entry["response"])
+
+
+class CassetteClient:
+    """Stands in for an OpenAI client on the `chat.completions.create` path."""
+
+    def __init__(self, cassette: Cassette, log: CallLog, upstream=None):
+        self.chat = SimpleNamespace(completions=_Completions(cassette, log, upstream))
+
+
+def cassette_embeddings(cassette: Cassette, log: CallLog, upstream: Optional[Callable]) -> Callable:
+    """Wraps an `embeddings.create(model=..., input=[...])` callable."""
+    def create(**kwargs):
+        entry = cassette.call("embeddings", upstream, kwargs)
+        log.add("embeddings", kwargs.get("model"), entry)
+        return _namespace(entry["response"])
+    return create
+
+
+class CassetteIndex:
+    """Wraps a vector index's `query(...)`; vectors are hashed into the key like any other argument."""
+
+    def __init__(self, cassette: Cassette, upstream=None):
+        self._cassette = cassette
+        self._upstream = upstream
+
+    def query(self, **kwargs):
+        entry = self._cassette.call("vector", self._upstream.query if self._upstream else None, kwargs)
+        # Retrieval code reads matches with item access
+        return entry["response"]
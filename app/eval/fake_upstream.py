@@ -0,0 +1,280 @@
+"""
+A scripted stand-in for the OpenAI and Pinecone calls the chat graph makes,
+so the evaluation cassette can be (re)recorded offline:
+
+    MONGO_DB=BussTicketBD_eval python -m app.eval.run --mode record --upstream fake \\
+        --config config/config.yaml --config config/eval/nano.yaml
+
+Chat answers come from keyword rules over the prompt each node sends
+(intent names, JSON slots, a phone number, a reply built from the
+retrieved context), embeddings are token hashes and the index ranks the
+local provider chunks by them. Replies are plausible, not smart: a
+recording made against it checks the harness, the routing and the
+non-LLM code paths, not model quality. Record against the real APIs
+(`--mode record` with the keys set) to compare models.
+"""
+import hashlib
+import json
+import math
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+EMBED_DIM = 64
+
+_PHONE_RE = re.compile(r"(?:\+?88)?01\d{9}")
+_DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+_SEATS_RE = re.compile(r"\b(\d+)\s+seats?\b", re.IGNORECASE)
+_NAME_RE = re.compile(r"\bmy name is ([A-Za-z][A-Za-z .]*?)(?:\s+and\b|[,.]|$)", re.IGNORECASE)
+_BOOKING_ID_RE = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b")
+
+# Latest-message keywords per intent, checked in this order
+_INTENT_RULES = [
+    ("cancel_ticket", re.compile(r"\bcancel\b", re.IGNORECASE)),
+    ("view_ticket", re.compile(r"\b(show|view|see|check)\b.*\btickets?\b|\bmy tickets?\b", re.IGNORECASE)),
+    ("book_ticket", re.compile(r"\bbook\b", re.IGNORECASE)),
+    ("provider_info", re.compile(
+        r"\b(hotline|contact|address|office|policy|privacy|personal data|refund|luggage|company)\b", re.IGNORECASE
+    )),
+    ("ask_for_info", re.compile(r"\b(bus|buses|route|fares?|from|to|seats?|timing|schedule)\b", re.IGNORECASE)),
+]
+# What the bot's last reply was asking for, when the message itself says little
+_FOLLOW_UPS = [
+    ("cancel_ticket", re.compile(r"cancel", re.IGNORECASE)),
+    ("view_ticket", re.compile(r"retrieve your tickets|tickets for", re.IGNORECASE)),
+    ("book_ticket", re.compile(r"book", re.IGNORECASE)),
+]
+
+
+def _section(prompt: str, title: str) -> str:
+    """Text of a `TITLE:` block of a node prompt, up to the next blank line."""
+    match = re.search(rf"^{re.escape(title)}:?\s*\n(.*?)(?:\n\s*\n|\Z)", prompt, re.MULTILINE | re.DOTALL)
+    return match.group(1).strip() if match else ""
+
+
+def _usage(messages: List[Dict[str, Any]], content: str) -> Dict[str, int]:
+    # Roughly four characters per token, like English text in the real tokenizer
+    prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _detect_intent(prompt: str) -> str:
+    message = _section(prompt, "LATEST USER MESSAGE")
+    for intent, pattern in _INTENT_RULES:
+        if pattern.search(message):
+            return intent
+    if _PHONE_RE.search(message):
+        # History is the repr of the turn dicts: {'user': ..., 'bot': ...}
+        last_bot = re.findall(r"""'bot': (['"])(.*?)(?<!\\)\1""", _section(prompt, "CHAT_HISTORY"))
+        for intent, pattern in _FOLLOW_UPS:
+            if last_bot and pattern.search(last_bot[-1][1]):
+                return intent
+    return "general_chat"
+
+
+def _general_chat(prompt: str) -> str:
+    message = (re.search(r"^User said: (.*)$", prompt, re.MULTILINE) or [None, ""])[1]
+    if re.search(r"\b(thanks|thank you)\b", message, re.IGNORECASE):
+        return "You're welcome! Have a safe journey."
+    return "Hello! I can help you find buses, book tickets, and view or cancel your bookings."
+
+
+def _districts_in(text: str, names: List[str]) -> List[str]:
+    found = [(m.start(), name) for name in names for m in [re.search(rf"\b{re.escape(name)}\b", text, re.IGNORECASE)] if m]
+    return [name for _, name in sorted(found)]
+
+
+def _route_fields(prompt: str) -> str:
+    names_match = re.search(r"Only use district names from this list: (\[.*?\])\.", prompt)
+    names = json.loads(names_match.group(1).replace("'", '"')) if names_match else []
+    message = _section(prompt, "LATEST USER MESSAGE")
+    from_district = _districts_in(" ".join(re.findall(r"\bfrom\s+(\w+)", message, re.IGNORECASE)), names)
+    to_district = _districts_in(" ".join(re.findall(r"\bto\s+(\w+)", message, re.IGNORECASE)), names)
+    result = {
+        "from_district": from_district[0] if from_district else None,
+        "to_district": to_district[0] if to_district else None,
+    }
+    result["missing_fields"] = [k for k, v in result.items() if v is None]
+    return json.dumps(result)
+
+
+def _book_ticket(prompt: str) -> str:
+    current = _section(prompt, "CURRENT BOOKING DATA (if any)")
+    data = json.loads(current) if current.startswith("{") else {}
+    message = _section(prompt, "USER'S CURRENT MESSAGE")
+    from_words = {w.lower() for w in re.findall(r"\bfrom\s+(\w+)", message, re.IGNORECASE)}
+    to_words = {w.lower() for w in re.findall(r"\bto\s+(\w+)", message, re.IGNORECASE)}
+
+    for line in _section(prompt, "LOCATIONS RECOGNISED IN THE MESSAGE (already matched to our catalog)").splitlines():
+        district = re.match(r'- "(.+)" = district (.+)$', line)
+        point = re.match(r'- "(.+)" = dropping point (.+) in (.+) \(৳(.*)\)$', line)
+        if district:
+            # The gazetteer reports its normalized spelling of what was said
+            said, name = district.groups()
+            if from_words & {said.lower(), name.lower()}:
+                data["district_from"] = name
+            elif to_words & {said.lower(), name.lower()}:
+                data["district_to"] = name
+        elif point:
+            _, name, district_name, price = point.groups()
+            field = "pickup_point" if district_name == data.get("district_from") else "dropping_point"
+            data[field] = name
+            if field == "dropping_point" and price.replace(".", "", 1).isdigit():
+                data["fare"] = float(price)
+
+    name = _NAME_RE.search(message)
+    phone = _PHONE_RE.search(message)
+    date = _DATE_RE.search(message)
+    seats = _SEATS_RE.search(message)
+    if name:
+        data["name"] = name.group(1).strip()
+    if phone:
+        data["phone"] = phone.group(0)
+    if date:
+        data["date"] = date.group(0)
+    if seats:
+        data["seats"] = int(seats.group(1))
+
+    questions = {
+        "district_from": "Which district are you travelling from?",
+        "district_to": "Where would you like to go?",
+        "dropping_point": "Where should we drop you?",
+        "date": "Which date do you want to travel (YYYY-MM-DD)?",
+        "seats": "How many seats do you need?",
+        "name": "May I have the passenger's full name?",
+        "phone": "What phone number should we use for the booking?",
+        "pickup_point": "Where would you like to be picked up?",
+        "bus_provider": "Which bus operator would you prefer?",
+    }
+    missing = [field for field in questions if not data.get(field)]
+    return json.dumps({
+        "action": "ask_info" if missing else "confirm_booking",
+        "updated_booking_data": data,
+        "response_to_user": questions[missing[0]] if missing else "Shall I confirm this booking?",
+    }, ensure_ascii=False)
+
+
+def _view_ticket(prompt: str) -> str:
+    phone = _PHONE_RE.search(_section(prompt, "CURRENT USER MESSAGE"))
+    stored = _section(prompt, "STORED PHONE (if any)")
+    if phone:
+        return phone.group(0)
+    return stored if _PHONE_RE.fullmatch(stored) else "NOT_FOUND"
+
+
+def _cancel_ticket(prompt: str) -> str:
+    message = _section(prompt, "CURRENT USER MESSAGE")
+    phone = _PHONE_RE.search(message)
+    booking_id = _BOOKING_ID_RE.search(message)
+    date = _DATE_RE.search(message)
+    return json.dumps({
+        "phone": phone.group(0) if phone else None,
+        "booking_id": booking_id.group(0) if booking_id else None,
+        "date": date.group(0) if date else None,
+    })
+
+
+def _provider_info(prompt: str) -> str:
+    context = _section(prompt, "Context")
+    first = re.sub(r"^\[[^\]]*\]\s*", "", context.split("\n")[0]) if context else ""
+    return first or "I don't have that information for this provider."
+
+
+def answer(messages: List[Dict[str, Any]]) -> str:
+    """The scripted reply to one chat request, picked by the node prompt it carries."""
+    prompt = str(messages[-1].get("content") or "")
+    if "INTENT RULES" in prompt:
+        return _detect_intent(prompt)
+    if "Only use district names from this list" in prompt:
+        return _route_fields(prompt)
+    if "You are a bus route search assistant" in prompt:
+        return "Please tell me the departure and destination districts so I can check the buses."
+    if "BOOKING FIELDS NEEDED" in prompt:
+        return _book_ticket(prompt)
+    if "You are a ticket viewing assistant" in prompt:
+        return _view_ticket(prompt)
+    if "You are a ticket cancellation assistant" in prompt:
+        return _cancel_ticket(prompt)
+    if "Use the following context to answer the user query" in prompt:
+        return _provider_info(prompt)
+    return _general_chat(prompt)
+
+
+class _Completions:
+    def create(self, model: str, messages: List[Dict[str, Any]], **kwargs):
+        content = answer(messages)
+        return {
+            "id": "fake-" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:12],
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(messages, content),
+        }
+
+
+class _Chat:
+    def __init__(self):
+        self.completions = _Completions()
+
+
+class FakeOpenAI:
+    """The `chat.completions.create` / `embeddings.create` surface of an OpenAI client."""
+
+    def __init__(self):
+        self.chat = _Chat()
+        self.embeddings = self
+
+    def create(self, model: str, input, **kwargs):
+        inputs = [input] if isinstance(input, str) else list(input)
+        return {
+            "object": "list",
+            "model": model,
+            "data": [{"object": "embedding", "index": i, "embedding": embed(text)} for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": sum(len(t) // 4 for t in inputs), "total_tokens": sum(len(t) // 4 for t in inputs)},
+        }
+
+
+def embed(text: str) -> List[float]:
+    """Bag of hashed lowercase tokens, L2-normalized."""
+    vector = [0.0] * EMBED_DIM
+    for token in re.findall(r"\w+", text.lower()):
+        vector[int(hashlib.md5(token.encode("utf-8")).hexdigest(), 16) % EMBED_DIM] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [round(v / norm, 6) for v in vector]
+
+
+class FakeIndex:
+    """Pinecone-style `query()` over the local provider chunks (load_to_pinecone.load_chunks)."""
+
+    def __init__(self, chunks: Optional[List[Dict[str, Any]]] = None):
+        if chunks is None:
+            from app.services.load_to_pinecone import load_chunks
+            chunks = load_chunks()
+        self._vectors = [(chunk, embed(chunk["text"])) for chunk in chunks]
+
+    def query(self, vector: List[float], top_k: int = 5, include_metadata: bool = False,
+              filter: Optional[Dict[str, Any]] = None, **kwargs):
+        provider = ((filter or {}).get("provider") or {}).get("$eq")
+        scored = [
+            (round(sum(a * b for a, b in zip(vector, values)), 6), chunk)
+            for chunk, values in self._vectors
+            if provider is None or chunk["provider"] == provider
+        ]
+        scored.sort(key=lambda pair: (-pair[0], pair[1]["id"]))
+        return {"matches": [
+            dict(
+                {"id": chunk["id"], "score": score},
+                **({"metadata": {k: chunk[k] for k in ("source", "provider", "section", "text")}} if include_metadata else {}),
+            )
+            for score, chunk in scored[:top_k]
+        ]}
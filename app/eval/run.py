@@ -0,0 +1,288 @@
+"""
+Offline evaluation of the chat graph: accuracy vs cost/latency per model
+configuration.
+
+Each labeled conversation in the fixtures is played through the compiled
+graph (in-memory checkpoints, one thread per conversation) once per
+configuration. Model, embedding and vector-index calls go through a
+cassette: recorded once, replayed offline after.
+
+    # replay only, no network
+    MONGO_DB=BussTicketBD_eval python -m app.eval.run \\
+        --config config/config.yaml --config config/eval/nano.yaml
+
+    # record against the real APIs (needs OPENAI_API_KEY / PINECONE_API_KEY)
+    MONGO_DB=BussTicketBD_eval python -m app.eval.run --mode record \\
+        --config config/config.yaml --config config/eval/nano.yaml
+
+The cassette that ships (app/eval/cassettes/conversations.json) was
+recorded with `--upstream fake` (app/eval/fake_upstream.py), a scripted
+offline stand-in: it exercises the harness and the graph, but its
+accuracy and token numbers say nothing about the real models. The file
+is flagged as such, and the report then names no cheapest
+configuration. Re-record it the same way after changing a prompt or a
+fixture.
+
+Per configuration it reports intent accuracy, slot accuracy, reply checks,
+LLM calls and tokens per turn, cost per 1k turns (from the prices in the
+config) and turn latency (local time plus the recorded model latency),
+then names the cheapest configuration within `--tolerance` of the best
+accuracy. The catalog comes from `--catalog` (a fixture, not data.json,
+so the cassette doesn't go stale with it). MongoDB is still needed
+(catalog, bookings); the database named
+by MONGO_DB is wiped between configurations, so it must not be the live one.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List
+
+import yaml
+
+LIVE_DB = "BussTicketBD"
+
+
+def _get(state: Dict[str, Any], path: str) -> Any:
+    value: Any = state
+    for part in path.split("."):
+        if hasattr(value, "model_dump"):
+            value = value.model_dump()
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _same(expected: Any, actual: Any) -> bool:
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        try:
+            return float(actual) == float(expected)
+        except (TypeError, ValueError):
+            return False
+    return " ".join(str(expected).lower().split()) == " ".join(str(actual or "").lower().split())
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def _reset_eval_db():
+    from app.config import (
+        booking_rollups_collection,
+        bookings_archive_collection,
+        bookings_collection,
+        schedules_collection,
+        thread_notices_collection,
+    )
+    for collection in (bookings_collection, bookings_archive_collection, booking_rollups_collection,
+                       schedules_collection, thread_notices_collection):
+        collection.delete_many({})
+
+
+def evaluate(config_path: str, conversations: List[Dict[str, Any]], cassette, log, verbose: bool = False,
+             upstream=None) -> Dict[str, Any]:
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from app.config import CHAT_DEADLINE_SECONDS
+    from app.eval.cassette import CassetteClient
+    from app.services import model_router as router_module
+    from app.services.chatbot_langgraph import graph
+
+    with open(config_path, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    router = router_module.ModelRouter(config)
+    for model in router.models.values():
+        model.client = CassetteClient(cassette, log, upstream=upstream or model.client)
+    router_module.model_router = router
+    prices = {
+        spec["name"]: (float(spec.get("price_in_per_1m", 0)), float(spec.get("price_out_per_1m", 0)))
+        for spec in (config.get("models") or {}).values()
+    }
+
+    _reset_eval_db()
+    flow = graph.compile(checkpointer=InMemorySaver())
+
+    turns = []
+    intents = slots = slots_ok = checks = checks_ok = 0
+    intents_ok = 0
+    for conversation in conversations:
+        thread_id = f"eval-{conversation['id']}-{uuid.uuid4().hex[:8]}"
+        for n, turn in enumerate(conversation["turns"], 1):
+            expect = turn.get("expect") or {}
+            log.reset()
+            misses_before = cassette.misses
+            started = time.perf_counter()
+            with router_module.deadline(CHAT_DEADLINE_SECONDS):
+                out = flow.invoke(
+                    {"user_message": turn["user"], "thread_id": thread_id},
+                    {"configurable": {"thread_id": thread_id}},
+                )
+            local_ms = (time.perf_counter() - started) * 1000
+            replayed_ms = sum(c["latency_ms"] for c in log.calls if c["replayed"])
+            reply = str(out.get("result") or "")
+
+            failures = []
+            if "intent" in expect:
+                intents += 1
+                if out.get("intent") == expect["intent"]:
+                    intents_ok += 1
+                else:
+                    failures.append(f"intent {out.get('intent')!r} != {expect['intent']!r}")
+            for path, value in (expect.get("slots") or {}).items():
+                slots += 1
+                actual = _get(out, path)
+                if _same(value, actual):
+                    slots_ok += 1
+                else:
+                    failures.append(f"{path} {actual!r} != {value!r}")
+            for text in expect.get("contains") or []:
+                checks += 1
+                if text.lower() in reply.lower():
+                    checks_ok += 1
+                else:
+                    failures.append(f"reply lacks {text!r}")
+
+            chat_calls = [c for c in log.calls if c["kind"] == "chat"]
+            cost = sum(
+                c["prompt_tokens"] * prices.get(c["model"], (0, 0))[0] + c["completion_tokens"] * prices.get(c["model"], (0, 0))[1]
+                for c in chat_calls
+            ) / 1_000_000
+            turns.append({
+                "conversation": conversation["id"],
+                "turn": n,
+                "llm_calls": len(chat_calls),
+                "other_calls": len(log.calls) - len(chat_calls),
+                "prompt_tokens": sum(c["prompt_tokens"] for c in chat_calls),
+                "completion_tokens": sum(c["completion_tokens"] for c in chat_calls),
+                "cost": cost,
+                "latency_ms": local_ms + replayed_ms,
+                "cassette_misses": cassette.misses - misses_before,
+                "failures": failures,
+            })
+            if verbose and failures:
+                print(f"  {conversation['id']}#{n}: {'; '.join(failures)}")
+
+    count = len(turns) or 1
+    latencies = [t["latency_ms"] for t in turns]
+    return {
+        "config": config_path,
+        "turns": len(turns),
+        "intent_accuracy": intents_ok / intents if intents else None,
+        "slot_accuracy": slots_ok / slots if slots else None,
+        "reply_checks": checks_ok / checks if checks else None,
+        "llm_calls_per_turn": sum(t["llm_calls"] for t in turns) / count,
+        "prompt_tokens_per_turn": sum(t["prompt_tokens"] for t in turns) / count,
+        "completion_tokens_per_turn": sum(t["completion_tokens"] for t in turns) / count,
+        "cost_per_1k_turns": sum(t["cost"] for t in turns) / count * 1000,
+        "latency_p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "latency_p95_ms": _percentile(latencies, 0.95),
+        "cassette_misses": sum(t["cassette_misses"] for t in turns),
+        "details": turns,
+    }
+
+
+def _fmt(value, pattern="{:.1%}"):
+    return "-" if value is None else pattern.format(value)
+
+
+def report(results: List[Dict[str, Any]], tolerance: float, scripted: bool = False):
+    header = (f"{'config':<28} {'turns':>5} {'intent':>7} {'slots':>7} {'reply':>7} {'calls/t':>7} "
+              f"{'prompt/t':>8} {'$/1k t':>7} {'p50 ms':>7} {'p95 ms':>7} {'misses':>6}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{os.path.basename(r['config']):<28} {r['turns']:>5} {_fmt(r['intent_accuracy']):>7} "
+            f"{_fmt(r['slot_accuracy']):>7} {_fmt(r['reply_checks']):>7} {r['llm_calls_per_turn']:>7.2f} "
+            f"{r['prompt_tokens_per_turn']:>8.0f} {r['cost_per_1k_turns']:>7.3f} {r['latency_p50_ms']:>7.0f} "
+            f"{r['latency_p95_ms']:>7.0f} {r['cassette_misses']:>6}"
+        )
+
+    complete = [r for r in results if not r["cassette_misses"]]
+    if len(complete) < len(results):
+        print("\nConfigurations with cassette misses are incomplete; record them with --mode auto.")
+    if not complete:
+        return
+    if scripted:
+        print("\nThe cassette was recorded from the scripted fake upstream; its accuracy, tokens and cost "
+              "say nothing about the models, so no configuration is recommended. Re-record with "
+              "--mode record against the real APIs to compare them.")
+        return
+
+    def score(r, key):
+        return r[key] if r[key] is not None else 1.0
+
+    best = {key: max(score(r, key) for r in complete) for key in ("intent_accuracy", "slot_accuracy")}
+    holding = [
+        r for r in complete
+        if all(score(r, key) >= best[key] - tolerance for key in best)
+    ]
+    cheapest = min(holding, key=lambda r: (r["cost_per_1k_turns"], r["latency_p50_ms"]))
+    print(f"\nCheapest configuration within {tolerance:.0%} of the best accuracy: {cheapest['config']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", action="append", help="model config YAML (repeat to compare)")
+    parser.add_argument("--fixtures", default="app/eval/fixtures/conversations.yaml")
+    parser.add_argument("--catalog", default="app/eval/fixtures/catalog.json",
+                        help="catalog ingested before the run; the prompts, and so the cassette, depend on it")
+    parser.add_argument("--cassette", help="default: app/eval/cassettes/<fixtures name>.json")
+    parser.add_argument("--mode", choices=("replay", "record", "auto"), default="replay")
+    parser.add_argument("--upstream", choices=("real", "fake"), default="real",
+                        help="what record/auto call: the real APIs or the scripted app/eval/fake_upstream.py")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="accuracy drop allowed for a cheaper config")
+    parser.add_argument("--json", help="also write the full results (per turn) here")
+    parser.add_argument("--verbose", action="store_true", help="print every failed expectation")
+    parser.add_argument("--allow-live-db", action="store_true")
+    args = parser.parse_args()
+
+    if os.getenv("MONGO_DB", LIVE_DB) == LIVE_DB and not args.allow_live_db:
+        parser.error(f"set MONGO_DB to a scratch database; this run wipes bookings in it (not {LIVE_DB!r})")
+    if args.mode == "replay" or args.upstream == "fake":
+        # Clients are built at import; replay and the fake upstream never call them
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+        os.environ.setdefault("PINECONE_API_KEY", "replay")
+
+    from app.eval.cassette import Cassette, CallLog, CassetteIndex, cassette_embeddings
+    from app.eval.fake_upstream import FakeIndex, FakeOpenAI
+    from app.services.catalog_ingest import ingest_catalog
+    from app.services.langgraph_nodes import provider_info
+    from app.services.provider_facts import ingest_provider_facts
+    from app.utils.embed_batcher import embedder
+
+    with open(args.fixtures, encoding="utf-8") as f:
+        conversations = (yaml.safe_load(f) or {}).get("conversations") or []
+    stem = os.path.splitext(os.path.basename(args.fixtures))[0]
+    cassette = Cassette(
+        args.cassette or os.path.join("app", "eval", "cassettes", f"{stem}.json"), args.mode, args.upstream
+    )
+    log = CallLog()
+    upstream = FakeOpenAI() if args.upstream == "fake" else None
+    embedder.create = cassette_embeddings(cassette, log, upstream.embeddings.create if upstream else embedder.create)
+    provider_info.index = CassetteIndex(cassette, FakeIndex() if upstream else provider_info.index)
+
+    ingest_catalog(args.catalog)
+    ingest_provider_facts()
+
+    results = []
+    try:
+        for config_path in args.config or ["config/config.yaml"]:
+            print(f"Evaluating {config_path} on {len(conversations)} conversations...")
+            results.append(evaluate(config_path, conversations, cassette, log, args.verbose, upstream))
+    finally:
+        cassette.save()
+
+    print()
+    report(results, args.tolerance, cassette.scripted)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,25 @@
 from fastapi import FastAPI
+from app.api.routes.autocomplete import autocomplete_router
 from app.api.routes.chat import chat_router
+from app.api.routes.export import export_router
+from app.api.routes.metrics import metrics_router
+from app.api.routes.operator import operator_router
+from app.api.routes.profiles import profiles_router
+from app.api.routes.route_planner import route_planner_router
+from app.api.routes.schedules import schedules_router
+from app.api.routes.stats import stats_router
+from app.api.routes.threads import threads_router
+from app.services.booking_rollups import ensure_rollup_indexes, rebuild_if_empty
+from app.services.bookings_store import booking_archiver, ensure_booking_indexes
 from app.services.buss_data_loader import startup_event
+from app.services.chatbot_langgraph import checkpointer
 from app.services.load_to_pinecone import upload_embeddings_if_missing
+from app.services.payments import ensure_payment_indexes, payment_reconciler
+from app.services.provider_facts import ensure_provider_facts_indexes, ingest_provider_facts
+from app.services.schedules import ensure_schedule_indexes
+from app.services.thread_notices import ensure_notice_indexes
+from app.utils.chat_memory import chat_writes
+from app.utils.thread_serializer import thread_lease
 
 app = FastAPI()
 
@@ -10,5 +28,35 @@ app = FastAPI()
 async def _startup_event():
     await startup_event()
     upload_embeddings_if_missing()
+    ensure_provider_facts_indexes()
+    print(f"Provider facts refreshed for {ingest_provider_facts()} documents.")
+    checkpointer.setup()
+    thread_lease.ensure_indexes()
+    ensure_booking_indexes()
+    ensure_payment_indexes()
+    ensure_rollup_indexes()
+    rebuild_if_empty()
+    ensure_schedule_indexes()
+    ensure_notice_indexes()
+    chat_writes.start()
+    booking_archiver.start()
+    payment_reconciler.start()
 
-app.include_router(chat_router)
\ No newline at end of file
+
+@app.on_event("shutdown")
+async def _shutdown_event():
+    # Drain queued chat writes before the process exits
+    chat_writes.stop()
+    booking_archiver.stop()
+    payment_reconciler.stop()
+
+app.include_router(chat_router)
+app.include_router(metrics_router)
+app.include_router(route_planner_router)
+app.include_router(threads_router)
+app.include_router(export_router)
+app.include_router(autocomplete_router)
+app.include_router(schedules_router)
+app.include_router(stats_router)
+app.include_router(operator_router)
+app.include_router(profiles_router)
@@ -0,0 +1,26 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+
+
+# =====================================================
+# CATALOG (data.json)
+# =====================================================
+class DroppingPoint(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    name: str = Field(min_length=1)
+    price: Optional[float] = Field(default=None, ge=0)
+
+
+class District(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    name: str = Field(min_length=1)
+    dropping_points: List[DroppingPoint] = []
+
+
+class BusProvider(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    name: str = Field(min_length=1)
+    coverage_districts: List[str] = []
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List
 
 class ChatInput(BaseModel):
     message: str
@@ -15,4 +15,11 @@ class ChatState(BaseModel):
     user_message: str
     intent: Optional[str] = None
     result: Any = None
-    thread_id: Optional[str] = None  # optional, can create new thread
\ No newline at end of file
+    thread_id: Optional[str] = None  # optional, can create new thread
+
+    # Persisted per thread by the checkpointer between turns
+    history: List[Dict[str, Any]] = []  # recent {"user", "bot"} turns
+    last_intent: Optional[str] = None  # workflow the previous turn ran
+    booking_data: Optional[Dict[str, Any]] = None
+    cancel_data: Optional[Dict[str, Any]] = None
+    view_ticket_phone: Optional[str] = None
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+# =====================================================
+# OPERATOR TRIP ACTIONS (every confirmed booking on a provider/route/date)
+# =====================================================
+class TripSelector(BaseModel):
+    provider: str = Field(min_length=1)
+    district_from: str = Field(min_length=1)
+    district_to: str = Field(min_length=1)
+    date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")
+    departure: Optional[str] = Field(default=None, pattern=r"^([01]\d|2[0-3]):[0-5]\d$")  # one coach only
+    reason: str = Field(min_length=1, max_length=200)
+
+
+class TripCancel(TripSelector):
+    pass
+
+
+class TripReschedule(TripSelector):
+    new_date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")
+    new_departure: Optional[str] = Field(default=None, pattern=r"^([01]\d|2[0-3]):[0-5]\d$")
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional
+
+
+# =====================================================
+# SCHEDULES (one document per departure)
+# =====================================================
+class Schedule(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    provider: str = Field(min_length=1)
+    from_district: str = Field(min_length=1)
+    to_district: str = Field(min_length=1)
+    date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")  # YYYY-MM-DD
+    departure: str = Field(pattern=r"^([01]\d|2[0-3]):[0-5]\d$")  # HH:MM, 24h
+    coach_type: str = "non-ac"
+    capacity: int = Field(gt=0)
+    seats_booked: int = Field(default=0, ge=0)
+    fare: Optional[float] = Field(default=None, ge=0)
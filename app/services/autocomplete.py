@@ -0,0 +1,141 @@
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.catalog import get_catalog, on_catalog_change
+from app.services.gazetteer import DISTRICT_ALIASES, normalize
+from app.services.provider_retriever import PROVIDER_ALIASES
+
+AUTOCOMPLETE_KINDS = ("district", "point", "provider")
+# Prefix matches ranked per query. One- and two-letter prefixes rank all of
+# theirs once and are then served from a per-index cache.
+MAX_SCAN = 200
+MAX_SHORT_CACHE = 50_000
+
+
+class AutocompleteIndex:
+    """
+    Prefix suggestions over catalog names, one sorted array of normalized
+    keys per scope (all districts, all points, each district's points, all
+    providers, providers covering a district). A query is a bisect to the
+    first key with the prefix and a short scan; every word of a name is
+    keyed too, so "bazar" finds "Shaheb Bazar".
+
+    A catalog change builds a new index and swaps the module reference, so
+    readers never see a half-built one.
+    """
+
+    def __init__(self, catalog: Dict[str, Any]):
+        self.version = catalog.get("version")
+        self.entries: List[Dict[str, Any]] = []
+        scopes: Dict[Tuple[str, Optional[str]], List[Tuple[str, int, int]]] = {}
+        self.districts: Dict[str, str] = {}
+
+        def add(scope_keys, entry, spellings):
+            entry_id = len(self.entries)
+            self.entries.append(entry)
+            for spelling in spellings:
+                words = normalize(spelling).split()
+                for i in range(len(words)):
+                    # (key, word position, entry): whole-name matches sort first
+                    for scope in scope_keys:
+                        scopes.setdefault(scope, []).append((" ".join(words[i:]), i, entry_id))
+
+        alias_groups = {normalize(name): group for group in DISTRICT_ALIASES for name in group}
+        for district in catalog.get("districts", []):
+            name = district.get("name")
+            if not name:
+                continue
+            spellings = {name, *alias_groups.get(normalize(name), [])}
+            for spelling in spellings:
+                self.districts[normalize(spelling)] = name
+            add([("district", None)], {"kind": "district", "name": name}, sorted(spellings))
+            for point in district.get("dropping_points", []) or []:
+                if point.get("name"):
+                    add(
+                        [("point", None), ("point", name)],
+                        {"kind": "point", "name": point["name"], "district": name, "price": point.get("price")},
+                        [point["name"]],
+                    )
+
+        for provider in catalog.get("bus_providers", []):
+            name = provider.get("name")
+            if not name:
+                continue
+            aliases = [a for stem, group in PROVIDER_ALIASES.items() if stem in name.lower() for a in group]
+            covered = provider.get("coverage_districts", []) or []
+            add(
+                [("provider", None)] + [("provider", d) for d in covered],
+                {"kind": "provider", "name": name, "coverage_districts": covered},
+                [name] + aliases,
+            )
+
+        self.keys: Dict[Tuple[str, Optional[str]], List[str]] = {}
+        self.rows: Dict[Tuple[str, Optional[str]], List[Tuple[Tuple, int]]] = {}
+        # Empty query (a picker listing a whole scope): every entry by name
+        self.listing: Dict[Tuple[str, Optional[str]], List[int]] = {}
+        for scope, items in scopes.items():
+            items.sort()
+            self.keys[scope] = [key for key, _, _ in items]
+            # Name-start before later-word matches, then shorter (an exact match
+            # is the shortest key with the prefix), then by name
+            self.rows[scope] = [
+                ((pos > 0, len(key), self.entries[entry_id]["name"]), entry_id) for key, pos, entry_id in items
+            ]
+            ids = {entry_id for _, _, entry_id in items}
+            self.listing[scope] = sorted(ids, key=lambda e: self.entries[e]["name"].lower())
+        # Results for one- and two-letter prefixes, which scan the most keys
+        self._short: Dict[Tuple, List[Dict[str, Any]]] = {}
+
+    def resolve_district(self, district: Optional[str]) -> Optional[str]:
+        return self.districts.get(normalize(district or "")) if district else None
+
+    def suggest(self, q: str, kind: str, district: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        scope = (kind, self.resolve_district(district) if district else None)
+        keys = self.keys.get(scope)
+        if not keys:
+            return []
+        rows = self.rows[scope]
+        prefix = normalize(q)
+        if not prefix:
+            return [self.entries[e] for e in self.listing[scope][:limit]]
+        short = (scope, prefix, limit) if len(prefix) <= 2 else None
+        if short in self._short:
+            return self._short[short]
+
+        best: Dict[int, Tuple] = {}
+        i = bisect_left(keys, prefix)
+        end = len(keys) if short else min(len(keys), i + MAX_SCAN)
+        while i < end and keys[i].startswith(prefix):
+            rank, entry_id = rows[i]
+            if entry_id not in best or rank < best[entry_id]:
+                best[entry_id] = rank
+            i += 1
+
+        found = [self.entries[entry_id] for entry_id in sorted(best, key=best.get)[:limit]]
+        if short and len(self._short) < MAX_SHORT_CACHE:
+            self._short[short] = found
+        return found
+
+
+_index: Optional[AutocompleteIndex] = None
+_index_lock = threading.Lock()
+
+
+def _rebuild(catalog: Dict[str, Any]):
+    global _index
+    _index = AutocompleteIndex(catalog)
+
+
+on_catalog_change(_rebuild)
+
+
+def get_autocomplete() -> Optional[AutocompleteIndex]:
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    if _index is None or _index.version != catalog.get("version"):
+        with _index_lock:
+            if _index is None or _index.version != catalog.get("version"):
+                _rebuild(catalog)
+    return _index
@@ -0,0 +1,109 @@
+"""
+Streaming booking exports (passenger manifests) for operators.
+
+Rows come off a server-side cursor in batches and are encoded into
+chunks of NDJSON or CSV, so memory stays flat however many bookings
+match. Used by GET /bookings/export and as a CLI:
+
+    python -m app.services.booking_export --provider "Hanif" --from 2025-01-01 --to 2025-01-31 --format csv -o manifest.csv
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from app.services.bookings_store import iter_bookings
+from app.services.catalog import canonical_provider
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_FIELDS = [
+    "booking_id", "date", "bus_provider", "district_from", "district_to",
+    "pickup_point", "dropping_point", "name", "phone", "seats", "fare",
+    "total_amount", "status", "payment_status", "booked_at",
+]
+ROWS_PER_CHUNK = 500
+
+
+def resolve_provider(provider: Optional[str]) -> Optional[str]:
+    """Catalog spelling of `provider` (case-insensitive), else as given."""
+    if not provider:
+        return None
+    return canonical_provider(provider) or provider.strip()
+
+
+def export_rows(
+    provider: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    status: Optional[str] = None,
+    batch_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    query: Dict[str, Any] = {"status": status} if status else {"status": {"$ne": "hold"}}
+    if provider:
+        query["bus_provider"] = resolve_provider(provider)
+    projection = {"_id": 0, **{f: 1 for f in EXPORT_FIELDS}}
+    return iter_bookings(query, date_from, date_to, projection=projection, batch_size=batch_size)
+
+
+def _cell(value: Any):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def ndjson_chunks(rows: Iterable[Dict[str, Any]], rows_per_chunk: int = ROWS_PER_CHUNK) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({f: _cell(row.get(f)) for f in EXPORT_FIELDS}, ensure_ascii=False))
+        if len(lines) >= rows_per_chunk:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def csv_chunks(rows: Iterable[Dict[str, Any]], rows_per_chunk: int = ROWS_PER_CHUNK) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    pending = 0
+    for row in rows:
+        writer.writerow([_cell(row.get(f)) for f in EXPORT_FIELDS])
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def encode(rows: Iterable[Dict[str, Any]], fmt: str) -> Iterator[bytes]:
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    return csv_chunks(rows) if fmt == "csv" else ndjson_chunks(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export bookings as NDJSON or CSV")
+    parser.add_argument("--provider")
+    parser.add_argument("--from", dest="date_from", help="first travel date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="last travel date, YYYY-MM-DD")
+    parser.add_argument("--status", help="e.g. confirmed or cancelled (default: all but holds)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    rows = export_rows(args.provider, args.date_from, args.date_to, args.status)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in encode(rows, args.format):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
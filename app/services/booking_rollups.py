@@ -0,0 +1,276 @@
+"""
+Per-provider, per-route, per-day booking rollups for operator dashboards.
+
+Every confirmed booking and every cancellation `$inc`s one rollup
+document keyed by (date, provider, district_from, district_to), so
+GET /stats reads O(days x routes) small documents instead of
+aggregating over bookings. rebuild_rollups() recomputes everything from
+the booking collections, one provider per worker, to repair drift. It
+folds the difference into the live counters with `$inc`, so bookings
+made while it runs are kept:
+
+    python -m app.services.booking_rollups --workers 4
+"""
+import argparse
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.config import (
+    booking_rollups_collection,
+    bookings_archive_collection,
+    bookings_collection,
+    thread_leases_collection,
+    ROLLUP_REBUILD_LEASE_TTL,
+    ROLLUP_REBUILD_WORKERS,
+)
+from app.utils import metrics
+from app.utils.thread_serializer import ThreadLease
+
+COUNTERS = ("bookings", "seats_sold", "revenue", "cancellations", "seats_cancelled", "revenue_cancelled")
+GROUP_BY = {
+    "day": ("date",),
+    "provider": ("provider",),
+    "route": ("district_from", "district_to"),
+    "provider_route": ("provider", "district_from", "district_to"),
+}
+
+
+def ensure_rollup_indexes():
+    booking_rollups_collection.create_index(
+        [("date", ASCENDING), ("provider", ASCENDING), ("district_from", ASCENDING), ("district_to", ASCENDING)],
+        unique=True,
+    )
+    booking_rollups_collection.create_index([("provider", ASCENDING), ("date", ASCENDING)])
+
+
+def _key(booking: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "date": booking.get("date"),
+        "provider": booking.get("bus_provider"),
+        "district_from": booking.get("district_from"),
+        "district_to": booking.get("district_to"),
+    }
+
+
+def add_to_rollup(booking: Dict[str, Any], counters: Dict[str, float]):
+    # A failed rollup write must never fail the booking; rebuild_rollups repairs it
+    try:
+        booking_rollups_collection.update_one(
+            _key(booking),
+            {"$inc": counters, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    except Exception as e:
+        print(f"Rollup update failed for booking {booking.get('booking_id')}: {e}")
+        metrics.inc("booking_rollup_errors_total")
+
+
+def record_booking(booking: Dict[str, Any]):
+    add_to_rollup(booking, {
+        "bookings": 1,
+        "seats_sold": int(booking.get("seats") or 0),
+        "revenue": float(booking.get("total_amount") or 0),
+    })
+
+
+def record_cancellation(booking: Dict[str, Any]):
+    add_to_rollup(booking, {
+        "cancellations": 1,
+        "seats_cancelled": int(booking.get("seats") or 0),
+        "revenue_cancelled": float(booking.get("total_amount") or 0),
+    })
+
+
+# ---------- Reconciliation ---------- #
+EPOCH = datetime(1970, 1, 1)
+REBUILD_LEASE_ID = "booking_rollups_rebuild"
+rebuild_lease = ThreadLease(thread_leases_collection, ROLLUP_REBUILD_LEASE_TTL)
+
+
+def _before(field: str, cutoff: datetime):
+    return {"$lt": [{"$ifNull": [field, EPOCH]}, cutoff]}
+
+
+def _cancelled(expr, cutoff: datetime):
+    return {"$cond": [{"$and": [{"$eq": ["$status", "cancelled"]}, _before("$cancelled_at", cutoff)]}, expr, 0]}
+
+
+def _provider_pipeline(provider: Optional[str], cutoff: datetime) -> List[Dict[str, Any]]:
+    """Counters as they stood at `cutoff`: later bookings, cancellations and moves are left out."""
+    return [
+        # Seat holds never reached record_booking
+        {"$match": {
+            "bus_provider": provider,
+            "status": {"$ne": "hold"},
+            "booked_at": {"$not": {"$gte": cutoff}},
+        }},
+        {"$group": {
+            "_id": {
+                "date": {"$cond": [_before("$rescheduled_at", cutoff), "$date", "$rescheduled_from.date"]},
+                "district_from": "$district_from",
+                "district_to": "$district_to",
+            },
+            "bookings": {"$sum": 1},
+            "seats_sold": {"$sum": {"$ifNull": ["$seats", 0]}},
+            "revenue": {"$sum": {"$ifNull": ["$total_amount", 0]}},
+            "cancellations": {"$sum": _cancelled(1, cutoff)},
+            "seats_cancelled": {"$sum": _cancelled({"$ifNull": ["$seats", 0]}, cutoff)},
+            "revenue_cancelled": {"$sum": _cancelled({"$ifNull": ["$total_amount", 0]}, cutoff)},
+        }},
+    ]
+
+
+def rebuild_provider(provider: Optional[str]) -> int:
+    """
+    Recompute one provider's rollups from the hot and archive collections
+    (each grouped on the (bus_provider, date, ...) index) as of a cutoff,
+    and `$inc` each rollup by the difference from its counters read just
+    before that cutoff. Live `$inc`s after the cutoff stay on top; rollups
+    the bookings no longer back end at zero and are dropped.
+    """
+    key_fields = ("date", "district_from", "district_to")
+    current: Dict[tuple, Dict[str, Any]] = {}
+    for doc in booking_rollups_collection.find({"provider": provider}, {"_id": 0, "updated_at": 0, "rebuilt_at": 0}):
+        current[tuple(doc.get(f) for f in key_fields)] = doc
+    cutoff = datetime.utcnow()
+
+    totals: Dict[tuple, Dict[str, Any]] = {}
+    for collection in (bookings_collection, bookings_archive_collection):
+        for row in collection.aggregate(_provider_pipeline(provider, cutoff), allowDiskUse=True):
+            key = tuple(row["_id"].get(f) for f in key_fields)
+            acc = totals.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for counter in COUNTERS:
+                acc[counter] += row[counter]
+
+    stamp = datetime.utcnow()
+    ops = []
+    for key in set(totals) | set(current):
+        rebuilt, seen = totals.get(key, {}), current.get(key, {})
+        delta = {c: rebuilt.get(c, 0) - seen.get(c, 0) for c in COUNTERS}
+        delta = {c: v for c, v in delta.items() if v}
+        if not delta:
+            continue
+        ops.append(UpdateOne(
+            dict(zip(key_fields, key), provider=provider),
+            {"$inc": delta, "$set": {"updated_at": stamp, "rebuilt_at": stamp}},
+            upsert=True,
+        ))
+    for i in range(0, len(ops), 1000):
+        booking_rollups_collection.bulk_write(ops[i:i + 1000], ordered=False)
+    # All-zero rollups are days with nothing left; a live $inc recreates one
+    booking_rollups_collection.delete_many(
+        {"provider": provider, **{c: {"$in": [0, None]} for c in COUNTERS}}
+    )
+    return len(ops)
+
+
+def _leased(fn, *args):
+    """Run `fn` under the rebuild lease; None (without running) if another worker holds it."""
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+    if not rebuild_lease.try_acquire(REBUILD_LEASE_ID, owner, ""):
+        print("Rollup rebuild already running on another worker, skipping")
+        return None
+    done = threading.Event()
+
+    def _renew():
+        while not done.wait(rebuild_lease.ttl / 3):
+            if not rebuild_lease.renew(REBUILD_LEASE_ID, owner):
+                metrics.inc("booking_rollup_lease_lost_total")
+                return
+
+    threading.Thread(target=_renew, name="rollup-lease", daemon=True).start()
+    try:
+        return fn(*args)
+    finally:
+        done.set()
+        rebuild_lease.release(REBUILD_LEASE_ID, owner)
+
+
+def _rebuild_all(workers: int) -> Dict[str, int]:
+    # Providers with rollups but no bookings left rebuild to zero and drop out
+    providers = (
+        set(booking_rollups_collection.distinct("provider"))
+        | set(bookings_collection.distinct("bus_provider"))
+        | set(bookings_archive_collection.distinct("bus_provider"))
+    )
+    started = datetime.utcnow()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="rollup-rebuild") as pool:
+        rebuilt = dict(zip(providers, pool.map(rebuild_provider, providers)))
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    print(f"Rebuilt {sum(rebuilt.values())} rollups for {len(rebuilt)} providers in {elapsed:.1f}s")
+    metrics.inc("booking_rollup_rebuilds_total")
+    return rebuilt
+
+
+def rebuild_rollups(workers: int = ROLLUP_REBUILD_WORKERS) -> Optional[Dict[str, int]]:
+    return _leased(_rebuild_all, workers)
+
+
+def _backfill():
+    # Another worker may have finished the backfill while we waited
+    if booking_rollups_collection.find_one({}, {"_id": 1}) is None:
+        _rebuild_all(ROLLUP_REBUILD_WORKERS)
+
+
+def rebuild_if_empty():
+    """First start after deploying rollups: backfill in the background, on one worker."""
+    if booking_rollups_collection.find_one({}, {"_id": 1}) is None and bookings_collection.find_one({}, {"_id": 1}):
+        threading.Thread(target=_leased, args=(_backfill,), name="rollup-backfill", daemon=True).start()
+
+
+# ---------- Reads ---------- #
+def read_stats(
+    date_from: str,
+    date_to: str,
+    provider: Optional[str] = None,
+    district_from: Optional[str] = None,
+    district_to: Optional[str] = None,
+    group_by: str = "day",
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"date": {"$gte": date_from, "$lte": date_to}}
+    for field, value in (("provider", provider), ("district_from", district_from), ("district_to", district_to)):
+        if value:
+            query[field] = value
+
+    fields = GROUP_BY[group_by]
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    totals = dict.fromkeys(COUNTERS, 0)
+    for doc in booking_rollups_collection.find(query, {"_id": 0, "updated_at": 0, "rebuilt_at": 0}):
+        key = tuple(doc.get(f) for f in fields)
+        row = groups.setdefault(key, dict(zip(fields, key), **dict.fromkeys(COUNTERS, 0)))
+        for counter in COUNTERS:
+            row[counter] += doc.get(counter, 0)
+            totals[counter] += doc.get(counter, 0)
+
+    def _net(row):
+        row["net_seats"] = row["seats_sold"] - row["seats_cancelled"]
+        row["net_revenue"] = row["revenue"] - row["revenue_cancelled"]
+        return row
+
+    rows = [_net(groups[k]) for k in sorted(groups, key=lambda k: tuple(str(v) for v in k))]
+    return {"date_from": date_from, "date_to": date_to, "group_by": group_by, "rows": rows, "totals": _net(totals)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild booking rollups from the booking collections")
+    parser.add_argument("--workers", type=int, default=ROLLUP_REBUILD_WORKERS)
+    parser.add_argument("--provider", help="rebuild only this provider")
+    args = parser.parse_args()
+
+    if args.provider:
+        updated = _leased(rebuild_provider, args.provider)
+        if updated is not None:
+            print(f"Rebuilt {updated} rollups for {args.provider}")
+    else:
+        rebuild_rollups(args.workers)
+
+
+if __name__ == "__main__":
+    main()
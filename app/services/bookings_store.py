@@ -0,0 +1,224 @@
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+
+from app.config import bookings_collection, bookings_archive_collection, BOOKING_ARCHIVE_INTERVAL
+from app.utils import metrics
+from app.utils.clock import local_today
+
+
+# ---------- Hot / archive split ---------- #
+# `bookings` holds trips that haven't happened yet (plus seat holds), which
+# is all the cancel flow and most view queries touch. Trips whose travel
+# date has passed are moved to `bookings_archive` by the archiver below.
+
+ARCHIVE_BATCH = 1000
+
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    """Last 10 digits, so 01712345678 and +8801712345678 match."""
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] or None
+
+
+def _today() -> str:
+    return local_today()
+
+
+def ensure_booking_indexes():
+    for collection in (bookings_collection, bookings_archive_collection):
+        collection.create_index("booking_id", unique=True, sparse=True)
+        collection.create_index([("phone_key", ASCENDING), ("booked_at", DESCENDING)])
+        # Operator manifests: one provider, a date range, in travel order
+        collection.create_index([("bus_provider", ASCENDING), ("date", ASCENDING), ("booked_at", ASCENDING)])
+    bookings_collection.create_index([("phone_key", ASCENDING), ("status", ASCENDING), ("booked_at", DESCENDING)])
+    bookings_collection.create_index("date")
+    # Seat holds that were never confirmed disappear on their own
+    bookings_collection.create_index(
+        "hold_expires_at",
+        expireAfterSeconds=0,
+        partialFilterExpression={"status": "hold"},
+    )
+    _backfill_phone_keys()
+
+
+def _backfill_phone_keys():
+    # Bookings written before phone_key existed
+    for collection in (bookings_collection, bookings_archive_collection):
+        batch = []
+        for doc in collection.find({"phone_key": {"$exists": False}}, {"phone": 1}):
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"phone_key": phone_key(doc.get("phone"))}}))
+            if len(batch) >= ARCHIVE_BATCH:
+                collection.bulk_write(batch, ordered=False)
+                batch = []
+        if batch:
+            collection.bulk_write(batch, ordered=False)
+
+
+# ---------- Reads and writes ---------- #
+def insert_booking(record: Dict[str, Any]):
+    record = dict(record, phone_key=phone_key(record.get("phone")))
+    bookings_collection.insert_one(record)
+    return record
+
+
+def _partitions(query: Dict[str, Any], upcoming_only: bool):
+    """Collections that can hold bookings matching `query`."""
+    if upcoming_only:
+        return [bookings_collection]
+    date = query.get("date")
+    if isinstance(date, str) and date >= _today():
+        return [bookings_collection]
+    # Past trips the archiver hasn't reached yet are still in the hot collection
+    return [bookings_collection, bookings_archive_collection]
+
+
+def _with_phone(query: Dict[str, Any], phone: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    `query` narrowed to `phone`'s bookings. None when `phone` has no digits:
+    `phone_key: None` would match every booking stored without a phone.
+    """
+    if phone is None:
+        return dict(query)
+    key = phone_key(phone)
+    if key is None:
+        return None
+    return dict(query, phone_key=key)
+
+
+def find_bookings(
+    query: Dict[str, Any],
+    phone: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    upcoming_only: bool = False,
+    limit: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Bookings matching `query` (and `phone`, matched on its last 10 digits),
+    newest booking first. Upcoming-only lookups never touch the archive.
+    A phone without digits matches nothing.
+    """
+    query = _with_phone(query, phone)
+    if query is None:
+        return []
+    projection = projection if projection is not None else {"_id": 0}
+    found = []
+    for collection in _partitions(query, upcoming_only):
+        cursor = collection.find(query, projection).sort("booked_at", DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        found.extend(cursor)
+        metrics.inc("bookings_partition_queries_total", partition=collection.name)
+    found.sort(key=lambda b: b.get("booked_at") or datetime.min, reverse=True)
+    return found[:limit] if limit else found
+
+
+def find_booking(query: Dict[str, Any], phone: Optional[str] = None, projection=None, upcoming_only: bool = False):
+    found = find_bookings(query, phone, projection, upcoming_only, limit=1)
+    return found[0] if found else None
+
+
+def _range_partitions(date_from: Optional[str]):
+    if date_from and date_from >= _today():
+        return [bookings_collection]
+    return [bookings_collection, bookings_archive_collection]
+
+
+def iter_bookings(query: Dict[str, Any], date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  projection: Optional[Dict[str, Any]] = None, batch_size: int = 1000):
+    """
+    Stream bookings matching `query` with travel dates in [date_from,
+    date_to], one server-side cursor per partition fetched `batch_size`
+    documents at a time. Archived (older) trips come first, each partition
+    in date order.
+    """
+    query = dict(query)
+    if date_from or date_to:
+        query["date"] = {k: v for k, v in (("$gte", date_from), ("$lte", date_to)) if v}
+    projection = projection if projection is not None else {"_id": 0}
+    for collection in reversed(_range_partitions(date_from)):
+        cursor = collection.find(query, projection, batch_size=batch_size).sort([("date", ASCENDING), ("booked_at", ASCENDING)])
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+
+def update_booking(query: Dict[str, Any], update: Dict[str, Any], phone: Optional[str] = None):
+    # Only upcoming trips change state (cancel, payment); archived ones are history
+    narrowed = _with_phone(query, phone)
+    if narrowed is None:
+        raise ValueError(f"Phone {phone!r} has no digits to match bookings on")
+    return bookings_collection.update_one(narrowed, update)
+
+
+# ---------- Archiver ---------- #
+def archive_past_trips(batch_size: int = ARCHIVE_BATCH) -> int:
+    """
+    Move bookings whose travel date is before today into the archive.
+    Copy first, then delete, so a crash in between only leaves duplicates
+    that the next run's upserts and deletes clean up.
+    """
+    moved = 0
+    cutoff = _today()
+    while True:
+        docs = list(
+            bookings_collection.find({"date": {"$lt": cutoff}, "status": {"$ne": "hold"}}).limit(batch_size)
+        )
+        if not docs:
+            break
+        bookings_archive_collection.bulk_write(
+            [
+                ReplaceOne(
+                    {"booking_id": d["booking_id"]} if d.get("booking_id") else {"_id": d["_id"]},
+                    dict(d, phone_key=d.get("phone_key") or phone_key(d.get("phone")), archived_at=datetime.utcnow()),
+                    upsert=True,
+                )
+                for d in docs
+            ],
+            ordered=False,
+        )
+        bookings_collection.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        moved += len(docs)
+    if moved:
+        print(f"Archived {moved} past bookings")
+    metrics.inc("bookings_archived_total", moved)
+    return moved
+
+
+class BookingArchiver:
+    """Runs archive_past_trips every `interval` seconds on a daemon thread."""
+
+    def __init__(self, interval: float = BOOKING_ARCHIVE_INTERVAL):
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._worker = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                archive_past_trips()
+            except Exception as e:
+                print(f"Booking archiver failed, will retry: {e}")
+                metrics.inc("bookings_archive_errors_total")
+            self._stopped.wait(self.interval)
+
+    def start(self):
+        if self._worker is not None:
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._run, name="booking-archiver", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        if self._worker is None:
+            return
+        self._stopped.set()
+        self._worker.join()
+        self._worker = None
+
+
+booking_archiver = BookingArchiver()
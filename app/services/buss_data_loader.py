@@ -1,24 +1,18 @@
-import json
-from app.config import db
+from app.services.catalog_ingest import ingest_catalog
 
-collection = db["busses"]
 
 async def startup_event():
     try:
-        with open("data.json", "r") as f:
-            data = json.load(f)
+        report = ingest_catalog("data.json")
 
-        # Single object/document
-        combined = {
-            "_id": "startup_data",
-            "districts": data.get("districts", []),
-            "bus_providers": data.get("bus_providers", [])
-        }
-
-        # Insert or update
-        collection.replace_one({"_id": "startup_data"}, combined, upsert=True)
-
-        print("Data merged into one document.")
+        if report["status"] == "invalid":
+            print("data.json failed validation, keeping the current catalog:")
+            for error in report["errors"]:
+                print(f"  - {error}")
+        elif report["status"] == "unchanged":
+            print("Catalog unchanged, skipping ingestion.")
+        else:
+            print(f"Catalog ingested: {report['counts']}")
 
     except Exception as e:
         print(f"Error loading data.json: {e}")
@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import (
+    CATALOG_REFRESH_SECONDS,
+    catalog_meta_collection,
+    districts_collection,
+    dropping_points_collection,
+    providers_collection,
+)
+
+_listeners: List[Callable[[Dict[str, Any]], None]] = []
+_lock = threading.Lock()
+_cache: Dict[str, Any] = {"catalog": None, "checked_at": 0.0}
+
+
+def active_version() -> Optional[str]:
+    meta = catalog_meta_collection.find_one({"_id": "catalog"}, {"version": 1})
+    return meta.get("version") if meta else None
+
+
+def _load(version: str) -> Dict[str, Any]:
+    points: Dict[str, List[Dict[str, Any]]] = {}
+    for point in dropping_points_collection.find(
+        {"version": version}, {"_id": 0, "version": 0, "district": 0}
+    ).sort([("district_key", 1), ("name", 1)]):
+        points.setdefault(point.pop("district_key"), []).append(point)
+
+    districts = [
+        {"name": d["name"], "dropping_points": points.get(d["_id"], [])}
+        for d in districts_collection.find({"version": version}, {"name": 1}).sort("name", 1)
+    ]
+    bus_providers = list(providers_collection.find(
+        {"version": version}, {"_id": 0, "version": 0, "coverage_keys": 0}
+    ).sort("name", 1))
+    return {"version": version, "districts": districts, "bus_providers": bus_providers}
+
+
+def on_catalog_change(listener: Callable[[Dict[str, Any]], None]):
+    """Register a callback that gets the new catalog whenever a new version is loaded."""
+    _listeners.append(listener)
+
+
+def get_catalog() -> Optional[Dict[str, Any]]:
+    """
+    The active catalog as {"version", "districts", "bus_providers"}, in the
+    same shape data.json uses. Kept in memory and re-checked against
+    `catalog_meta` at most every CATALOG_REFRESH_SECONDS.
+    """
+    now = time.monotonic()
+    cached = _cache["catalog"]
+    if cached is not None and now - _cache["checked_at"] < CATALOG_REFRESH_SECONDS:
+        return cached
+
+    with _lock:
+        cached = _cache["catalog"]
+        if cached is not None and now - _cache["checked_at"] < CATALOG_REFRESH_SECONDS:
+            return cached
+
+        version = active_version()
+        _cache["checked_at"] = now
+        if version is None:
+            return cached
+        if cached is not None and cached["version"] == version:
+            return cached
+
+        catalog = _load(version)
+        _cache["catalog"] = catalog
+
+    for listener in _listeners:
+        try:
+            listener(catalog)
+        except Exception as e:
+            print(f"Catalog listener failed: {e}")
+    return catalog
+
+
+def canonical_provider(name: Optional[str]) -> Optional[str]:
+    """The catalog's spelling of a bus provider (case and spacing don't matter); None if unknown."""
+    key = " ".join((name or "").lower().split())
+    for provider in (get_catalog() or {}).get("bus_providers", []):
+        if key and " ".join((provider.get("name") or "").lower().split()) == key:
+            return provider["name"]
+    return None
+
+
+def invalidate_catalog():
+    _cache["checked_at"] = 0.0
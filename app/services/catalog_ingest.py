@@ -0,0 +1,272 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+
+from pydantic import ValidationError
+from pymongo import ASCENDING, ReplaceOne
+
+from app.config import (
+    bus_collection,
+    catalog_meta_collection,
+    districts_collection,
+    dropping_points_collection,
+    providers_collection,
+)
+from app.schemas.catalog_schema import BusProvider, District
+from app.services.catalog import invalidate_catalog
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+
+_decoder = json.JSONDecoder()
+
+
+def name_key(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+# ---------- Streaming JSON reader ---------- #
+class _JSONStream:
+    """
+    Reads a JSON document a chunk at a time and decodes one value at a time,
+    so only the current item (not the whole file) is ever held in memory.
+    """
+
+    def __init__(self, f, chunk_size: int = 1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        if self.pos > self.chunk_size:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += data
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected: str):
+        found = self.peek()
+        if found not in expected:
+            raise ValueError(f"Expected one of {expected!r} but found {found!r} in catalog file")
+        self.pos += 1
+        return found
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                val, end = _decoder.raw_decode(self.buf, self.pos)
+                # A value ending exactly at the buffer edge may be truncated (e.g. a number)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return val
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_catalog(path: str) -> Iterator[Tuple[str, Any]]:
+    """Yields (top_level_key, item) for every element of every top-level array."""
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JSONStream(f)
+        stream.take("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.take(":")
+            if stream.peek() == "[":
+                stream.take("[")
+                if stream.peek() == "]":
+                    stream.take("]")
+                else:
+                    while True:
+                        yield key, stream.value()
+                        if stream.take(",]") == "]":
+                            break
+            else:
+                stream.value()
+            if stream.take(",}") == "}":
+                break
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ---------- Validation pass ---------- #
+def validate_catalog(path: str) -> Dict[str, Any]:
+    errors: List[str] = []
+    counts = {"districts": 0, "dropping_points": 0, "providers": 0}
+    district_keys = set()
+    coverage_keys = set()
+    positions: Dict[str, int] = {}
+
+    def _error(msg: str):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(msg)
+
+    for key, item in iter_catalog(path):
+        position = positions.get(key, 0)
+        positions[key] = position + 1
+        try:
+            if key == "districts":
+                district = District.model_validate(item)
+                dk = name_key(district.name)
+                if dk in district_keys:
+                    _error(f"districts: duplicate district {district.name!r}")
+                district_keys.add(dk)
+                point_keys = set()
+                for point in district.dropping_points:
+                    pk = name_key(point.name)
+                    if pk in point_keys:
+                        _error(f"districts[{position}]: duplicate dropping point {point.name!r} in {district.name!r}")
+                    point_keys.add(pk)
+                counts["districts"] += 1
+                counts["dropping_points"] += len(district.dropping_points)
+            elif key == "bus_providers":
+                provider = BusProvider.model_validate(item)
+                coverage_keys.update(name_key(d) for d in provider.coverage_districts)
+                counts["providers"] += 1
+        except ValidationError as e:
+            _error(f"{key}[{position}]: {e.errors()[0]['msg']}")
+
+    unknown = sorted(coverage_keys - district_keys)
+    if unknown:
+        _error(f"bus_providers: coverage references unknown districts {unknown[:10]}")
+    if not counts["districts"]:
+        _error("districts: catalog has no districts")
+
+    return {"errors": errors, "counts": counts}
+
+
+# ---------- Write pass ---------- #
+def ensure_catalog_indexes():
+    districts_collection.create_index([("name", ASCENDING)])
+    dropping_points_collection.create_index([("district_key", ASCENDING), ("name", ASCENDING)])
+    dropping_points_collection.create_index([("district_key", ASCENDING), ("price", ASCENDING)])
+    providers_collection.create_index([("coverage_keys", ASCENDING)])
+    for collection in (districts_collection, dropping_points_collection, providers_collection):
+        collection.create_index([("version", ASCENDING)])
+
+
+def _flush(collection, ops: List[ReplaceOne]):
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+        ops.clear()
+
+
+def _write_catalog(path: str, version: str):
+    district_ops: List[ReplaceOne] = []
+    point_ops: List[ReplaceOne] = []
+    provider_ops: List[ReplaceOne] = []
+
+    for key, item in iter_catalog(path):
+        if key == "districts":
+            district = District.model_validate(item)
+            dk = name_key(district.name)
+            district_ops.append(ReplaceOne(
+                {"_id": dk},
+                {
+                    "_id": dk,
+                    "name": district.name,
+                    "dropping_point_count": len(district.dropping_points),
+                    "version": version,
+                },
+                upsert=True,
+            ))
+            for point in district.dropping_points:
+                point_id = f"{dk}:{name_key(point.name)}"
+                point_ops.append(ReplaceOne(
+                    {"_id": point_id},
+                    {
+                        **point.model_dump(),
+                        "_id": point_id,
+                        "district": district.name,
+                        "district_key": dk,
+                        "version": version,
+                    },
+                    upsert=True,
+                ))
+                if len(point_ops) >= BATCH_SIZE:
+                    _flush(dropping_points_collection, point_ops)
+            if len(district_ops) >= BATCH_SIZE:
+                _flush(districts_collection, district_ops)
+        elif key == "bus_providers":
+            provider = BusProvider.model_validate(item)
+            pk = name_key(provider.name)
+            provider_ops.append(ReplaceOne(
+                {"_id": pk},
+                {
+                    **provider.model_dump(),
+                    "_id": pk,
+                    "coverage_keys": [name_key(d) for d in provider.coverage_districts],
+                    "version": version,
+                },
+                upsert=True,
+            ))
+            if len(provider_ops) >= BATCH_SIZE:
+                _flush(providers_collection, provider_ops)
+
+    _flush(districts_collection, district_ops)
+    _flush(dropping_points_collection, point_ops)
+    _flush(providers_collection, provider_ops)
+
+    # Anything not part of this version was removed from the catalog
+    for collection in (districts_collection, dropping_points_collection, providers_collection):
+        collection.delete_many({"version": {"$ne": version}})
+
+
+def ingest_catalog(path: str = "data.json", force: bool = False) -> Dict[str, Any]:
+    """
+    Validate and load a catalog file into the normalized `districts`,
+    `dropping_points` and `providers` collections. Unchanged files (same
+    sha256 as the active version) are skipped.
+    """
+    version = file_digest(path)
+    active = catalog_meta_collection.find_one({"_id": "catalog"}) or {}
+    if active.get("version") == version and not force:
+        return {"status": "unchanged", "version": version, "counts": active.get("counts", {})}
+
+    report = validate_catalog(path)
+    if report["errors"]:
+        return {"status": "invalid", "version": version, **report}
+
+    ensure_catalog_indexes()
+    _write_catalog(path, version)
+    catalog_meta_collection.replace_one(
+        {"_id": "catalog"},
+        {
+            "_id": "catalog",
+            "version": version,
+            "source": path,
+            "counts": report["counts"],
+            "ingested_at": datetime.utcnow(),
+        },
+        upsert=True,
+    )
+    # The single aggregated document this pipeline replaces
+    bus_collection.delete_one({"_id": "startup_data"})
+    invalidate_catalog()
+    return {"status": "ingested", "version": version, "counts": report["counts"]}
@@ -1,4 +1,5 @@
 from langgraph.graph import StateGraph, END
+from app.config import checkpoint_collection
 from app.schemas.chat_schema import ChatState
 from app.services.langgraph_nodes.detect_intent import detect_intent
 from app.services.langgraph_nodes.ask_for_info import ask_for_info
@@ -7,18 +8,35 @@ from app.services.langgraph_nodes.book_ticket import book_ticket
 from app.services.langgraph_nodes.view_ticket import view_ticket
 from app.services.langgraph_nodes.cancel_ticket import cancel_ticket
 from app.services.langgraph_nodes.general_chat import general_chat
+from app.services.langgraph_nodes.route_turn import route_turn
+from app.services.langgraph_nodes.finish_turn import finish_turn
+from app.utils.mongo_checkpointer import MongoCheckpointSaver
+from app.utils.profiler import profiled_node
 
 
 
 graph = StateGraph(ChatState)
-graph.add_node("general_chat", general_chat)
-graph.add_node("detect_intent", detect_intent)
-graph.add_node("ask_for_info", ask_for_info)
-graph.add_node("provider_info", provider_info)
-graph.add_node("book_ticket", book_ticket)
-graph.add_node("view_ticket", view_ticket)
-graph.add_node("cancel_ticket", cancel_ticket)
-graph.set_entry_point("detect_intent")
+# Each node records its wall/CPU time when the turn is being profiled
+graph.add_node("route_turn", profiled_node("route_turn", route_turn))
+graph.add_node("general_chat", profiled_node("general_chat", general_chat))
+graph.add_node("detect_intent", profiled_node("detect_intent", detect_intent))
+graph.add_node("ask_for_info", profiled_node("ask_for_info", ask_for_info))
+graph.add_node("provider_info", profiled_node("provider_info", provider_info))
+graph.add_node("book_ticket", profiled_node("book_ticket", book_ticket))
+graph.add_node("view_ticket", profiled_node("view_ticket", view_ticket))
+graph.add_node("cancel_ticket", profiled_node("cancel_ticket", cancel_ticket))
+graph.add_node("finish_turn", profiled_node("finish_turn", finish_turn))
+graph.set_entry_point("route_turn")
+# In-progress bookings/cancellations skip detect_intent
+graph.add_conditional_edges(
+    "route_turn",
+    lambda state: state.intent or "detect_intent",
+    {
+        "detect_intent": "detect_intent",
+        "book_ticket": "book_ticket",
+        "cancel_ticket": "cancel_ticket",
+    }
+)
 graph.add_conditional_edges(
     "detect_intent",
     lambda state: state.intent,
@@ -32,6 +50,11 @@ graph.add_conditional_edges(
     }
 )
 for f in ["general_chat", "ask_for_info", "provider_info", "book_ticket", "view_ticket", "cancel_ticket"]:
-    graph.add_edge(f, END)
-flow = graph.compile()
+    graph.add_edge(f, "finish_turn")
+graph.add_edge("finish_turn", END)
+
+# Workflow state (history, booking_data, cancel_data, ...) lives in the
+# checkpoint for each thread_id instead of on the chat document
+checkpointer = MongoCheckpointSaver(checkpoint_collection)
+flow = graph.compile(checkpointer=checkpointer)
 
@@ -0,0 +1,333 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.catalog import get_catalog, on_catalog_change
+
+# Spellings that edit distance can't bridge (old names, abbreviations, Bangla)
+DISTRICT_ALIASES = [
+    ["Chattogram", "Chittagong", "Ctg", "চট্টগ্রাম"],
+    ["Bogra", "Bogura", "বগুড়া"],
+    ["Comilla", "Cumilla", "কুমিল্লা"],
+    ["Barishal", "Barisal", "বরিশাল"],
+    ["Dhaka", "Dacca", "ঢাকা"],
+    ["Jashore", "Jessore", "যশোর"],
+    ["Sylhet", "সিলেট"],
+    ["Rajshahi", "রাজশাহী"],
+    ["Khulna", "খুলনা"],
+    ["Rangpur", "রংপুর"],
+    ["Mymensingh", "ময়মনসিংহ"],
+    ["Cox's Bazar", "Coxs Bazar", "Cox Bazar", "কক্সবাজার"],
+]
+
+# ---------- Bangla -> Latin transliteration ---------- #
+_BANGLA = {
+    "অ": "o", "আ": "a", "ই": "i", "ঈ": "i", "উ": "u", "ঊ": "u", "ঋ": "ri",
+    "এ": "e", "ঐ": "oi", "ও": "o", "ঔ": "ou",
+    "া": "a", "ি": "i", "ী": "i", "ু": "u", "ূ": "u", "ৃ": "ri",
+    "ে": "e", "ৈ": "oi", "ো": "o", "ৌ": "ou",
+    "ক": "k", "খ": "kh", "গ": "g", "ঘ": "gh", "ঙ": "ng",
+    "চ": "ch", "ছ": "chh", "জ": "j", "ঝ": "jh", "ঞ": "n",
+    "ট": "t", "ঠ": "th", "ড": "d", "ঢ": "dh", "ণ": "n",
+    "ত": "t", "থ": "th", "দ": "d", "ধ": "dh", "ন": "n",
+    "প": "p", "ফ": "ph", "ব": "b", "ভ": "bh", "ম": "m",
+    "য": "j", "র": "r", "ল": "l", "শ": "sh", "ষ": "sh", "স": "s", "হ": "h",
+    "ৎ": "t", "ং": "ng", "ঃ": "h", "ঁ": "",
+    "্": "", "়": "",
+}
+
+# ড় ঢ় য় are composition exclusions: NFC leaves them as base letter + nukta
+# (U+09BC), so they are replaced as sequences before the per-letter pass
+_BANGLA_NUKTA = {"\u09a1\u09bc": "r", "\u09a2\u09bc": "rh", "\u09af\u09bc": "y"}
+
+_FOLDS = [("oo", "u"), ("ee", "i"), ("sh", "s"), ("ph", "f"), ("y", "i"), ("z", "j")]
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DOUBLES = re.compile(r"(.)\1+")
+
+
+def normalize(text: str) -> str:
+    """Transliterate Bangla, fold case, accents and common spelling variation."""
+    text = unicodedata.normalize("NFC", text or "")
+    for sequence, latin in _BANGLA_NUKTA.items():
+        text = text.replace(sequence, latin)
+    text = "".join(_BANGLA.get(ch, ch) for ch in text)
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_ALNUM.sub(" ", text.replace("'", ""))
+    for old, new in _FOLDS:
+        text = text.replace(old, new)
+    return " ".join(_DOUBLES.sub(r"\1", text).split())
+
+
+def _trigrams(key: str):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _deletions(key: str):
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance counting an adjacent transposition as one edit (optimal
+    string alignment), computed only within `limit` of the diagonal.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    too_far = limit + 1
+    before = None
+    previous = [j if j <= limit else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        current = [too_far] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        for j in range(lo, hi + 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if before and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cost = min(cost, before[j - 2] + 1)
+            current[j] = cost
+        if min(current[lo - 1:hi + 1]) > limit:
+            return too_far
+        before, previous = previous, current
+    return min(previous[-1], too_far)
+
+
+class Gazetteer:
+    """
+    Local name resolver for districts and dropping points. Exact and alias
+    keys resolve with a dict lookup, single typos through a deletion-variant
+    index (also a dict lookup), and anything else through a trigram
+    candidate search scored by trigram overlap and edit distance.
+    """
+
+    MIN_SCORE = 0.75
+    MAX_CANDIDATES = 25
+    # extract_route: "Dhaka theke" / "Dhaka hote" is "from Dhaka"
+    ORIGIN_POSTPOSITIONS = ("theke", "hote")
+    # extract_route confidence when the mentions don't settle the route
+    AMBIGUOUS_CONFIDENCE = 0.5
+
+    def __init__(self, catalog: Dict[str, Any]):
+        self.version = catalog.get("version")
+        self.entries: List[Dict[str, Any]] = []
+        self.exact: Dict[str, List[int]] = defaultdict(list)
+        self.grams: Dict[str, List[int]] = defaultdict(list)
+        self.gram_sets: List[frozenset] = []
+        self.deletes: Dict[str, List[int]] = defaultdict(list)
+
+        alias_groups = {normalize(name): group for group in DISTRICT_ALIASES for name in group}
+        for district in catalog.get("districts", []):
+            name = district.get("name")
+            if not name:
+                continue
+            spellings = alias_groups.get(normalize(name), [name])
+            self._add("district", name, None, [name] + spellings)
+            for point in district.get("dropping_points", []) or []:
+                if point.get("name"):
+                    self._add("point", point["name"], name, [point["name"]], price=point.get("price"))
+
+    def _add(self, kind: str, name: str, district: Optional[str], spellings: List[str], **extra):
+        keys = {normalize(s) for s in spellings} - {""}
+        for key in keys:
+            entry_id = len(self.entries)
+            self.entries.append({"kind": kind, "name": name, "district": district, "key": key, **extra})
+            self.exact[key].append(entry_id)
+            for variant in _deletions(key):
+                self.deletes[variant].append(entry_id)
+            grams = frozenset(_trigrams(key))
+            self.gram_sets.append(grams)
+            for gram in grams:
+                self.grams[gram].append(entry_id)
+
+    def _accept(self, entry, kind, district) -> bool:
+        if kind and entry["kind"] != kind:
+            return False
+        if district and entry["district"] and entry["district"].lower() != district.lower():
+            return False
+        return True
+
+    def lookup(self, text: str, kind: Optional[str] = None, district: Optional[str] = None, limit: int = 3):
+        """Ranked [{"name", "kind", "district", "score", ...}] for a single name mention."""
+        key = normalize(text)
+        if not key:
+            return []
+
+        results: Dict[Tuple[str, str, Optional[str]], Dict[str, Any]] = {}
+
+        def _offer(entry, score):
+            ident = (entry["kind"], entry["name"], entry["district"])
+            if ident not in results or results[ident]["score"] < score:
+                results[ident] = {k: v for k, v in entry.items() if k != "key"} | {"score": round(score, 3)}
+
+        for entry_id in self.exact.get(key, []):
+            if self._accept(self.entries[entry_id], kind, district):
+                _offer(self.entries[entry_id], 1.0)
+        if results:
+            return sorted(results.values(), key=lambda r: -r["score"])[:limit]
+
+        grams = _trigrams(key)
+
+        # One typo: the query and the name share a deletion variant
+        for variant in _deletions(key) | {key}:
+            for entry_id in self.exact.get(variant, []) + self.deletes.get(variant, []):
+                entry = self.entries[entry_id]
+                if not self._accept(entry, kind, district):
+                    continue
+                # Shared deletion variants also surface transpositions
+                distance = _edit_distance(key, entry["key"], limit=1)
+                score = 1 - distance / max(len(key), len(entry["key"]))
+                if distance <= 1 and score >= self.MIN_SCORE:
+                    _offer(entry, score)
+        if results:
+            return sorted(results.values(), key=lambda r: -r["score"])[:limit]
+
+        # Prefix filtering: a name within `max_edits` edits keeps all but
+        # 3 * max_edits of the query's trigrams, so it must share at least one
+        # of the rarest 3 * max_edits + 1 of them. Only those postings are read.
+        grams = _trigrams(key)
+        max_edits = max(1, len(key) // 6)
+        rarest = sorted(grams, key=lambda g: len(self.grams.get(g, ())))[: 3 * max_edits + 1]
+        overlap: Dict[int, int] = {}
+        for gram in rarest:
+            for entry_id in self.grams.get(gram, ()):
+                if entry_id not in overlap:
+                    overlap[entry_id] = len(grams & self.gram_sets[entry_id])
+        candidates = sorted(overlap, key=overlap.get, reverse=True)[: self.MAX_CANDIDATES * 4]
+
+        # Candidates in descending trigram overlap; stop once even a perfect
+        # edit-distance score couldn't beat what we already have.
+        best: List[float] = []
+        scored = 0
+        for entry_id in candidates:
+            entry = self.entries[entry_id]
+            if not self._accept(entry, kind, district):
+                continue
+            dice = 2 * overlap[entry_id] / (len(grams) + len(self.gram_sets[entry_id]))
+            ceiling = 0.4 * dice + 0.6
+            if ceiling < self.MIN_SCORE or (len(best) >= limit and ceiling <= best[limit - 1]):
+                break
+            scored += 1
+            if scored > self.MAX_CANDIDATES:
+                break
+            longest = max(len(key), len(entry["key"]))
+            distance = _edit_distance(key, entry["key"], limit=max_edits)
+            similarity = max(0.0, 1 - distance / longest)
+            score = 0.4 * dice + 0.6 * similarity
+            if score >= self.MIN_SCORE:
+                _offer(entry, score)
+                best = sorted(best + [score], reverse=True)
+
+        return sorted(results.values(), key=lambda r: -r["score"])[:limit]
+
+    def find_mentions(self, message: str, kind: Optional[str] = None, district: Optional[str] = None):
+        """
+        Scan free text for names (up to 3 words long), longest match first,
+        without overlaps. Returns mentions in message order with their position.
+        """
+        words = normalize(message).split()
+        taken = [False] * len(words)
+        mentions = []
+        for size in (3, 2, 1):
+            for start in range(len(words) - size + 1):
+                if any(taken[start:start + size]):
+                    continue
+                phrase = " ".join(words[start:start + size])
+                if len(phrase) < 3:
+                    continue
+                # Fuzzy matching only for single longer words; multi-word
+                # windows over ordinary text would match far too eagerly.
+                if size > 1 or len(phrase) < 4:
+                    hits = [
+                        self.entries[i] for i in self.exact.get(phrase, [])
+                        if self._accept(self.entries[i], kind, district)
+                    ]
+                    if not hits:
+                        continue
+                    best = {k: v for k, v in hits[0].items() if k != "key"} | {"score": 1.0}
+                else:
+                    found = self.lookup(phrase, kind, district, limit=1)
+                    if not found:
+                        continue
+                    best = found[0]
+                for i in range(start, start + size):
+                    taken[i] = True
+                mentions.append(dict(best, position=start, text=phrase))
+        return sorted(mentions, key=lambda m: m["position"])
+
+    def extract_route(self, message: str) -> Dict[str, Any]:
+        """
+        Best-effort from/to districts from a message, using cues when present
+        ("from X", "to X", and the Bangla postposition "X theke") and mention
+        order otherwise. A dropping point stands in for its district at a
+        small confidence discount. More than two places (a correction, "not
+        Dhaka, I meant ...") or the same district at both ends can't be read
+        off the words, so those come back at AMBIGUOUS_CONFIDENCE at most.
+        """
+        words = normalize(message).split()
+        mentions = []
+        for mention in self.find_mentions(message):
+            if mention["kind"] == "point":
+                mention = dict(mention, name=mention["district"], score=mention["score"] * 0.95)
+            mentions.append(mention)
+
+        origin = destination = None
+        for mention in mentions:
+            start = mention["position"]
+            end = start + len(mention["text"].split())
+            before = words[start - 1] if start > 0 else ""
+            after = words[end] if end < len(words) else ""
+            if (before == "from" or after in self.ORIGIN_POSTPOSITIONS) and origin is None:
+                origin = mention
+            elif before in ("to", "towards", "for") and destination is None:
+                destination = mention
+        rest = [m for m in mentions if m is not origin and m is not destination]
+        if origin is None and rest:
+            origin = rest.pop(0)
+        if destination is None and rest:
+            destination = rest.pop(0)
+
+        scores = [m["score"] for m in (origin, destination) if m]
+        confidence = min(scores) if len(scores) == 2 else 0.0
+        if len(mentions) > 2 or (len(scores) == 2 and origin["name"] == destination["name"]):
+            confidence = min(confidence, self.AMBIGUOUS_CONFIDENCE)
+        return {
+            "from_district": origin["name"] if origin else None,
+            "to_district": destination["name"] if destination else None,
+            "confidence": confidence,
+        }
+
+    def canonical(self, text: Optional[str], kind: str, district: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The single best entry for a name the LLM or user produced, if confident."""
+        if not text:
+            return None
+        found = self.lookup(text, kind=kind, district=district, limit=1)
+        return found[0] if found else None
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def _rebuild(catalog: Dict[str, Any]):
+    global _gazetteer
+    _gazetteer = Gazetteer(catalog)
+
+
+on_catalog_change(_rebuild)
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    if _gazetteer is None or _gazetteer.version != catalog.get("version"):
+        with _gazetteer_lock:
+            if _gazetteer is None or _gazetteer.version != catalog.get("version"):
+                _rebuild(catalog)
+    return _gazetteer
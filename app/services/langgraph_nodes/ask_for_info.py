@@ -2,13 +2,22 @@ import json
 from typing import Any, Dict, List, Optional
 
 from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection, bus_collection
-
-
-def _format_chat_history(chat: Optional[Dict[str, Any]]) -> str:
-    if not chat:
-        return "No prior conversation."
-    history = chat.get("chat", []) or []
+from app.services.model_router import chat_completion
+from app.services.catalog import get_catalog
+from app.services.gazetteer import get_gazetteer
+from app.services.route_planner import get_route_planner
+from app.services.schedules import (
+    has_schedules,
+    is_schedule_question,
+    parse_schedule_query,
+    search_departures,
+)
+
+# Local gazetteer matches at or above this confidence skip the LLM extraction
+LOCAL_ROUTE_CONFIDENCE = 0.85
+
+
+def _format_chat_history(history: List[Dict[str, Any]]) -> str:
     if not history:
         return "No prior conversation."
     lines: List[str] = []
@@ -44,8 +53,8 @@ LATEST USER MESSAGE:
 {user_message}
 """
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
+    resp = chat_completion(
+        "ask_for_info",
         response_format={"type": "json_object"},
         temperature=0,
         messages=[{"role": "user", "content": prompt}],
@@ -87,23 +96,66 @@ def _build_missing_message(missing_fields: List[str], district_names: List[str])
     return " ".join(prompts)
 
 
+def _format_itinerary(itinerary: Dict[str, Any]) -> str:
+    stops = [itinerary["path"][0]] + [
+        f"{leg['to']} ({', '.join(leg['providers'])})" for leg in itinerary["legs"]
+    ]
+    return " → ".join(stops) + f", from ৳{itinerary['total_fare']:g}"
+
+
+def _format_departures(
+    from_district: str,
+    to_district: str,
+    query: Dict[str, Any],
+    departures: List[Dict[str, Any]],
+) -> str:
+    when = query.get("date") or "the next few days"
+    if query.get("after") and query.get("before"):
+        when += f", {query['after']}–{query['before']}"
+    elif query.get("after"):
+        when += f", after {query['after']}"
+    elif query.get("before"):
+        when += f", before {query['before']}"
+
+    if not departures:
+        return (
+            f"I couldn't find a departure from {from_district} to {to_district} ({when}) "
+            "with enough free seats. Try another time or date?"
+        )
+
+    lines = [f"Departures from {from_district} to {to_district} ({when}):"]
+    for dep in departures:
+        fare = f", ৳{dep['fare']:g}" if isinstance(dep.get("fare"), (int, float)) else ""
+        lines.append(
+            f"- {dep['date']} {dep['departure']} {dep['provider']} ({dep.get('coach_type', 'non-ac')}{fare}): "
+            f"{dep['seats_left']} seats left"
+        )
+    lines.append("Tell me which one you'd like and I can book it.")
+    return "\n".join(lines)
+
+
 def _compose_info_message(
     from_district: str,
     to_district: str,
     providers: List[str],
     dropping_points: List[Dict[str, Any]],
+    connections: Optional[List[Dict[str, Any]]] = None,
+    schedules_known: bool = False,
 ) -> str:
-    lines = [f"Yes, buses operate from {from_district} to {to_district}."]
     if providers:
+        lines = [f"Yes, buses operate from {from_district} to {to_district}."]
         lines.append(
             "Available operators covering both districts: "
             + ", ".join(providers)
             + "."
         )
     else:
-        lines.append(
+        lines = [
             "I couldn't find a provider in our data that serves both districts directly."
-        )
+        ]
+        if connections:
+            lines.append("You can still get there with a connection:")
+            lines.extend(f"- {_format_itinerary(it)}" for it in connections)
 
     if dropping_points:
         fare_values = [dp.get("price") for dp in dropping_points if isinstance(dp.get("price"), (int, float))]
@@ -118,7 +170,10 @@ def _compose_info_message(
                 f"Fares typically range from ৳{min(fare_values)} to ৳{max(fare_values)} per seat."
             )
 
-    lines.append("Let me know if you need schedules or seat availability details.")
+    if schedules_known:
+        lines.append("Let me know if you need schedules or seat availability details.")
+    else:
+        lines.append("I don't have departure times for this route yet.")
     return "\n".join(lines)
 
 
@@ -150,15 +205,15 @@ Rules:
 - Keep the response short and natural. Do NOT respond in JSON.
 """
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
+    resp = chat_completion(
+        "ask_for_info_fallback",
         messages=[{"role": "user", "content": prompt}],
     )
     return resp.choices[0].message.content.strip()
 
 
 def ask_for_info(state: ChatState):
-    dataset = bus_collection.find_one({}, {"districts": 1, "bus_providers": 1})
+    dataset = get_catalog()
     if not dataset:
         state.result = "Sorry, I couldn't load the route information right now. Please try again later."
         return state
@@ -167,19 +222,29 @@ def ask_for_info(state: ChatState):
     bus_providers = dataset.get("bus_providers", []) or []
     district_names = [d.get("name") for d in districts if d.get("name")]
 
-    chat = chat_collection.find_one({"thread_id": state.thread_id}, {"chat": {"$slice": -10}})
-    chat_history_text = _format_chat_history(chat)
+    gazetteer = get_gazetteer()
+    route_data = gazetteer.extract_route(state.user_message) if gazetteer else {}
 
-    try:
-        route_data = _extract_route_fields(state.user_message, chat_history_text, district_names)
-    except Exception:
-        state.result = _fallback_freeform_response(state.user_message, dataset, chat_history_text)
-        return state
+    if route_data.get("confidence", 0) < LOCAL_ROUTE_CONFIDENCE:
+        chat_history_text = _format_chat_history(state.history)
+
+        try:
+            route_data = _extract_route_fields(state.user_message, chat_history_text, district_names)
+        except Exception:
+            state.result = _fallback_freeform_response(state.user_message, dataset, chat_history_text)
+            return state
 
     missing_fields = route_data.get("missing_fields") or []
     from_district = route_data.get("from_district")
     to_district = route_data.get("to_district")
 
+    # Map whatever spelling came back onto the catalog's names
+    if gazetteer:
+        from_match = gazetteer.canonical(from_district, kind="district")
+        to_match = gazetteer.canonical(to_district, kind="district")
+        from_district = from_match["name"] if from_match else from_district
+        to_district = to_match["name"] if to_match else to_district
+
     if missing_fields or not (from_district and to_district):
         state.result = _build_missing_message(missing_fields, district_names)
         return state
@@ -193,6 +258,21 @@ def ask_for_info(state: ChatState):
         [],
     )
 
+    # Departure times and live seat counts come from the schedules collection,
+    # never from the LLM
+    schedules_known = has_schedules(from_district, to_district)
+    if schedules_known and is_schedule_question(state.user_message):
+        query = parse_schedule_query(state.user_message)
+        departures = search_departures(from_district, to_district, **query)
+        state.result = _format_departures(from_district, to_district, query, departures)
+        return state
+
     providers = _matching_providers(bus_providers, from_district, to_district)
-    state.result = _compose_info_message(from_district, to_district, providers, dropping_points)
+    connections = None
+    if not providers:
+        planner = get_route_planner()
+        connections = planner.itineraries(from_district, to_district) if planner else None
+    state.result = _compose_info_message(
+        from_district, to_district, providers, dropping_points, connections, schedules_known
+    )
     return state
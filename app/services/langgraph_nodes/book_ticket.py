@@ -1,9 +1,45 @@
 from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection, db, bus_collection
+from app.services.booking_rollups import record_booking
+from app.services.bookings_store import insert_booking
+from app.services.model_router import chat_completion
+from app.services.catalog import canonical_provider, get_catalog
+from app.services.gazetteer import get_gazetteer
+from app.services.schedules import release_seats, reserve_seats, route_has_departures
+from app.utils.clock import local_today
 from datetime import datetime
 import uuid
 
 
+def _resolved_locations(gazetteer, user_message: str) -> str:
+    """Catalog names the gazetteer found in the message, as a hint for the LLM."""
+    lines = []
+    for m in gazetteer.find_mentions(user_message) if gazetteer else []:
+        if m["kind"] == "district":
+            lines.append(f"- \"{m['text']}\" = district {m['name']}")
+        else:
+            lines.append(f"- \"{m['text']}\" = dropping point {m['name']} in {m['district']} (৳{m.get('price')})")
+    return "\n".join(lines) or "None detected"
+
+
+def _canonicalize_booking(gazetteer, data: dict) -> dict:
+    """Snap LLM-produced names onto catalog names and take the fare from the catalog."""
+    # Seat reservations match the provider's catalog spelling exactly
+    provider = canonical_provider(data.get("bus_provider"))
+    if provider:
+        data["bus_provider"] = provider
+    if not gazetteer:
+        return data
+    for field in ("district_from", "district_to"):
+        match = gazetteer.canonical(data.get(field), kind="district")
+        if match:
+            data[field] = match["name"]
+    for field, district_field in (("pickup_point", "district_from"), ("dropping_point", "district_to")):
+        match = gazetteer.canonical(data.get(field), kind="point", district=data.get(district_field))
+        if match:
+            data[field] = match["name"]
+            if field == "dropping_point" and isinstance(match.get("price"), (int, float)):
+                data["fare"] = match["price"]
+    return data
 
 
 def book_ticket(state: ChatState):
@@ -12,11 +48,10 @@ def book_ticket(state: ChatState):
     """
     import json
     
-    thread_id = state.thread_id
     user_message = state.user_message
     
-    # Fetch dataset from MongoDB
-    dataset = bus_collection.find_one({}, {"districts": 1, "bus_providers": 1})
+    # Fetch catalog (cached in memory per version)
+    dataset = get_catalog()
     if not dataset:
         state.result = "Sorry, the booking system is currently unavailable."
         return state
@@ -24,18 +59,9 @@ def book_ticket(state: ChatState):
     districts = dataset.get("districts", [])
     bus_providers = dataset.get("bus_providers", [])
     
-    # Fetch chat history
-    chat_doc = chat_collection.find_one(
-        {"thread_id": thread_id},
-        {"chat": 1, "booking_data": 1}
-    )
-    
-    if not chat_doc:
-        state.result = "Sorry, I couldn't find your conversation history."
-        return state
-    
-    chat_history = chat_doc.get("chat", [])
-    existing_booking_data = chat_doc.get("booking_data", {})
+    # Chat history and the booking collected so far come from the checkpointed state
+    chat_history = state.history
+    existing_booking_data = state.booking_data or {}
     
     # Format chat history
     formatted_history = "\n".join([
@@ -43,6 +69,8 @@ def book_ticket(state: ChatState):
         for msg in chat_history[-15:]
     ])
     
+    gazetteer = get_gazetteer()
+
     # Format dataset for LLM
     dataset_info = {
         "districts": districts,
@@ -53,7 +81,7 @@ def book_ticket(state: ChatState):
     main_prompt = f"""
 You are an intelligent booking assistant. Handle the entire booking conversation naturally.
 
-CURRENT DATE: {datetime.utcnow().strftime('%Y-%m-%d')}
+CURRENT DATE: {local_today()}
 
 AVAILABLE DATA:
 {json.dumps(dataset_info, indent=2)}
@@ -67,6 +95,9 @@ CURRENT BOOKING DATA (if any):
 USER'S CURRENT MESSAGE:
 {user_message}
 
+LOCATIONS RECOGNISED IN THE MESSAGE (already matched to our catalog):
+{_resolved_locations(gazetteer, user_message)}
+
 YOUR TASK:
 1. Analyze the conversation and current booking data
 2. Extract any new information from the user's message
@@ -87,6 +118,7 @@ BOOKING FIELDS NEEDED:
 - date: Travel date (YYYY-MM-DD format)
 - seats: Number of seats (integer)
 - fare: Price per seat (auto-calculated from dropping_point)
+- departure: Departure time HH:MM (optional, only if the user picked one)
 
 IMPORTANT RULES:
 - District names like "Dhaka", "Bogra" are NOT pickup/dropping points
@@ -111,7 +143,8 @@ RESPONSE FORMAT (JSON):
         "phone": "value or null",
         "date": "YYYY-MM-DD or null",
         "seats": number or null,
-        "fare": number or null
+        "fare": number or null,
+        "departure": "HH:MM or null"
     }},
     "response_to_user": "Your natural conversational response here"
 }}
@@ -125,8 +158,8 @@ Return ONLY the JSON response, nothing else.
 """
     
     try:
-        llm_response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        llm_response = chat_completion(
+            "book_ticket",
             messages=[{"role": "user", "content": main_prompt}],
             temperature=0.3
         )
@@ -141,40 +174,75 @@ Return ONLY the JSON response, nothing else.
         llm_data = json.loads(response_text)
         
         action = llm_data.get("action")
-        updated_booking_data = llm_data.get("updated_booking_data", {})
+        updated_booking_data = _canonicalize_booking(gazetteer, llm_data.get("updated_booking_data", {}) or {})
         response_to_user = llm_data.get("response_to_user", "")
         
         # Handle based on action
         if action == "complete_booking":
-            # Create booking record
-            booking_id = str(uuid.uuid4())
-            booking_record = {
-                "booking_id": booking_id,
-                "user_id": updated_booking_data.get("user_id"),
-                "name": updated_booking_data.get("name"),
-                "phone": updated_booking_data.get("phone"),
-                "district_from": updated_booking_data.get("district_from"),
-                "district_to": updated_booking_data.get("district_to"),
-                "pickup_point": updated_booking_data.get("pickup_point"),
-                "dropping_point": updated_booking_data.get("dropping_point"),
-                "date": updated_booking_data.get("date"),
-                "seats": updated_booking_data.get("seats"),
-                "bus_provider": updated_booking_data.get("bus_provider"),
-                "fare": updated_booking_data.get("fare"),
-                "total_amount": updated_booking_data.get("fare", 0) * updated_booking_data.get("seats", 0),
-                "pyment_status": "pending",
-                "status": "confirmed",
-                "booked_at": datetime.utcnow()
-            }
+            # Routes with a timetable hold real seats: take them atomically on
+            # the chosen (or earliest) departure with room before booking
+            schedule = None
+            route = (
+                updated_booking_data.get("bus_provider"),
+                updated_booking_data.get("district_from"),
+                updated_booking_data.get("district_to"),
+                updated_booking_data.get("date"),
+            )
+            seats = int(updated_booking_data.get("seats") or 1)
+            if all(route) and route_has_departures(*route):
+                schedule = reserve_seats(
+                    *route,
+                    seats=seats,
+                    departure=updated_booking_data.get("departure"),
+                )
+                if schedule is None:
+                    state.booking_data = updated_booking_data
+                    state.result = (
+                        f"Sorry, {route[0]} has no departure on {route[3]} with "
+                        f"{updated_booking_data.get('seats')} free seats. "
+                        "Would you like another date or operator?"
+                    )
+                    return state
+
+            # Seats taken above go back if the booking can't be written
+            try:
+                # Create booking record
+                booking_id = str(uuid.uuid4())
+                booking_record = {
+                    "booking_id": booking_id,
+                    "user_id": updated_booking_data.get("user_id"),
+                    # Where operator notices (cancelled / moved trip) are delivered
+                    "thread_id": state.thread_id,
+                    "name": updated_booking_data.get("name"),
+                    "phone": updated_booking_data.get("phone"),
+                    "district_from": updated_booking_data.get("district_from"),
+                    "district_to": updated_booking_data.get("district_to"),
+                    "pickup_point": updated_booking_data.get("pickup_point"),
+                    "dropping_point": updated_booking_data.get("dropping_point"),
+                    "date": updated_booking_data.get("date"),
+                    "seats": updated_booking_data.get("seats"),
+                    "bus_provider": updated_booking_data.get("bus_provider"),
+                    "fare": updated_booking_data.get("fare"),
+                    "total_amount": updated_booking_data.get("fare", 0) * updated_booking_data.get("seats", 0),
+                    "payment_status": "pending",
+                    "status": "confirmed",
+                    "booked_at": datetime.utcnow()
+                }
+                if schedule:
+                    booking_record["schedule_id"] = schedule["_id"]
+                    booking_record["departure"] = schedule["departure"]
+                    booking_record["coach_type"] = schedule.get("coach_type")
             
-            # Save to database
-            db["bookings"].insert_one(booking_record)
+                # Save to database
+                insert_booking(booking_record)
+            except Exception:
+                if schedule:
+                    release_seats(schedule["_id"], seats)
+                raise
+            record_booking(booking_record)
             
             # Clear booking data
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$unset": {"booking_data": ""}}
-            )
+            state.booking_data = None
             
             state.result = f"""
 ✅ Booking Confirmed!
@@ -187,21 +255,18 @@ Return ONLY the JSON response, nothing else.
 📍  District To: {booking_record['district_to']}
 🔵 Pickup Point: {booking_record['pickup_point']}
 🔴 Dropping Point: {booking_record['dropping_point']}
-📅 Date: {booking_record['date']}
+📅 Date: {booking_record['date']}{' ' + booking_record['departure'] if booking_record.get('departure') else ''}
 💺 Seats: {booking_record['seats']}
 💰 Fare per seat: ৳{booking_record['fare']}
 💵 Total Amount: ৳{booking_record['total_amount']}
-💵 payment Status: {booking_record['pyment_status']}
+💵 payment Status: {booking_record['payment_status']}
 
 Your ticket has been successfully booked! 🎉
 """
         
         else:
             # Save updated booking data
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$set": {"booking_data": updated_booking_data}}
-            )
+            state.booking_data = updated_booking_data
             
             state.result = response_to_user
         
@@ -1,29 +1,33 @@
 from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection, db
+from app.services.booking_rollups import record_cancellation
+from app.services.bookings_store import find_booking, find_bookings, update_booking
+from app.services.model_router import chat_completion
+from app.services.payments import CANCEL_PAYMENT_STATUS, refund_note
+from app.services.schedules import release_seats
+from app.utils.clock import local_today
 from datetime import datetime
+import re
 
+# Upcoming bookings offered when the user gave no booking ID or date
+CANCEL_OPTIONS_LIMIT = 10
 
+# Whole words only ("ok" must not match inside "booking")
+_DECLINE = re.compile(r"\b(no|nope|keep|don'?t|do not|not now)\b")
+_CONFIRM = re.compile(r"\b(yes|yeah|yep|confirm|cancel it|proceed|ok|okay|sure|definitely)\b")
+# "yes, I don't need it anymore" is a yes; "yes, keep it" is not
+_LEADING_CONFIRM = re.compile(r"^\W*(yes|yeah|yep|confirm|proceed|ok|okay|sure|definitely)\b")
+_KEEP = re.compile(r"\bkeep\b|\b(don'?t|do not) cancel\b")
 
 
 def cancel_ticket(state: ChatState):
     """
     Cancel a ticket using phone number and booking ID or date
     """
-    thread_id = state.thread_id
     user_message = state.user_message.lower()
     
-    # Fetch chat history
-    chat_doc = chat_collection.find_one(
-        {"thread_id": thread_id},
-        {"chat": 1, "cancel_data": 1}
-    )
-    
-    if not chat_doc:
-        state.result = "Sorry, I couldn't find your conversation history."
-        return state
-    
-    chat_history = chat_doc.get("chat", [])
-    cancel_data = chat_doc.get("cancel_data", {})
+    # Chat history and the in-progress cancellation come from the checkpointed state
+    chat_history = state.history
+    cancel_data = dict(state.cancel_data or {})
     
     # Format chat history for LLM
     formatted_history = "\n".join([
@@ -31,31 +35,63 @@ def cancel_ticket(state: ChatState):
         for msg in chat_history[-10:]
     ])
     
-    # Check if user is confirming cancellation
-    confirmation_keywords = ["yes", "confirm", "cancel it", "proceed", "ok", "sure", "definitely"]
-    is_confirming = any(keyword in user_message for keyword in confirmation_keywords)
-    
+    is_declining = _DECLINE.search(user_message) is not None
+    is_confirming = _CONFIRM.search(user_message) is not None
+    if is_declining and is_confirming:
+        # Both readings: a leading yes settles it unless the rest says to keep the ticket
+        if _LEADING_CONFIRM.search(user_message) and not _KEEP.search(user_message):
+            is_declining = False
+        elif _KEEP.search(user_message):
+            is_confirming = False
+
+    if cancel_data.get("awaiting_confirmation") and is_declining and is_confirming:
+        state.result = (
+            f"Just to be sure: should I cancel booking {cancel_data.get('booking_id')}? "
+            "Reply \"yes\" to cancel it or \"no\" to keep it."
+        )
+        return state
+
+    # Declining keeps the booking and ends the cancellation flow
+    if cancel_data.get("awaiting_confirmation") and is_declining:
+        state.cancel_data = None
+        state.result = f"No problem, your booking {cancel_data.get('booking_id')} is still active."
+        return state
+
     # If awaiting confirmation and user confirms
     if cancel_data.get("awaiting_confirmation") and is_confirming:
         booking_id = cancel_data.get("booking_id")
         
-        # Update booking status to cancelled
-        result = db["bookings"].update_one(
-            {"booking_id": booking_id},
-            {
-                "$set": {
-                    "status": "cancelled",
-                    "cancelled_at": datetime.utcnow()
+        # Update booking status to cancelled; a paid booking's money goes back
+        # Only while still confirmed: an operator may have cancelled the trip meanwhile
+        result = update_booking(
+            {"booking_id": booking_id, "status": "confirmed"},
+            [
+                {
+                    "$set": {
+                        "status": "cancelled",
+                        "cancelled_at": datetime.utcnow(),
+                        "payment_status": CANCEL_PAYMENT_STATUS,
+                    }
                 }
-            }
+            ]
         )
         
         if result.modified_count > 0:
-            # Clear cancel_data
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$unset": {"cancel_data": ""}}
+            booking = find_booking(
+                {"booking_id": booking_id},
+                projection={
+                    "schedule_id": 1, "seats": 1, "total_amount": 1, "date": 1,
+                    "bus_provider": 1, "district_from": 1, "district_to": 1, "payment_status": 1,
+                },
             )
+            if booking:
+                record_cancellation(booking)
+                # Give the seats back to the departure they were taken from
+                if booking.get("schedule_id"):
+                    release_seats(booking["schedule_id"], int(booking.get("seats") or 1))
+
+            # Clear cancel_data
+            state.cancel_data = None
             
             state.result = f"""
 ✅ Ticket Cancelled Successfully!
@@ -64,7 +100,7 @@ Booking ID: {booking_id}
 Status: CANCELLED
 Cancelled at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}
 
-Your ticket has been cancelled. If you paid online, the refund will be processed within 5-7 business days.
+Your ticket has been cancelled. {refund_note((booking or {}).get('payment_status'))}
 """
             return state
         else:
@@ -93,7 +129,7 @@ RULES:
 1. Booking ID takes priority over date for identification
 2. Only extract clearly stated information
 3. Use existing data if not provided again
-4. Today's date is {datetime.utcnow().strftime('%Y-%m-%d')}
+4. Today's date is {local_today()}
 
 Return ONLY a JSON object:
 {{
@@ -105,8 +141,8 @@ Return ONLY a JSON object:
     
     try:
         import json
-        extraction_response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        extraction_response = chat_completion(
+            "cancel_ticket",
             messages=[{"role": "user", "content": extraction_prompt}],
             temperature=0
         )
@@ -137,13 +173,7 @@ Please provide:
         if not cancel_data.get("booking_id") and not cancel_data.get("date"):
             # Show user's tickets to help them choose
             phone = cancel_data.get("phone")
-            bookings = list(db["bookings"].find(
-                {
-                    "phone": {"$regex": phone.replace("+", "\\+"), "$options": "i"},
-                    "status": "confirmed"
-                },
-                {"_id": 0}
-            ).sort("booked_at", -1))
+            bookings = find_bookings({"status": "confirmed"}, phone=phone, upcoming_only=True, limit=CANCEL_OPTIONS_LIMIT)
             
             if not bookings:
                 state.result = f"""
@@ -170,10 +200,7 @@ Please check if:
             tickets_display = "\n".join(ticket_list)
             
             # Store phone for next interaction
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$set": {"cancel_data": cancel_data}}
-            )
+            state.cancel_data = cancel_data
             
             state.result = f"""
 📱 Active tickets for {phone}:
@@ -187,7 +214,7 @@ Please provide either:
             return state
         
         # Find the booking
-        query = {"phone": {"$regex": cancel_data["phone"].replace("+", "\\+"), "$options": "i"}}
+        query = {}
         
         if cancel_data.get("booking_id"):
             query["booking_id"] = cancel_data["booking_id"]
@@ -196,7 +223,7 @@ Please provide either:
         
         query["status"] = "confirmed"  # Only cancel confirmed tickets
         
-        booking = db["bookings"].find_one(query, {"_id": 0})
+        booking = find_booking(query, phone=cancel_data["phone"], upcoming_only=True)
         
         if not booking:
             state.result = """
@@ -210,20 +237,14 @@ Possible reasons:
 Please verify your information and try again.
 """
             # Clear cancel data
-            chat_collection.update_one(
-                {"thread_id": thread_id},
-                {"$unset": {"cancel_data": ""}}
-            )
+            state.cancel_data = None
             return state
         
         # Ask for confirmation
         cancel_data["booking_id"] = booking.get("booking_id")
         cancel_data["awaiting_confirmation"] = True
         
-        chat_collection.update_one(
-            {"thread_id": thread_id},
-            {"$set": {"cancel_data": cancel_data}}
-        )
+        state.cancel_data = cancel_data
         
         state.result = f"""
 ⚠️ Confirm Ticket Cancellation
@@ -238,7 +259,7 @@ Please verify your information and try again.
 💺 Seats: {booking.get('seats')}
 💰 Fare per seat: ৳{booking.get('fare')}
 💵 Total Amount: ৳{booking.get('total_amount')}
-💵 payment Status: {booking.get('pyment_status')}
+💵 payment Status: {booking.get('payment_status')}
 🕐 Booked: {booking.get('booked_at', 'N/A')}
 
 Are you sure you want to cancel this ticket?
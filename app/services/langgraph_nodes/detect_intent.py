@@ -1,9 +1,9 @@
 from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection
+from app.services.model_router import chat_completion
 
 
 def detect_intent(state: ChatState):
-    chat = chat_collection.find_one({"thread_id": state.thread_id}, {"chat": {"$slice": -10}})
+    chat = state.history[-10:]
 
     prompt = f"""
 You are a bus ticket booking assistant.
@@ -31,8 +31,8 @@ Output:
 Return ONLY the intent name, nothing else.
 """
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
+    resp = chat_completion(
+        "detect_intent",
         messages=[{"role": "user", "content": prompt}]
     )
     state.intent = resp.choices[0].message.content.strip()
@@ -0,0 +1,14 @@
+from app.schemas.chat_schema import ChatState
+
+# Turns kept in the checkpointed state; nodes look at no more than this
+HISTORY_TURNS = 15
+
+
+def finish_turn(state: ChatState):
+    """
+    Record the finished turn in the graph state so the next turn's nodes
+    (and route_turn) see it without reading the chat document.
+    """
+    state.history = (state.history + [{"user": state.user_message, "bot": state.result}])[-HISTORY_TURNS:]
+    state.last_intent = state.intent
+    return state
@@ -1,5 +1,5 @@
 from app.schemas.chat_schema import ChatState
-from app.config import client
+from app.services.model_router import chat_completion
 
 def general_chat(state: ChatState):
     """Handles general conversation, greetings, and thank you messages"""
@@ -18,8 +18,8 @@ Respond naturally and warmly. If they:
 Keep it brief and friendly.
 """
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
+    resp = chat_completion(
+        "general_chat",
         messages=[{"role": "user", "content": prompt}]
     )
     
@@ -1,28 +1,51 @@
 from app.schemas.chat_schema import ChatState
-from app.config import client
+from app.services.model_router import chat_completion
 from app.services.load_to_pinecone import get_index
+from app.services.provider_facts import answer_fact_question
+from app.services.provider_retriever import get_provider_retriever
+from app.utils.embed_batcher import embedder
 
-index = get_index()
+
+class _LazyIndex:
+    """The Pinecone index, connected on first query, so importing the graph needs no network."""
+
+    _index = None
+
+    def query(self, **kwargs):
+        if self._index is None:
+            self._index = get_index()
+        return self._index.query(**kwargs)
+
+
+index = _LazyIndex()
 
 def embed(text: str):
-    res = client.embeddings.create(
-        model="text-embedding-3-large",
-        input=text
-    )
-    return res.data[0].embedding
+    # Batched with other turns' embeddings
+    return embedder.embed(text)
 
 def provider_info(state: ChatState):
     query = state.user_message
 
     try:
-        vector = embed(query)
-        results = index.query(vector=vector, top_k=1, include_metadata=True)
+        retriever = get_provider_retriever()
+
+        # Hotline / address / email / policy link: straight from the fact store
+        fact_answer = answer_fact_question(query, retriever.match_providers(query))
+        if fact_answer:
+            state.result = fact_answer
+            return state
+
+        # Provider names resolve locally; only open questions pay for an embedding
+        matches = retriever.retrieve(query, embed_fn=embed, index=index)
 
-        if not results["matches"]:
+        if not matches:
             state.result = "No relevant information found for this provider."
             return state
 
-        text_blocks = [m["metadata"].get("text", "") for m in results["matches"]]
+        text_blocks = [
+            f"[{m.get('provider', '').title()} - {m.get('section', '')}] {m['text']}"
+            for m in matches
+        ]
         context_str = "\n\n".join(text_blocks)
 
         prompt = f"""
@@ -36,8 +59,8 @@ User Query:
 
 Answer:
 """
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
+        completion = chat_completion(
+            "provider_info",
             messages=[
                 {"role": "system", "content": "Answer based only on the provided context."},
                 {"role": "user", "content": prompt}
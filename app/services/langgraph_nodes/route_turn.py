@@ -0,0 +1,61 @@
+import re
+from app.schemas.chat_schema import ChatState
+from app.utils import metrics
+
+# Giving up on the flow. A bare "stop" is a boarding stop ("drop me at the
+# Gabtoli stop") unless it is the whole message or says what to stop.
+_ABANDON = (
+    r"\b(never ?mind|forget it|start over|exit|quit)\b"
+    r"|^\W*stop\W*$|\bstop (this|it|that|now|booking|cancell?ing)\b"
+)
+# Asking about a provider rather than answering the flow's question; a
+# passenger's own contact or address ("my address is ...") stays in the flow
+_PROVIDER_QUESTION = (
+    r"\b(hotline|privacy)\b"
+    r"|\bcontact (the |their |your )?(provider|operator|company|office|counter|support)\b"
+    r"|(?<!\bmy )\b(contact|office|counter) (number|details|address|info(rmation)?)\b(?!\W*\+?\d)"
+    r"|\b(their|its|provider'?s?|operator'?s?|company'?s?|head|office|counter) (address|contact|phone)\b"
+    r"|\b(what|where)('?s| is) (the|their|its) (office |counter )?address\b"
+    r"|\b(address|contact|phone) (of|for) (?!me\b)"
+)
+
+# Explicit topic changes that should break out of an in-progress workflow
+_ESCAPES = {
+    "book_ticket": re.compile(
+        r"\b(cancel|view|show|see|check)\b.*\btickets?\b|\bmy tickets?\b|\bcancel\b"
+        rf"|{_ABANDON}|{_PROVIDER_QUESTION}",
+        re.IGNORECASE,
+    ),
+    "cancel_ticket": re.compile(
+        r"\bbook\b|\b(view|show|see)\b.*\btickets?\b"
+        rf"|{_ABANDON}|{_PROVIDER_QUESTION}",
+        re.IGNORECASE,
+    ),
+}
+
+
+def sticky_intent(state: ChatState):
+    """
+    The workflow node this turn continues, or None when detect_intent has to
+    decide. A booking or cancellation that the previous turn was working on
+    keeps going to its node unless the message clearly changes the subject.
+    """
+    in_progress = {
+        "book_ticket": bool(state.booking_data),
+        "cancel_ticket": bool(state.cancel_data),
+    }
+    active = state.last_intent
+    # Only the flow the previous turn was in; one the user stepped away from
+    # waits for detect_intent
+    if not in_progress.get(active):
+        return None
+    if _ESCAPES[active].search(state.user_message or ""):
+        metrics.inc("sticky_route_escape_total", flow=active)
+        return None
+    metrics.inc("sticky_route_total", flow=active)
+    return active
+
+
+def route_turn(state: ChatState):
+    state.intent = sticky_intent(state)
+    return state
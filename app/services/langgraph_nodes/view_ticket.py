@@ -1,28 +1,20 @@
 from app.schemas.chat_schema import ChatState
-from app.config import client, chat_collection, db
-
+from app.services.bookings_store import find_bookings, phone_key
+from app.services.model_router import chat_completion
 
+# Most recent bookings shown for one phone number
+VIEW_TICKET_LIMIT = 20
 
 
 def view_ticket(state: ChatState):
     """
     View user's booked tickets by phone number
     """
-    thread_id = state.thread_id
     user_message = state.user_message
     
-    # Fetch chat history
-    chat_doc = chat_collection.find_one(
-        {"thread_id": thread_id},
-        {"chat": 1, "view_ticket_phone": 1}
-    )
-    
-    if not chat_doc:
-        state.result = "Sorry, I couldn't find your conversation history."
-        return state
-    
-    chat_history = chat_doc.get("chat", [])
-    stored_phone = chat_doc.get("view_ticket_phone")
+    # Chat history and the remembered phone come from the checkpointed state
+    chat_history = state.history
+    stored_phone = state.view_ticket_phone
     
     # Format chat history for LLM
     formatted_history = "\n".join([
@@ -54,15 +46,16 @@ Examples:
 """
     
     try:
-        extraction_response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        extraction_response = chat_completion(
+            "view_ticket",
             messages=[{"role": "user", "content": extraction_prompt}],
             temperature=0
         )
         
         phone = extraction_response.choices[0].message.content.strip()
         
-        if phone == "NOT_FOUND" or not phone:
+        # Anything without digits can't be matched to bookings
+        if phone == "NOT_FOUND" or not phone_key(phone):
             state.result = """
 I need your phone number to retrieve your tickets.
 
@@ -72,16 +65,10 @@ Example: 01712345678 or +8801712345678
             return state
         
         # Store phone for future reference
-        chat_collection.update_one(
-            {"thread_id": thread_id},
-            {"$set": {"view_ticket_phone": phone}}
-        )
+        state.view_ticket_phone = phone
         
         # Search for bookings with this phone number
-        bookings = list(db["bookings"].find(
-            {"phone": {"$regex": phone.replace("+", "\\+"), "$options": "i"}},
-            {"_id": 0}
-        ).sort("booked_at", -1))
+        bookings = find_bookings({}, phone=phone, limit=VIEW_TICKET_LIMIT)
         
         if not bookings:
             state.result = f"""
@@ -110,7 +97,7 @@ Please check if:
 💺 Seats: {booking.get('seats')}
 💰 Fare per seat: ৳{booking.get('fare')}
 💵 Total Amount: ৳{booking.get('total_amount')}
-💵 payment Status: {booking.get('pyment_status')}
+💵 payment Status: {booking.get('payment_status')}
 🕐 Booked: {booking.get('booked_at', 'N/A')}
 """
             ticket_list.append(ticket_info)
@@ -121,7 +108,7 @@ Please check if:
 
 {tickets_display}
 
-Total tickets: {len(bookings)}
+{f"Showing your {VIEW_TICKET_LIMIT} most recent tickets." if len(bookings) >= VIEW_TICKET_LIMIT else f"Total tickets: {len(bookings)}"}
 
 To cancel a ticket, please provide the booking ID.
 """
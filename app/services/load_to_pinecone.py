@@ -1,16 +1,15 @@
 import os
-import json
+import re
+import hashlib
 from dotenv import load_dotenv
 from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
+from app.utils.embed_batcher import embedder
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = os.getenv("PINECONE_INDEX")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
 pc = Pinecone(api_key=PINECONE_API_KEY)
 
 
@@ -28,13 +27,9 @@ def init_index():
 def get_index():
     return init_index()
 
-# ---------- Helper: embed text ---------- #
+# ---------- Helper: embed text (micro-batched, see app/utils/embed_batcher.py) ---------- #
 def embed_text(text: str):
-    response = client.embeddings.create(
-        model="text-embedding-3-large",
-        input=text
-    )
-    return response.data[0].embedding
+    return embedder.embed(text)
 
 
 # ---------- Load all .txt files ---------- #
@@ -53,43 +48,135 @@ def load_files(folder="data"):
     return docs
 
 
-# ---------- Main function: upload only missing embeddings ---------- #
+# ---------- Split provider documents into sections ---------- #
+CHUNK_MAX_CHARS = 800
+_LABEL_RE = re.compile(r"^([A-Z][A-Za-z /&-]{1,40}):\s*(.+)$")
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "section"
+
+
+def _split_long(text: str, max_chars: int = CHUNK_MAX_CHARS):
+    if len(text) <= max_chars:
+        return [text]
+    parts, current = [], ""
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_sections(text: str):
+    """
+    Returns (section_name, text) pairs. "Label: value" lines become their own
+    section named after the label, a short line without punctuation is a
+    heading for the paragraphs after it, anything else is body text.
+    """
+    sections = []
+    heading = "overview"
+    body_count = 0
+    for block in re.split(r"\n\s*\n", text.strip()):
+        lines = [line.strip() for line in block.splitlines() if line.strip()]
+        if not lines:
+            continue
+        labelled = [_LABEL_RE.match(line) for line in lines]
+        if all(labelled):
+            for match in labelled:
+                sections.append((_slug(match.group(1)), f"{match.group(1)}: {match.group(2)}"))
+            continue
+        if len(lines) == 1 and len(lines[0]) < 80 and not lines[0].endswith((".", "?", "!")):
+            heading = _slug(lines[0])
+            body_count = 0
+            continue
+        name = heading if body_count == 0 else f"{heading}-{body_count}"
+        sections.append((name, " ".join(lines)))
+        body_count += 1
+    return sections
+
+
+def load_chunks(folder="data"):
+    """
+    Section-level chunks with stable IDs: `<provider>#<section>-<n>`. The
+    provider name is the file name without extension, e.g. "green line".
+    `sha` is the chunk text's sha256, so an edited section gets re-embedded.
+    """
+    chunks = []
+    for doc in load_files(folder):
+        provider = os.path.splitext(doc["id"])[0].lower()
+        for section, section_text in split_sections(doc["text"]):
+            for n, part in enumerate(_split_long(section_text)):
+                chunks.append({
+                    "id": f"{_slug(provider)}#{section}-{n}",
+                    "provider": provider,
+                    "section": section,
+                    "source": doc["id"],
+                    "text": part,
+                    "sha": hashlib.sha256(part.encode("utf-8")).hexdigest(),
+                })
+    return chunks
+
+
+# ---------- Main function: upload new or edited chunks, drop stale ones ---------- #
 def upload_embeddings_if_missing():
     index = init_index()
 
-    docs = load_files()
-    all_ids = [doc["id"] for doc in docs]
+    docs = load_chunks()
+    all_ids = {doc["id"] for doc in docs}
 
-    # Fetch which IDs already exist
-    # (Pinecone only supports describe in batches)
-    existing = set()
-
-    # Batch check (safe for large sets)
+    # sha of the text each stored chunk was embedded from
+    # (Pinecone fetch takes a limited number of IDs per call)
+    stored = {}
     BATCH = 100
-    for i in range(0, len(all_ids), BATCH):
-        batch = all_ids[i:i+BATCH]
-        res = index.fetch(batch)
-        existing.update(res.vectors.keys())
-
-    to_upload = [d for d in docs if d["id"] not in existing]
+    ids = sorted(all_ids)
+    for i in range(0, len(ids), BATCH):
+        res = index.fetch(ids[i:i+BATCH])
+        for vector_id, vector in res.vectors.items():
+            stored[vector_id] = (vector.metadata or {}).get("sha")
+
+    # IDs no longer produced: sections that shrank or went away, removed
+    # files, and whole-file vectors from before section chunking
+    stale = [
+        vector_id
+        for page in index.list()
+        for vector_id in page
+        if vector_id not in all_ids and ("#" in vector_id or vector_id.endswith(".txt"))
+    ]
+    for i in range(0, len(stale), 1000):
+        index.delete(ids=stale[i:i+1000])
+    if stale:
+        print(f"Removed {len(stale)} stale vectors.")
+
+    to_upload = [d for d in docs if stored.get(d["id"]) != d["sha"]]
 
     if not to_upload:
-        print("Embeddings already exist. No upload needed.")
+        print("Embeddings are up to date. No upload needed.")
         return
 
-    print(f"{len(to_upload)} new files found. Uploading...")
+    print(f"{len(to_upload)} new or changed chunks found. Uploading...")
 
     vectors = []
-    for doc in to_upload:
-        emb = embed_text(doc["text"])
+    embeddings = embedder.embed_many([doc["text"] for doc in to_upload])
+    for doc, emb in zip(to_upload, embeddings):
         vectors.append({
             "id": doc["id"],
             "values": emb,
             "metadata": {
-                "source": doc["id"],
-                "text": doc["text"]
+                "source": doc["source"],
+                "provider": doc["provider"],
+                "section": doc["section"],
+                "text": doc["text"],
+                "sha": doc["sha"],
             }
         })
 
-    index.upsert(vectors)
+    # Vectors carry their chunk text, so keep each request well under the size limit
+    UPSERT_BATCH = 50
+    for i in range(0, len(vectors), UPSERT_BATCH):
+        index.upsert(vectors[i:i+UPSERT_BATCH])
     print("Upload completed.")
@@ -0,0 +1,182 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import yaml
+from openai import OpenAI
+
+from app.config import client, MODEL_CONFIG_PATH
+from app.utils import metrics
+
+
+# Absolute time.monotonic() by which the current chat turn must answer
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("model_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Model calls made inside this block must finish within `seconds`."""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@dataclass
+class ModelSpec:
+    key: str
+    name: str
+    tier: int
+    client: Any
+    # Rolling observations, updated after every call
+    latency: Optional[float] = None  # EWMA seconds
+    error_rate: float = 0.0  # EWMA of 0/1 failures
+    observed_at: Optional[float] = None
+    in_flight: int = 0
+
+
+class ModelRouter:
+    """
+    Picks a model for each call from the task's candidates in the registry.
+
+    Candidates are tried in their configured order, skipping models whose
+    rolling error rate is too high or whose rolling latency wouldn't fit in
+    what's left of the request deadline; a skipped model is tried again
+    once its observations are `probe_after` seconds old. While too many
+    model calls are in flight the cheapest eligible tier wins instead. A
+    failed call falls through to the next candidate if time remains.
+    """
+
+    def __init__(self, config: Dict[str, Any], default_client=None):
+        router = config.get("router", {}) or {}
+        self.alpha = float(router.get("ewma_alpha", 0.2))
+        self.max_error_rate = float(router.get("max_error_rate", 0.5))
+        self.degrade_in_flight = int(router.get("degrade_in_flight", 24))
+        self.default_deadline = float(router.get("default_deadline", 30))
+        self.probe_after = float(router.get("probe_after", 30))
+
+        clients = {}
+        self.models: Dict[str, ModelSpec] = {}
+        for key, spec in (config.get("models") or {}).items():
+            base_url = spec.get("base_url")
+            if base_url:
+                api_key = os.getenv(spec.get("api_key_env", ""), "") or "unused"
+                retries = int(spec.get("max_retries", 2))
+                if (base_url, api_key, retries) not in clients:
+                    clients[(base_url, api_key, retries)] = OpenAI(base_url=base_url, api_key=api_key, max_retries=retries)
+                model_client = clients[(base_url, api_key, retries)]
+            else:
+                model_client = default_client or client
+            self.models[key] = ModelSpec(key, spec["name"], int(spec.get("tier", 0)), model_client)
+
+        self.tasks: Dict[str, List[str]] = {}
+        for task, keys in (config.get("tasks") or {}).items():
+            unknown = [k for k in keys if k not in self.models]
+            if unknown:
+                raise ValueError(f"Task {task!r} uses unknown models: {unknown}")
+            self.tasks[task] = list(keys)
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    # ---------- routing ---------- #
+    def _remaining(self) -> float:
+        end = _deadline.get()
+        return self.default_deadline if end is None else end - time.monotonic()
+
+    def plan(self, task: str):
+        """Candidates for `task` in the order they'd be tried, with the reason for the first."""
+        keys = self.tasks.get(task) or self.tasks.get("default") or list(self.models)
+        candidates = [self.models[k] for k in keys]
+        remaining = self._remaining()
+        now = time.monotonic()
+
+        # Stale observations expire so a model that was slow or failing gets retried
+        def fresh(m):
+            return m.observed_at is not None and now - m.observed_at < self.probe_after
+
+        healthy = [m for m in candidates if not fresh(m) or m.error_rate <= self.max_error_rate] or candidates
+        in_time = [m for m in healthy if not fresh(m) or m.latency <= remaining]
+        if in_time:
+            eligible = in_time
+        else:
+            eligible = sorted(healthy, key=lambda m: m.latency or 0.0)
+
+        if eligible[0] is candidates[0]:
+            reason = "preferred"
+        elif candidates[0] not in healthy:
+            reason = "unhealthy"
+        else:
+            reason = "deadline"
+
+        if self._in_flight >= self.degrade_in_flight:
+            cheapest = sorted(eligible, key=lambda m: m.tier)
+            if cheapest[0] is not eligible[0]:
+                eligible, reason = cheapest, "degraded"
+
+        rest = [m for m in candidates if m not in eligible]
+        return eligible + rest, reason
+
+    def _observe(self, model: ModelSpec, elapsed: float, failed: bool):
+        with self._lock:
+            a = self.alpha
+            model.error_rate = (1 - a) * model.error_rate + a * (1.0 if failed else 0.0)
+            model.latency = elapsed if model.latency is None else (1 - a) * model.latency + a * elapsed
+            model.observed_at = time.monotonic()
+        metrics.set_gauge("model_error_rate", round(model.error_rate, 4), model=model.name)
+        metrics.set_gauge("model_latency_ewma_ms", round(model.latency * 1000, 1), model=model.name)
+
+    def chat_completion(self, task: str, messages: List[Dict[str, Any]], **kwargs):
+        """client.chat.completions.create() with the model chosen for `task`."""
+        order, reason = self.plan(task)
+        last_error = None
+        for attempt, model in enumerate(order):
+            remaining = self._remaining()
+            if attempt and remaining <= 0:
+                break
+            metrics.inc("model_route_total", task=task, model=model.name, reason=reason if not attempt else "fallback")
+
+            with self._lock:
+                self._in_flight += 1
+                model.in_flight += 1
+            metrics.set_gauge("model_in_flight", self._in_flight)
+            start = time.monotonic()
+            try:
+                resp = model.client.chat.completions.create(
+                    model=model.name,
+                    messages=messages,
+                    timeout=max(remaining, 1.0),
+                    **kwargs,
+                )
+            except Exception as e:
+                # A timeout says as much about latency as a slow success
+                self._observe(model, time.monotonic() - start, failed=True)
+                metrics.inc("model_errors_total", task=task, model=model.name)
+                last_error = e
+                continue
+            else:
+                self._observe(model, time.monotonic() - start, failed=False)
+                return resp
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    model.in_flight -= 1
+                metrics.set_gauge("model_in_flight", self._in_flight)
+        raise last_error or TimeoutError(f"No time left to call a model for {task!r}")
+
+
+def load_router(path: str = MODEL_CONFIG_PATH) -> ModelRouter:
+    with open(path, encoding="utf-8") as f:
+        return ModelRouter(yaml.safe_load(f) or {})
+
+
+model_router = load_router()
+
+
+def chat_completion(task: str, messages: List[Dict[str, Any]], **kwargs):
+    return model_router.chat_completion(task, messages, **kwargs)
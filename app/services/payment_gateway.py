@@ -0,0 +1,79 @@
+"""
+Payment gateways the reconciler polls. A gateway answers, for a batch of
+booking ids, the current status of each one's payment; refunds are
+initiated on the gateway side and only observed here.
+
+PAYMENT_GATEWAY selects one: "fake" (in-memory, for local runs and
+benchmarks) or "package.module:ClassName" of a PaymentGateway subclass.
+"""
+import importlib
+import random
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# What a gateway may report for a payment
+GATEWAY_STATUSES = ("pending", "paid", "failed", "expired", "refunded")
+
+
+class PaymentGateway:
+    # Booking ids per fetch_statuses() call the gateway accepts
+    max_batch = 500
+
+    def fetch_statuses(self, booking_ids: List[str]) -> Dict[str, str]:
+        """Status per booking id; ids the gateway has never seen are left out."""
+        raise NotImplementedError
+
+
+class FakePaymentGateway(PaymentGateway):
+    """
+    In-memory gateway. Statuses are set with set_status(); with `settle`,
+    every unknown id polled is settled once at random (paid with
+    probability `paid_ratio`, else failed), like customers finishing or
+    abandoning checkout. `calls` counts fetch_statuses() round trips.
+    """
+
+    def __init__(self, statuses: Optional[Dict[str, str]] = None, settle: bool = False,
+                 paid_ratio: float = 0.9, max_batch: int = 500, seed: Optional[int] = None):
+        self.statuses: Dict[str, str] = dict(statuses or {})
+        self.settle = settle
+        self.paid_ratio = paid_ratio
+        self.max_batch = max_batch
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def set_status(self, booking_id: str, status: str):
+        if status not in GATEWAY_STATUSES:
+            raise ValueError(f"Unknown payment status {status!r}")
+        with self._lock:
+            self.statuses[booking_id] = status
+
+    def set_statuses(self, items: Iterable):
+        for booking_id, status in items:
+            self.set_status(booking_id, status)
+
+    def fetch_statuses(self, booking_ids: List[str]) -> Dict[str, str]:
+        if len(booking_ids) > self.max_batch:
+            raise ValueError(f"At most {self.max_batch} booking ids per call, got {len(booking_ids)}")
+        with self._lock:
+            self.calls += 1
+            if self.settle:
+                for booking_id in booking_ids:
+                    if booking_id not in self.statuses:
+                        self.statuses[booking_id] = "paid" if self._rng.random() < self.paid_ratio else "failed"
+            return {b: self.statuses[b] for b in booking_ids if b in self.statuses}
+
+
+def load_gateway(spec: str) -> Optional[PaymentGateway]:
+    """The gateway named by `spec` (see module docstring), or None when it's empty."""
+    if not spec:
+        return None
+    if spec == "fake":
+        return FakePaymentGateway(settle=True)
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"PAYMENT_GATEWAY must be 'fake' or 'module:Class', got {spec!r}")
+    gateway = getattr(importlib.import_module(module_name), class_name)()
+    if not isinstance(gateway, PaymentGateway):
+        raise TypeError(f"{spec} is not a PaymentGateway")
+    return gateway
@@ -0,0 +1,230 @@
+"""
+Payment status of bookings, kept in step with the payment gateway.
+
+Bookings start with payment_status "pending". The reconciler reads only
+bookings whose payment is still open (pending, or a refund in progress)
+off the (payment_status, booked_at) index of both the hot and the
+archive collection (a trip can depart before its payment settles), asks
+the gateway about them `max_batch` ids at a time, and applies the
+transitions with one bulk_write per batch, so a pass costs O(open
+payments), not O(bookings):
+
+    python -m app.services.payments            # one pass
+    python -m app.services.payments --migrate  # pyment_status -> payment_status only
+"""
+import argparse
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.config import (
+    bookings_archive_collection,
+    bookings_collection,
+    catalog_meta_collection,
+    PAYMENT_GATEWAY,
+    PAYMENT_RECONCILE_BATCH,
+    PAYMENT_RECONCILE_INTERVAL,
+)
+from app.services.payment_gateway import load_gateway, PaymentGateway
+from app.utils import metrics
+
+# Statuses the reconciler still polls
+OPEN_STATUSES = ("pending", "refund_pending")
+# Gateway-reported statuses each open status may move to
+TRANSITIONS = {
+    "pending": ("paid", "failed", "expired"),
+    "refund_pending": ("refunded",),
+}
+
+# Update-pipeline value of payment_status for a booking being cancelled:
+# money taken goes back, anything else stays as it is
+CANCEL_PAYMENT_STATUS = {"$cond": [{"$eq": ["$payment_status", "paid"]}, "refund_pending", "$payment_status"]}
+
+
+def status_after_cancel(status: Optional[str]) -> Optional[str]:
+    return "refund_pending" if status == "paid" else status
+
+
+def refund_note(status: Optional[str]) -> str:
+    """What happens to the money of a cancelled booking with this payment_status."""
+    if status in ("refund_pending", "refunded"):
+        return "Your payment will be refunded within 5-7 business days."
+    if status == "pending":
+        return "If your payment still goes through, it will be refunded automatically."
+    return "No payment was taken for this booking."
+
+
+# ---------- Schema ---------- #
+# catalog_meta document recording that the pyment_status rename has run
+MIGRATION_MARKER = "payment_status_migration"
+
+
+def migrate_payment_field(force: bool = False) -> int:
+    """
+    Rename the misspelled `pyment_status` to `payment_status` (idempotent).
+    The scan is unindexed, so it runs once: later calls see the marker and
+    return right away unless `force` is set. Nothing writes pyment_status
+    any more, so there is nothing new to rename afterwards.
+    """
+    if not force and catalog_meta_collection.find_one({"_id": MIGRATION_MARKER}, {"_id": 1}):
+        return 0
+    migrated = 0
+    for collection in (bookings_collection, bookings_archive_collection):
+        result = collection.update_many(
+            {"pyment_status": {"$exists": True}},
+            [
+                {"$set": {"payment_status": {"$ifNull": ["$payment_status", "$pyment_status"]}}},
+                {"$unset": "pyment_status"},
+            ],
+        )
+        migrated += result.modified_count
+    if migrated:
+        print(f"Renamed pyment_status to payment_status on {migrated} bookings")
+    catalog_meta_collection.update_one(
+        {"_id": MIGRATION_MARKER},
+        {"$set": {"completed_at": datetime.utcnow(), "migrated": migrated}},
+        upsert=True,
+    )
+    return migrated
+
+
+def ensure_payment_indexes():
+    migrate_payment_field()
+    # Reconciliation scans open payments, oldest first, in both partitions
+    for collection in (bookings_collection, bookings_archive_collection):
+        collection.create_index([("payment_status", ASCENDING), ("booked_at", ASCENDING)])
+
+
+# ---------- Reconciliation ---------- #
+def _next_status(booking: Dict[str, Any], reported: Optional[str]) -> Optional[str]:
+    current = booking.get("payment_status")
+    if reported not in TRANSITIONS.get(current, ()):
+        return None
+    # Paid after the passenger had already cancelled: it goes back
+    if reported == "paid" and booking.get("status") == "cancelled":
+        return "refund_pending"
+    return reported
+
+
+def reconcile_payments(gateway: PaymentGateway, batch_size: int = PAYMENT_RECONCILE_BATCH) -> Dict[str, Any]:
+    """One pass over open payments; returns counts by outcome and new status."""
+    started = time.perf_counter()
+    batch_size = max(1, min(batch_size, gateway.max_batch))
+    totals: Dict[str, Any] = {"checked": 0, "updated": 0, "unknown": 0, "by_status": {}}
+
+    # The archiver moves departed trips whatever their payment state
+    for collection in (bookings_collection, bookings_archive_collection):
+        cursor = collection.find(
+            {"payment_status": {"$in": list(OPEN_STATUSES)}, "booking_id": {"$exists": True}},
+            {"_id": 0, "booking_id": 1, "payment_status": 1, "status": 1},
+            batch_size=batch_size,
+        ).sort([("payment_status", ASCENDING), ("booked_at", ASCENDING)])
+        try:
+            batch = []
+            for booking in cursor:
+                batch.append(booking)
+                if len(batch) >= batch_size:
+                    _apply_batch(collection, gateway, batch, totals)
+                    batch = []
+            if batch:
+                _apply_batch(collection, gateway, batch, totals)
+        finally:
+            cursor.close()
+
+    totals["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+    metrics.inc("payment_reconcile_passes_total")
+    metrics.set_gauge("payment_open_bookings", totals["checked"] - totals["updated"])
+    return totals
+
+
+def _apply_batch(collection, gateway: PaymentGateway, batch, totals: Dict[str, Any]):
+    reported = gateway.fetch_statuses([b["booking_id"] for b in batch])
+    now = datetime.utcnow()
+    ops = []
+    for booking in batch:
+        status = reported.get(booking["booking_id"])
+        if status is None:
+            totals["unknown"] += 1
+            continue
+        new = _next_status(booking, status)
+        if new is None:
+            continue
+        # Guarded on the status read, so a cancellation in between isn't overwritten
+        ops.append(UpdateOne(
+            {"booking_id": booking["booking_id"], "payment_status": booking["payment_status"]},
+            {"$set": {"payment_status": new, "payment_updated_at": now}},
+        ))
+        totals["by_status"][new] = totals["by_status"].get(new, 0) + 1
+        metrics.inc("payment_transitions_total", status=new)
+
+    totals["checked"] += len(batch)
+    if ops:
+        totals["updated"] += collection.bulk_write(ops, ordered=False).modified_count
+
+
+class PaymentReconciler:
+    """Runs reconcile_payments every `interval` seconds on a daemon thread."""
+
+    def __init__(self, gateway: Optional[PaymentGateway] = None, interval: float = PAYMENT_RECONCILE_INTERVAL):
+        self.gateway = gateway
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._worker = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                totals = reconcile_payments(self.gateway)
+                if totals["updated"]:
+                    print(f"Payment reconciliation: {totals}")
+            except Exception as e:
+                print(f"Payment reconciliation failed, will retry: {e}")
+                metrics.inc("payment_reconcile_errors_total")
+            self._stopped.wait(self.interval)
+
+    def start(self):
+        if self._worker is not None:
+            return
+        if self.gateway is None:
+            self.gateway = load_gateway(PAYMENT_GATEWAY)
+        if self.gateway is None:
+            print("PAYMENT_GATEWAY not set; payment reconciliation is off")
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._run, name="payment-reconciler", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        if self._worker is None:
+            return
+        self._stopped.set()
+        self._worker.join()
+        self._worker = None
+
+
+payment_reconciler = PaymentReconciler()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile booking payment statuses with the payment gateway")
+    parser.add_argument("--gateway", default=PAYMENT_GATEWAY, help="'fake' or module:Class (default: PAYMENT_GATEWAY)")
+    parser.add_argument("--batch", type=int, default=PAYMENT_RECONCILE_BATCH)
+    parser.add_argument("--migrate", action="store_true", help="only rename pyment_status (even if already recorded) and create the index")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate_payment_field(force=True)
+        ensure_payment_indexes()
+        return
+    ensure_payment_indexes()
+    gateway = load_gateway(args.gateway)
+    if gateway is None:
+        parser.error("no gateway: pass --gateway or set PAYMENT_GATEWAY")
+    print(reconcile_payments(gateway, args.batch))
+
+
+if __name__ == "__main__":
+    main()
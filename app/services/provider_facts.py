@@ -0,0 +1,218 @@
+import hashlib
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pymongo import ASCENDING, ReplaceOne
+
+from app.config import provider_facts_collection
+from app.services.load_to_pinecone import load_files
+from app.utils import metrics
+
+# "Label: value" lines in the provider documents and the fact they hold
+FACT_LABELS = {
+    "official address": "address",
+    "contact information": "contact",
+    "privacy policy / terms link": "privacy",
+}
+_LINE_RE = re.compile(r"^([A-Z][A-Za-z /&-]{1,40}):\s*(.+)$", re.MULTILINE)
+_PHONE_RE = re.compile(r"(\+?\d[\d\s-]{3,}\d)\s*(?:\(([^)]+)\))?")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_URL_RE = re.compile(r"https?://\S+")
+
+
+# ---------- Extraction (ingestion time) ---------- #
+def _clean_url(url: str) -> str:
+    # Drop tracking parameters the source documents picked up
+    parts = urlsplit(url.rstrip(".,)"))
+    query = [(k, v) for k, v in parse_qsl(parts.query) if not k.startswith("utm_")]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _parse_contact(text: str) -> Dict[str, Any]:
+    """
+    "Customer Support: 16460, Counter: 01713-049540" ->
+    phones [{label: Customer Support, number: 16460}, {label: Counter, ...}].
+    Unlabelled numbers after a label share it ("Reservations: 019..., 019...").
+    """
+    phones, emails, label = [], [], None
+    for part in text.split(","):
+        part = part.strip()
+        labelled = re.match(r"^([^:\d]+):\s*(.*)$", part)
+        if labelled:
+            label, part = labelled.group(1).strip(), labelled.group(2)
+        found = _EMAIL_RE.findall(part)
+        emails.extend(found)
+        for email in found:
+            part = part.replace(email, "")
+        for number, note in _PHONE_RE.findall(part):
+            phones.append({"label": label, "number": " ".join(number.split()), "note": note or None})
+    return {"phones": phones, "emails": emails}
+
+
+def extract_facts(provider: str, text: str) -> Dict[str, Any]:
+    """Structured facts from one provider document."""
+    first_line = next((line.strip() for line in text.splitlines() if line.strip()), "")
+    display = re.sub(r"\s+privacy policy$", "", first_line, flags=re.IGNORECASE) or provider.title()
+    facts: Dict[str, Any] = {"provider": provider, "name": display, "phones": [], "emails": []}
+
+    for label, value in _LINE_RE.findall(text):
+        kind = FACT_LABELS.get(label.strip().lower())
+        value = value.strip()
+        if kind == "address":
+            facts["address"] = value
+        elif kind == "contact":
+            facts["contact"] = value
+            parsed = _parse_contact(value)
+            facts["phones"] += parsed["phones"]
+            facts["emails"] += parsed["emails"]
+        elif kind == "privacy":
+            url = _URL_RE.search(value)
+            facts["privacy_url"] = _clean_url(url.group(0)) if url else None
+            facts["privacy_note"] = None if url else value
+    return facts
+
+
+def ensure_provider_facts_indexes():
+    provider_facts_collection.create_index([("provider", ASCENDING)], unique=True)
+
+
+def ingest_provider_facts(folder: str = "data") -> int:
+    """Re-extract facts for provider documents whose content changed."""
+    known = {d["provider"]: d.get("sha256") for d in provider_facts_collection.find({}, {"provider": 1, "sha256": 1})}
+    ops = []
+    for doc in load_files(folder):
+        provider = os.path.splitext(doc["id"])[0].lower()
+        sha = hashlib.sha256(doc["text"].encode("utf-8")).hexdigest()
+        if known.get(provider) == sha:
+            continue
+        facts = extract_facts(provider, doc["text"])
+        facts.update(source=doc["id"], sha256=sha, updated_at=datetime.utcnow())
+        ops.append(ReplaceOne({"provider": provider}, facts, upsert=True))
+    if ops:
+        provider_facts_collection.bulk_write(ops, ordered=False)
+        invalidate_provider_facts()
+    return len(ops)
+
+
+# ---------- Lookup (request time) ---------- #
+_facts: Optional[Dict[str, Dict[str, Any]]] = None
+_facts_lock = threading.Lock()
+
+
+def invalidate_provider_facts():
+    global _facts
+    _facts = None
+
+
+def get_provider_facts() -> Dict[str, Dict[str, Any]]:
+    global _facts
+    if _facts is None:
+        with _facts_lock:
+            if _facts is None:
+                _facts = {d["provider"]: d for d in provider_facts_collection.find({}, {"_id": 0})}
+    return _facts
+
+
+# Fact questions, most specific first. A question may ask for several
+# ("head office address and phone"); each match is taken out of the text
+# before the next kind is tried, so "email address" isn't also an address.
+# Anything that also reads as an open question (why / how does / explain
+# ...) goes to retrieval instead.
+FACT_QUESTIONS = [
+    ("email", re.compile(r"\b(e-?mail|mail)( address(es)?)?\b")),
+    ("privacy", re.compile(r"\b(privacy|terms|t&c|policy)\b.*\b(link|url|website|page|site)\b|"
+                           r"\b(link|url|website|page|site)\b.*\b(privacy|terms|policy)\b")),
+    ("counter", re.compile(r"\bcounters?\b")),
+    ("address", re.compile(r"\b(address|head ?office|office|located|location|where is)\b")),
+    ("phone", re.compile(r"\b(hotline|helpline|phone|number|call|mobile|customer (care|support|service)|"
+                         r"reservations?|complaints?)\b")),
+]
+# "contact" alone asks for the numbers; next to another fact ("contact
+# address", "contact email") it only qualifies that one
+CONTACT = re.compile(r"\bcontact\b")
+# The facts hold counter numbers, not where the counters are or how many:
+# those questions are for retrieval
+COUNTER_DETAILS = re.compile(r"\b(where|how many|which|list|all|near|nearest|nearby|located|location|address|in \w+)\b")
+OPEN_QUESTION = re.compile(r"\b(why|how (do|does|is|are|will|can)|explain|compare|difference|collect|share|secure|"
+                           r"store|protect|refund|data|consent)\b")
+
+
+def classify_fact_question(query: str) -> List[str]:
+    """The fact kinds the question asks for, in FACT_QUESTIONS order; [] for retrieval."""
+    text = (query or "").lower()
+    if OPEN_QUESTION.search(text):
+        return []
+    kinds = []
+    rest = text
+    for kind, pattern in FACT_QUESTIONS:
+        if pattern.search(rest):
+            kinds.append(kind)
+            rest = pattern.sub(" ", rest)
+    if "counter" in kinds:
+        if COUNTER_DETAILS.search(text):
+            return []
+        # A counter's number is the phone answer for it
+        kinds = [k for k in kinds if k != "phone"]
+    if not kinds and CONTACT.search(rest):
+        kinds = ["phone"]
+    return kinds
+
+
+def _numbers(phones: List[Dict[str, Any]]) -> str:
+    return "; ".join(
+        f"{p['label'] + ': ' if p.get('label') else ''}{p['number']}{' (' + p['note'] + ')' if p.get('note') else ''}"
+        for p in phones
+    )
+
+
+def render_fact(facts: Dict[str, Any], kind: str) -> Optional[str]:
+    name = facts.get("name") or facts["provider"].title()
+    if kind == "address" and facts.get("address"):
+        return f"{name}'s official address: {facts['address']}."
+    if kind == "email" and facts.get("emails"):
+        return f"You can email {name} at {', '.join(facts['emails'])}."
+    if kind == "privacy":
+        if facts.get("privacy_url"):
+            return f"{name}'s privacy policy and terms: {facts['privacy_url']}"
+        if facts.get("privacy_note"):
+            return f"{name} privacy policy: {facts['privacy_note']}."
+    if kind == "counter":
+        counters = [p for p in facts.get("phones", []) if "counter" in (p.get("label") or "").lower()]
+        if counters:
+            # "Counter: 0171..." would read "X counter: Counter: 0171..."
+            counters = [
+                dict(p, label=None) if p["label"].strip(" :").lower() in ("counter", "counters") else p
+                for p in counters
+            ]
+            return f"{name} counter: {_numbers(counters)}."
+    if kind in ("phone", "counter"):
+        if facts.get("phones"):
+            return f"{name} contact numbers: {_numbers(facts['phones'])}."
+        if facts.get("emails"):
+            return f"{name} doesn't list a phone number; you can email {', '.join(facts['emails'])}."
+    return None
+
+
+def answer_fact_question(query: str, providers: List[str]) -> Optional[str]:
+    """
+    Template answer for a fact question about the named providers, or None
+    when the question is open-ended or a fact is missing (use retrieval).
+    """
+    kinds = classify_fact_question(query)
+    if not kinds or not providers:
+        return None
+    facts = get_provider_facts()
+    answers = []
+    for kind in kinds:
+        rendered = [render_fact(facts[p], kind) if p in facts else None for p in providers]
+        if not all(rendered):
+            metrics.inc("provider_fact_misses_total", fact=kind)
+            return None
+        answers.extend(rendered)
+    for kind in kinds:
+        metrics.inc("provider_fact_answers_total", fact=kind)
+    return "\n".join(answers)
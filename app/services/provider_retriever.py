@@ -0,0 +1,216 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.catalog import get_catalog
+from app.services.load_to_pinecone import load_chunks
+
+# Common spellings that neither the catalog nor the file names carry
+PROVIDER_ALIASES = {
+    "hanif": ["hanif enterprise", "hanif paribahan", "হানিফ"],
+    "shyamoli": ["shamoli", "shyamoli paribahan", "শ্যামলী"],
+    "green line": ["greenline", "green line paribahan", "গ্রীন লাইন", "গ্রিন লাইন"],
+    "soudia": ["saudia", "soudia paribahan", "সৌদিয়া"],
+    "ena": ["ena transport", "এনা"],
+    "desh travel": ["desh travels", "দেশ ট্রাভেল"],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9ঀ-৿]+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_TOKEN_RE.findall((text or "").lower()))
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+# ---------- BM25 over the provider chunks ---------- #
+class BM25Index:
+    def __init__(self, docs: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = [d["id"] for d in docs]
+        self.term_freqs = [Counter(_tokens(d["text"])) for d in docs]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        doc_freq = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(docs)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def scores(self, query: str) -> Dict[str, float]:
+        terms = [t for t in _tokens(query) if t in self.idf]
+        out: Dict[str, float] = {}
+        for doc_id, tf, length in zip(self.ids, self.term_freqs, self.lengths):
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term, 0)
+                if not freq:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+                score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                out[doc_id] = score
+        return out
+
+
+def _rank(scores: Dict[str, float]) -> Dict[str, int]:
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return {doc_id: rank for rank, doc_id in enumerate(ordered, 1)}
+
+
+class ProviderRetriever:
+    """
+    Hybrid retrieval over section-level provider chunks:
+    1. provider name / alias in the query -> rank only that provider's
+       chunks locally with BM25, no embedding call
+    2. otherwise BM25 and vector scores fused with reciprocal rank fusion
+    Results are the top-k chunks that fit in the context budget.
+    """
+
+    RRF_K = 60
+
+    def __init__(self, chunks: List[Dict[str, Any]], provider_names: List[str]):
+        self.chunks = {c["id"]: c for c in chunks}
+        self.by_provider: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk in chunks:
+            self.by_provider.setdefault(chunk["provider"], []).append(chunk)
+        self.bm25 = BM25Index(chunks)
+        self.provider_bm25 = {p: BM25Index(cs) for p, cs in self.by_provider.items()}
+        self.aliases = self._build_aliases(provider_names)
+
+    def _build_aliases(self, provider_names: List[str]) -> Dict[str, str]:
+        by_stem = {_normalize(p): p for p in self.by_provider}
+
+        aliases: Dict[str, str] = {}
+        for stem, provider in by_stem.items():
+            for alias in [stem] + PROVIDER_ALIASES.get(stem, []):
+                aliases[_normalize(alias)] = provider
+                aliases[_normalize(alias).replace(" ", "")] = provider
+
+        # Catalog names map onto whichever provider document shares their name
+        for name in provider_names:
+            norm = _normalize(name)
+            provider = by_stem.get(norm) or next(
+                (p for stem, p in by_stem.items() if stem in norm or norm in stem), None
+            )
+            if provider:
+                aliases.setdefault(norm, provider)
+        return aliases
+
+    def match_providers(self, query: str) -> List[str]:
+        padded = f" {_normalize(query)} "
+        compact = padded.replace(" ", "")
+        matched: List[str] = []
+        # Longest aliases first so "green line" wins over a shorter overlap
+        for alias in sorted(self.aliases, key=len, reverse=True):
+            provider = self.aliases[alias]
+            if provider in matched:
+                continue
+            if f" {alias} " in padded or (" " not in alias and len(alias) > 4 and alias in compact):
+                matched.append(provider)
+        return matched
+
+    @staticmethod
+    def _within_budget(ranked: List[Dict[str, Any]], top_k: int, budget: int) -> List[Dict[str, Any]]:
+        out, used = [], 0
+        for chunk in ranked:
+            if len(out) >= top_k:
+                break
+            if out and used + len(chunk["text"]) > budget:
+                continue
+            out.append(chunk)
+            used += len(chunk["text"])
+        return out
+
+    def _named(self, query, providers, embed_fn, index, top_k, budget):
+        # The provider's own name appears all over its document; rank on the rest
+        name_tokens = {t for alias, p in self.aliases.items() if p in providers for t in _tokens(alias)}
+        topic = " ".join(t for t in _tokens(query) if t not in name_tokens)
+
+        ranked: List[Dict[str, Any]] = []
+        per_provider = max(1, top_k // len(providers))
+        for provider in providers:
+            chunks = self.by_provider[provider]
+            scores = self.provider_bm25[provider].scores(topic)
+            hits = sorted(scores, key=scores.get, reverse=True)
+
+            if hits:
+                picked = [dict(self.chunks[c], score=scores[c], via="name") for c in hits]
+            elif embed_fn is not None and index is not None:
+                # Nothing lexical to go on: vector search restricted to this provider
+                results = index.query(
+                    vector=embed_fn(query),
+                    top_k=per_provider,
+                    include_metadata=True,
+                    filter={"provider": {"$eq": provider}},
+                )
+                picked = [
+                    dict(self.chunks.get(m["id"]) or m.get("metadata") or {}, id=m["id"], score=m["score"], via="filtered")
+                    for m in results["matches"]
+                ]
+            else:
+                picked = [dict(c, score=0.0, via="name") for c in chunks]
+            ranked.extend(picked[:per_provider])
+        return self._within_budget(ranked, top_k, budget)
+
+    def retrieve(
+        self,
+        query: str,
+        embed_fn: Optional[Callable[[str], List[float]]] = None,
+        index=None,
+        top_k: int = 4,
+        budget: int = 1500,
+    ) -> List[Dict[str, Any]]:
+        named = self.match_providers(query)
+        if named:
+            return self._named(query, named, embed_fn, index, top_k, budget)
+
+        ranks = [_rank(self.bm25.scores(query))]
+        vector_meta: Dict[str, Dict[str, Any]] = {}
+        if embed_fn is not None and index is not None:
+            results = index.query(vector=embed_fn(query), top_k=max(top_k, 5), include_metadata=True)
+            vector_scores = {}
+            for m in results["matches"]:
+                vector_scores[m["id"]] = m["score"]
+                vector_meta[m["id"]] = m.get("metadata") or {}
+            ranks.append(_rank(vector_scores))
+
+        fused: Dict[str, float] = {}
+        for ranking in ranks:
+            for chunk_id, rank in ranking.items():
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.RRF_K + rank)
+
+        ranked = []
+        for chunk_id in sorted(fused, key=fused.get, reverse=True):
+            chunk = self.chunks.get(chunk_id) or vector_meta.get(chunk_id)
+            if chunk and chunk.get("text"):
+                ranked.append(dict(chunk, id=chunk_id, score=fused[chunk_id], via="hybrid"))
+        return self._within_budget(ranked, top_k, budget)
+
+
+_retriever: Optional[ProviderRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def _catalog_provider_names() -> List[str]:
+    dataset = get_catalog() or {}
+    return [p.get("name") for p in dataset.get("bus_providers", []) if p.get("name")]
+
+
+def get_provider_retriever() -> ProviderRetriever:
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = ProviderRetriever(load_chunks(), _catalog_provider_names())
+    return _retriever
@@ -0,0 +1,141 @@
+import heapq
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.catalog import get_catalog, on_catalog_change
+
+OPTIMIZE_FOR = ("fare", "hops")
+MAX_HOPS = 4
+DEFAULT_K = 3
+
+
+class RoutePlanner:
+    """
+    Itineraries over the provider coverage graph: two districts are
+    connected when one provider covers both. A leg's fare is the cheapest
+    dropping point fare in the district you arrive at, the same number
+    ask_for_info quotes for a direct trip.
+
+    The k best itineraries from an origin to *every* destination are found
+    with one k-shortest-paths Dijkstra run and cached per (origin, metric),
+    so a lookup after the first is a dict access.
+    """
+
+    def __init__(self, catalog: Dict[str, Any], k: int = DEFAULT_K, max_hops: int = MAX_HOPS):
+        self.version = catalog.get("version")
+        self.k = k
+        self.max_hops = max_hops
+        self.names: Dict[str, str] = {}
+        self.fares: Dict[str, float] = {}
+        for district in catalog.get("districts", []):
+            name = district.get("name")
+            if not name:
+                continue
+            self.names[name.lower()] = name
+            prices = [
+                p.get("price") for p in district.get("dropping_points", []) or []
+                if isinstance(p.get("price"), (int, float))
+            ]
+            self.fares[name] = min(prices) if prices else 0.0
+
+        # adjacency: district -> {neighbour: [providers]}
+        self.edges: Dict[str, Dict[str, List[str]]] = {name: {} for name in self.fares}
+        for provider in catalog.get("bus_providers", []):
+            covered = [self.names[d.lower()] for d in provider.get("coverage_districts", []) or [] if d.lower() in self.names]
+            for a in covered:
+                for b in covered:
+                    if a != b:
+                        self.edges[a].setdefault(b, []).append(provider.get("name", "Unknown"))
+
+        self._cache: Dict[Tuple[str, str], Dict[str, List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, district: Optional[str]) -> Optional[str]:
+        return self.names.get((district or "").strip().lower())
+
+    def _cost(self, to_district: str, optimize: str) -> float:
+        return 1.0 if optimize == "hops" else self.fares[to_district]
+
+    def _search(self, origin: str, optimize: str) -> Dict[str, List[Dict[str, Any]]]:
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        pops: Dict[str, int] = {}
+        # (cost, tie-breaker, hops, path)
+        heap: List[Tuple[float, float, int, Tuple[str, ...]]] = [(0.0, 0.0, 0, (origin,))]
+        while heap:
+            cost, tie, hops, path = heapq.heappop(heap)
+            node = path[-1]
+            if pops.get(node, 0) >= self.k:
+                continue
+            pops[node] = pops.get(node, 0) + 1
+            if node != origin:
+                found.setdefault(node, []).append(self._itinerary(path))
+            if hops >= self.max_hops:
+                continue
+            for neighbour in self.edges.get(node, {}):
+                if neighbour in path or pops.get(neighbour, 0) >= self.k:
+                    continue
+                # Skip pointless stops: the previous district reaches it directly
+                if len(path) > 1 and neighbour in self.edges[path[-2]]:
+                    continue
+                step = self._cost(neighbour, optimize)
+                # Fare ties prefer fewer hops, hop ties prefer cheaper fares
+                tie_step = 1.0 if optimize == "fare" else self.fares[neighbour]
+                heapq.heappush(heap, (cost + step, tie + tie_step, hops + 1, path + (neighbour,)))
+        return found
+
+    def _itinerary(self, path: Tuple[str, ...]) -> Dict[str, Any]:
+        legs = [
+            {
+                "from": a,
+                "to": b,
+                "providers": sorted(self.edges[a][b]),
+                "fare": self.fares[b],
+            }
+            for a, b in zip(path, path[1:])
+        ]
+        return {
+            "path": list(path),
+            "legs": legs,
+            "hops": len(legs),
+            "total_fare": sum(leg["fare"] for leg in legs),
+        }
+
+    def itineraries(self, origin: str, destination: str, optimize: str = "fare", k: Optional[int] = None):
+        origin, destination = self.resolve(origin), self.resolve(destination)
+        if not origin or not destination or origin == destination:
+            return []
+        if optimize not in OPTIMIZE_FOR:
+            raise ValueError(f"optimize must be one of {OPTIMIZE_FOR}")
+
+        key = (origin, optimize)
+        table = self._cache.get(key)
+        if table is None:
+            with self._lock:
+                table = self._cache.get(key)
+                if table is None:
+                    table = self._search(origin, optimize)
+                    self._cache[key] = table
+        return table.get(destination, [])[: k or self.k]
+
+
+_planner: Optional[RoutePlanner] = None
+_planner_lock = threading.Lock()
+
+
+def _rebuild(catalog: Dict[str, Any]):
+    global _planner
+    _planner = RoutePlanner(catalog)
+
+
+on_catalog_change(_rebuild)
+
+
+def get_route_planner() -> Optional[RoutePlanner]:
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    if _planner is None or _planner.version != catalog.get("version"):
+        with _planner_lock:
+            if _planner is None or _planner.version != catalog.get("version"):
+                _rebuild(catalog)
+    return _planner
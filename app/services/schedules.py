@@ -0,0 +1,326 @@
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+
+from app.config import schedules_collection
+from app.schemas.schedule_schema import Schedule
+from app.services.catalog import get_catalog
+from app.utils.clock import local_now
+
+SCHEDULE_KEY = ("provider", "from_district", "to_district", "date", "departure", "coach_type")
+MAX_RESULTS = 5
+
+
+def ensure_schedule_indexes():
+    # Route + day, then departure time: serves both exact-day and "next bus" range queries
+    schedules_collection.create_index(
+        [("from_district", ASCENDING), ("to_district", ASCENDING), ("date", ASCENDING), ("departure", ASCENDING)]
+    )
+    schedules_collection.create_index([(k, ASCENDING) for k in SCHEDULE_KEY], unique=True)
+
+
+def upsert_schedules(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Validate and upsert departures by (provider, route, date, departure,
+    coach_type). Seats already booked on an existing departure are kept.
+    """
+    ops, errors = [], []
+    for i, item in enumerate(items):
+        try:
+            schedule = Schedule.model_validate(item).model_dump()
+        except ValidationError as e:
+            errors.append({"index": i, "error": e.errors(include_url=False)})
+            continue
+        schedule.pop("seats_booked", None)
+        ops.append(UpdateOne(
+            {k: schedule[k] for k in SCHEDULE_KEY},
+            {"$set": schedule, "$setOnInsert": {"seats_booked": 0}},
+            upsert=True,
+        ))
+    if ops:
+        schedules_collection.bulk_write(ops, ordered=False)
+    return {"upserted": len(ops), "errors": errors}
+
+
+# ---------- Query parsing ---------- #
+SCHEDULE_QUESTION = re.compile(
+    r"\b(schedules?|timings?|times?|departures?|depart\w*|leaves?|leaving|next bus(es)?|when|"
+    r"seats?|availab\w*|tonight|tomorrow|today|morning|afternoon|evening|night|\d{1,2}\s*(am|pm))\b",
+    re.IGNORECASE,
+)
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_TIME = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?"
+# After these cues a bare number is a date as often as a time ("from 5 jan"):
+# it only counts as a time with minutes or am/pm
+_DATE_CUES = ("from",)
+_WINDOWS = {
+    "morning": ("05:00", "11:59"),
+    "afternoon": ("12:00", "16:59"),
+    "evening": ("17:00", "20:59"),
+    "night": ("21:00", "23:59"),
+    "tonight": ("18:00", "23:59"),
+}
+
+
+def is_schedule_question(text: str) -> bool:
+    return SCHEDULE_QUESTION.search(text or "") is not None
+
+
+def _clock(hour: str, minute: Optional[str], meridiem: Optional[str]) -> Optional[str]:
+    h, m = int(hour), int(minute or 0)
+    if meridiem:
+        if not 1 <= h <= 12:
+            return None
+        h = h % 12 + (12 if meridiem.lower() == "pm" else 0)
+    if h > 23 or m > 59:
+        return None
+    return f"{h:02d}:{m:02d}"
+
+
+def _parse_date(text: str, today: datetime) -> Optional[str]:
+    if "day after tomorrow" in text:
+        return (today + timedelta(days=2)).strftime("%Y-%m-%d")
+    if "tomorrow" in text:
+        return (today + timedelta(days=1)).strftime("%Y-%m-%d")
+    if re.search(r"\b(today|tonight)\b", text):
+        return today.strftime("%Y-%m-%d")
+
+    iso = re.search(r"\b(\d{4})-(\d{2})-(\d{2})\b", text)
+    if iso:
+        return iso.group(0)
+
+    month_names = "|".join(_MONTHS)
+    named = re.search(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+({month_names})[a-z]*\b", text) or re.search(
+        rf"\b({month_names})[a-z]*\s+(\d{{1,2}})(?:st|nd|rd|th)?\b", text
+    )
+    numeric = re.search(r"\b(\d{1,2})[/.](\d{1,2})\b", text)  # day first, as written in Bangladesh
+    day = month = None
+    if named:
+        a, b = named.groups()
+        day, month = (int(a), _MONTHS.index(b[:3]) + 1) if a.isdigit() else (int(b), _MONTHS.index(a[:3]) + 1)
+    elif numeric:
+        day, month = int(numeric.group(1)), int(numeric.group(2))
+    if day and month:
+        for year in (today.year, today.year + 1):
+            try:
+                candidate = datetime(year, month, day)
+            except ValueError:
+                # Not a real day (31/2); a weekday may still name the date
+                break
+            if candidate.date() >= today.date():
+                return candidate.strftime("%Y-%m-%d")
+
+    for i, name in enumerate(_WEEKDAYS):
+        if re.search(rf"\b{name}\b", text):
+            return (today + timedelta(days=(i - today.weekday()) % 7)).strftime("%Y-%m-%d")
+    return None
+
+
+def _find_time(cues: str, text: str):
+    """(HH:MM, span) of the first "<cue> <time>" in `text`, else (None, None)."""
+    month_names = "|".join(_MONTHS)
+    for match in re.finditer(rf"\b({cues})\s+{_TIME}", text):
+        cue, hour, minute, meridiem = match.groups()
+        if not (minute or meridiem) and (
+            cue in _DATE_CUES or re.match(rf"\s*(?:st|nd|rd|th)?\s*({month_names})", text[match.end():])
+        ):
+            continue
+        return _clock(hour, minute, meridiem), match.span()
+    return None, None
+
+
+def parse_schedule_query(text: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Date, time window, coach type, seats and provider asked for in `text`,
+    e.g. "next buses tomorrow after 6pm, 2 seats, ac" ->
+    {"date": <tomorrow>, "after": "18:00", "coach_type": "ac", "seats": 2}.
+    The route itself comes from the gazetteer.
+    """
+    now = now or local_now()
+    lowered = (text or "").lower()
+    query: Dict[str, Any] = {}
+
+    spans = []
+    between = re.search(rf"\bbetween\s+{_TIME}\s+(?:and|to|-)\s+{_TIME}", lowered)
+    if between:
+        h1, m1, p1, h2, m2, p2 = between.groups()
+        query["after"] = _clock(h1, m1, p1 or p2)
+        query["before"] = _clock(h2, m2, p2)
+        spans.append(between.span())
+    else:
+        query["after"], after_span = _find_time("after|from|later than", lowered)
+        query["before"], before_span = _find_time("before|by|earlier than|until", lowered)
+        spans += [span for span in (after_span, before_span) if span]
+    # "9.10 pm" must not read as 9 October
+    date_text = lowered
+    for start, end in sorted(spans, reverse=True):
+        date_text = date_text[:start] + " " + date_text[end:]
+    query["date"] = _parse_date(date_text, now)
+    if not query.get("after") and not query.get("before"):
+        for word, (start, end) in _WINDOWS.items():
+            if re.search(rf"\b{word}\b", lowered):
+                query["after"], query["before"] = start, end
+                break
+
+    if re.search(r"\bnon[\s-]?a\.?c\b", lowered):
+        query["coach_type"] = "non-ac"
+    elif re.search(r"\ba\.?c\b", lowered):
+        query["coach_type"] = "ac"
+    elif "sleeper" in lowered:
+        query["coach_type"] = "sleeper"
+
+    seats = re.search(r"\b(\d{1,2})\s*(?:seats?|tickets?|persons?|people|passengers?)\b", lowered)
+    if seats:
+        query["seats"] = int(seats.group(1))
+
+    catalog = get_catalog() or {}
+    for provider in catalog.get("bus_providers", []):
+        name = provider.get("name") or ""
+        if name and re.search(rf"\b{re.escape(name.lower())}\b", lowered):
+            query["provider"] = name
+            break
+
+    return {k: v for k, v in query.items() if v is not None}
+
+
+# ---------- Search ---------- #
+def _seats_left(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc["seats_left"] = max(0, doc.get("capacity", 0) - doc.get("seats_booked", 0))
+    return doc
+
+
+def has_schedules(from_district: str, to_district: str) -> bool:
+    return schedules_collection.find_one(
+        {"from_district": from_district, "to_district": to_district}, {"_id": 1}
+    ) is not None
+
+
+def search_departures(
+    from_district: str,
+    to_district: str,
+    date: Optional[str] = None,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    coach_type: Optional[str] = None,
+    provider: Optional[str] = None,
+    seats: int = 1,
+    limit: int = MAX_RESULTS,
+    now: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Departures on the route with at least `seats` seats left, earliest
+    first. Without a date: the next departures from now on.
+    """
+    now = now or local_now()
+    today, clock = now.strftime("%Y-%m-%d"), now.strftime("%H:%M")
+
+    query: Dict[str, Any] = {
+        "from_district": from_district,
+        "to_district": to_district,
+        "cancelled": {"$ne": True},
+        "$expr": {"$gte": [{"$subtract": ["$capacity", "$seats_booked"]}, seats]},
+    }
+    if coach_type:
+        query["coach_type"] = coach_type
+    if provider:
+        query["provider"] = provider
+
+    def window(earliest: Optional[str]):
+        bounds = {}
+        start = max(filter(None, [after, earliest]), default=None)
+        if start:
+            bounds["$gte"] = start
+        if before:
+            bounds["$lte"] = before
+        return bounds
+
+    if date:
+        if date < today:
+            return []
+        departure = window(clock if date == today else None)
+        query["date"] = date
+        if departure:
+            query["departure"] = departure
+    else:
+        later_days = {"date": {"$gt": today}}
+        if window(None):
+            later_days["departure"] = window(None)
+        query["$or"] = [{"date": today, "departure": window(clock)}, later_days]
+
+    cursor = (
+        schedules_collection.find(query, {"_id": 0})
+        .sort([("date", ASCENDING), ("departure", ASCENDING)])
+        .limit(limit)
+    )
+    return [_seats_left(doc) for doc in cursor]
+
+
+# ---------- Seats ---------- #
+def reserve_seats(provider: str, from_district: str, to_district: str, date: str,
+                  seats: int, departure: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Atomically take `seats` on the earliest matching departure that still
+    has room (or the given one). None when every matching departure is full.
+    """
+    query: Dict[str, Any] = {
+        "provider": provider,
+        "from_district": from_district,
+        "to_district": to_district,
+        "date": date,
+        "cancelled": {"$ne": True},
+        "$expr": {"$lte": [{"$add": ["$seats_booked", seats]}, "$capacity"]},
+    }
+    if departure:
+        query["departure"] = departure
+    return schedules_collection.find_one_and_update(
+        query,
+        {"$inc": {"seats_booked": seats}},
+        sort=[("departure", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def release_seats(schedule_id, seats: int):
+    return schedules_collection.update_one(
+        {"_id": schedule_id, "seats_booked": {"$gte": seats}},
+        {"$inc": {"seats_booked": -seats}},
+    )
+
+
+def cancel_departures(provider: str, from_district: str, to_district: str, date: str,
+                      departure: Optional[str] = None) -> int:
+    """Take departures off sale (operator cancelled the coach)."""
+    query = {"provider": provider, "from_district": from_district, "to_district": to_district, "date": date}
+    if departure:
+        query["departure"] = departure
+    return schedules_collection.update_many(
+        query, {"$set": {"cancelled": True, "cancelled_at": datetime.utcnow()}}
+    ).modified_count
+
+
+def find_departure(provider: str, from_district: str, to_district: str, date: str,
+                   departure: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    query = {"provider": provider, "from_district": from_district, "to_district": to_district,
+             "date": date, "cancelled": {"$ne": True}}
+    if departure:
+        query["departure"] = departure
+    return schedules_collection.find_one(query, sort=[("departure", ASCENDING)])
+
+
+def add_seats(schedule_id, seats: int):
+    """Operator move onto a departure; may go over capacity, callers report it."""
+    return schedules_collection.find_one_and_update(
+        {"_id": schedule_id}, {"$inc": {"seats_booked": seats}}, return_document=ReturnDocument.AFTER
+    )
+
+
+def route_has_departures(provider: str, from_district: str, to_district: str, date: str) -> bool:
+    return schedules_collection.find_one(
+        {"provider": provider, "from_district": from_district, "to_district": to_district, "date": date,
+         "cancelled": {"$ne": True}},
+        {"_id": 1},
+    ) is not None
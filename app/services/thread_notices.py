@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING
+
+from app.config import thread_notices_collection
+
+NOTICE_RETENTION_SECONDS = 30 * 24 * 3600
+MAX_NOTICES_PER_TURN = 10
+
+
+def ensure_notice_indexes():
+    thread_notices_collection.create_index([("thread_id", ASCENDING), ("delivered_at", ASCENDING)])
+    # Delivered notices go after a month; undelivered ones (delivered_at null) stay
+    thread_notices_collection.create_index("delivered_at", expireAfterSeconds=NOTICE_RETENTION_SECONDS)
+
+
+def enqueue_notices(notices: List[Dict[str, Any]]):
+    """Queue {thread_id, text, ...} notices for each thread's next turn."""
+    if not notices:
+        return
+    now = datetime.utcnow()
+    thread_notices_collection.insert_many(
+        [dict(n, created_at=now, delivered_at=None) for n in notices], ordered=False
+    )
+
+
+def take_notices(thread_id: str) -> List[str]:
+    """Undelivered notices for the thread, oldest first, marked delivered."""
+    docs = list(
+        thread_notices_collection.find({"thread_id": thread_id, "delivered_at": None}, {"text": 1})
+        .sort("created_at", ASCENDING)
+        .limit(MAX_NOTICES_PER_TURN)
+    )
+    if not docs:
+        return []
+    thread_notices_collection.update_many(
+        {"_id": {"$in": [d["_id"] for d in docs]}}, {"$set": {"delivered_at": datetime.utcnow()}}
+    )
+    return [d["text"] for d in docs]
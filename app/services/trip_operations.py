@@ -0,0 +1,218 @@
+"""
+Operator actions on a whole trip: cancel, or move to another date/departure,
+every confirmed booking of a (provider, route, date). Bookings are read
+off one cursor and updated with one bulk_write per chunk; seats go back
+to (or onto) the schedules, rollups move in one $inc per key, and each
+affected chat thread gets a notice shown on its next turn.
+"""
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from pymongo import UpdateOne
+
+from app.config import bookings_collection, TRIP_OP_CHUNK
+from app.services.booking_rollups import add_to_rollup
+from app.services.payments import CANCEL_PAYMENT_STATUS, refund_note, status_after_cancel
+from app.services.schedules import add_seats, cancel_departures, find_departure, release_seats
+from app.services.thread_notices import enqueue_notices
+from app.utils import metrics
+
+_PROJECTION = {
+    "_id": 1, "booking_id": 1, "thread_id": 1, "seats": 1, "total_amount": 1,
+    "schedule_id": 1, "departure": 1, "payment_status": 1,
+}
+
+
+def _trip_query(provider, district_from, district_to, date, departure=None) -> Dict[str, Any]:
+    # Served by the (bus_provider, date, booked_at) index
+    query = {
+        "bus_provider": provider,
+        "date": date,
+        "district_from": district_from,
+        "district_to": district_to,
+        "status": "confirmed",
+    }
+    if departure:
+        query["departure"] = departure
+    return query
+
+
+def _chunks(cursor, size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _apply(query: Dict[str, Any], update, op_id: str, notice, chunk_size: int) -> Dict[str, Any]:
+    """
+    Update every booking matching `query` in chunks; returns totals per
+    schedule and overall. `update` must set trip_op_id to `op_id`: seats,
+    revenue and notices count only the bookings this run actually changed.
+    """
+    totals = {"matched": 0, "modified": 0, "seats": 0, "revenue": 0.0, "notices": 0}
+    seats_by_schedule: Dict[Any, int] = defaultdict(int)
+    cursor = bookings_collection.find(query, _PROJECTION, batch_size=chunk_size)
+    try:
+        for chunk in _chunks(cursor, chunk_size):
+            # Guarded on status: a passenger who cancelled between the read and
+            # this write already gave their seats back and isn't touched
+            result = bookings_collection.bulk_write(
+                [UpdateOne({"_id": b["_id"], "status": "confirmed"}, update) for b in chunk],
+                ordered=False,
+            )
+            totals["matched"] += len(chunk)
+            totals["modified"] += result.modified_count
+            if result.modified_count < len(chunk):
+                changed = {
+                    d["_id"] for d in bookings_collection.find(
+                        {"_id": {"$in": [b["_id"] for b in chunk]}, "trip_op_id": op_id}, {"_id": 1}
+                    )
+                }
+                chunk = [b for b in chunk if b["_id"] in changed]
+            for b in chunk:
+                seats = int(b.get("seats") or 0)
+                totals["seats"] += seats
+                totals["revenue"] += float(b.get("total_amount") or 0)
+                if b.get("schedule_id") is not None:
+                    seats_by_schedule[b["schedule_id"]] += seats
+
+            notices = [
+                {"thread_id": b["thread_id"], "booking_id": b.get("booking_id"), "text": notice(b)}
+                for b in chunk if b.get("thread_id")
+            ]
+            enqueue_notices(notices)
+            totals["notices"] += len(notices)
+    finally:
+        cursor.close()
+    totals["seats_by_schedule"] = seats_by_schedule
+    return totals
+
+
+def cancel_trip(
+    provider: str,
+    district_from: str,
+    district_to: str,
+    date: str,
+    reason: str,
+    departure: Optional[str] = None,
+    chunk_size: int = TRIP_OP_CHUNK,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    op_id = uuid.uuid4().hex
+    trip = f"{provider} {district_from} → {district_to} on {date}"
+
+    def notice(b):
+        return (
+            f"⚠️ {provider} cancelled your trip {district_from} → {district_to} on {date}"
+            f"{' at ' + b['departure'] if b.get('departure') else ''} (booking {b.get('booking_id')}): {reason}. "
+            + refund_note(status_after_cancel(b.get("payment_status")))
+        )
+
+    totals = _apply(
+        _trip_query(provider, district_from, district_to, date, departure),
+        # An update pipeline, so paid bookings move to refund_pending in the same write
+        [{"$set": {
+            "status": "cancelled",
+            "cancelled_at": now,
+            "cancelled_by": "operator",
+            "cancel_reason": {"$literal": reason},
+            "payment_status": CANCEL_PAYMENT_STATUS,
+            "trip_op_id": op_id,
+        }}],
+        op_id,
+        notice,
+        chunk_size,
+    )
+
+    # The coach is off sale; seats it held go back
+    departures_closed = cancel_departures(provider, district_from, district_to, date, departure)
+    for schedule_id, seats in totals.pop("seats_by_schedule").items():
+        release_seats(schedule_id, seats)
+    if totals["modified"]:
+        add_to_rollup(
+            {"bus_provider": provider, "district_from": district_from, "district_to": district_to, "date": date},
+            {"cancellations": totals["modified"], "seats_cancelled": totals["seats"], "revenue_cancelled": totals["revenue"]},
+        )
+
+    totals.update(departures_closed=departures_closed, elapsed_ms=round((time.perf_counter() - started) * 1000))
+    metrics.inc("trip_operations_total", action="cancel")
+    metrics.inc("trip_operation_bookings_total", totals["modified"], action="cancel")
+    print(f"Operator cancelled {trip}: {totals}")
+    return totals
+
+
+def reschedule_trip(
+    provider: str,
+    district_from: str,
+    district_to: str,
+    date: str,
+    new_date: str,
+    reason: str,
+    departure: Optional[str] = None,
+    new_departure: Optional[str] = None,
+    chunk_size: int = TRIP_OP_CHUNK,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    op_id = uuid.uuid4().hex
+    trip = f"{provider} {district_from} → {district_to} on {date}"
+    target = find_departure(provider, district_from, district_to, new_date, new_departure or departure)
+    new_time = new_departure or (target or {}).get("departure")
+
+    def notice(b):
+        when = new_date + (f" at {new_time}" if new_time else "")
+        return (
+            f"⚠️ {provider} moved your trip {district_from} → {district_to} (booking {b.get('booking_id')}) "
+            f"from {date} to {when}: {reason}. Reply 'cancel my ticket' if the new time doesn't suit you."
+        )
+
+    update_set = {
+        "date": new_date,
+        "rescheduled_at": now,
+        "rescheduled_from": {"date": date, "departure": departure},
+        "reschedule_reason": reason,
+        "trip_op_id": op_id,
+    }
+    if new_time:
+        update_set["departure"] = new_time
+    update: Dict[str, Any] = {"$set": update_set}
+    if target:
+        update_set["schedule_id"] = target["_id"]
+    else:
+        update["$unset"] = {"schedule_id": ""}
+
+    totals = _apply(_trip_query(provider, district_from, district_to, date, departure), update, op_id, notice, chunk_size)
+
+    for schedule_id, seats in totals.pop("seats_by_schedule").items():
+        release_seats(schedule_id, seats)
+    totals["over_capacity"] = 0
+    if target and totals["seats"]:
+        after = add_seats(target["_id"], totals["seats"])
+        if after:
+            totals["over_capacity"] = max(0, after["seats_booked"] - after["capacity"])
+
+    if totals["modified"]:
+        key = {"bus_provider": provider, "district_from": district_from, "district_to": district_to}
+        moved = {"bookings": totals["modified"], "seats_sold": totals["seats"], "revenue": totals["revenue"]}
+        add_to_rollup(dict(key, date=date), {k: -v for k, v in moved.items()})
+        add_to_rollup(dict(key, date=new_date), moved)
+
+    totals.update(
+        new_date=new_date,
+        new_departure=new_time,
+        target_schedule=str(target["_id"]) if target else None,
+        elapsed_ms=round((time.perf_counter() - started) * 1000),
+    )
+    metrics.inc("trip_operations_total", action="reschedule")
+    metrics.inc("trip_operation_bookings_total", totals["modified"], action="reschedule")
+    print(f"Operator moved {trip} to {new_date}: {totals}")
+    return totals
@@ -0,0 +1,17 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.config import ADMIN_TOKEN
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """True for the configured ADMIN_TOKEN; with none configured, nobody is admin."""
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Route dependency for operator/admin endpoints: the X-Admin-Token header must match ADMIN_TOKEN."""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required (set ADMIN_TOKEN, send X-Admin-Token)")
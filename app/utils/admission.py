@@ -0,0 +1,155 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Tuple
+
+from app.config import (
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    USER_CONCURRENCY_LIMIT,
+    USER_RATE_BURST,
+    USER_RATE_PER_SEC,
+)
+from app.utils import metrics
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Admission control in front of the graph: a token bucket and an in-flight
+    cap per user, plus a global in-flight cap with a bounded wait queue.
+    Everything that does not fit is shed immediately with a retry hint.
+    """
+
+    def __init__(
+        self,
+        rate_per_sec: float,
+        burst: int,
+        user_concurrency: int,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout: float,
+    ):
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst
+        self.user_concurrency = user_concurrency
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._user_in_flight: Dict[str, int] = {}
+        self._in_flight = 0
+        self._waiting = 0
+        self._slots = None
+
+    # ---------- Token bucket ---------- #
+    def _take_token(self, user_id: str):
+        now = time.monotonic()
+        tokens, last = self._buckets.get(user_id, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate_per_sec)
+
+        if tokens < 1:
+            self._buckets[user_id] = (tokens, now)
+            retry_after = math.ceil((1 - tokens) / self.rate_per_sec)
+            raise AdmissionRejected("rate_limited", max(1, retry_after))
+
+        self._buckets[user_id] = (tokens - 1, now)
+        if len(self._buckets) > 10_000:
+            self._prune_buckets(now)
+
+    def _prune_buckets(self, now: float):
+        # A bucket that would have refilled completely carries no state.
+        refill_time = self.burst / self.rate_per_sec
+        for user_id, (_, last) in list(self._buckets.items()):
+            if now - last > refill_time and user_id not in self._user_in_flight:
+                del self._buckets[user_id]
+
+    # ---------- Global in-flight cap ---------- #
+    def _publish(self):
+        metrics.set_gauge("admission_in_flight", self._in_flight)
+        metrics.set_gauge("admission_queue_depth", self._waiting)
+
+    async def _acquire_slot(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        if self._slots.locked():
+            if self._waiting >= self.max_queue:
+                raise AdmissionRejected("queue_full", 1)
+            self._waiting += 1
+            self._publish()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise AdmissionRejected("queue_timeout", max(1, math.ceil(self.queue_timeout)))
+            finally:
+                self._waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        self._in_flight += 1
+        self._publish()
+
+    def _release_slot(self):
+        self._in_flight -= 1
+        self._slots.release()
+        self._publish()
+
+    def check_rate(self, user_id: str):
+        """Spend the user's token up front (before queueing elsewhere); admit() then skips it."""
+        try:
+            self._take_token(user_id)
+        except AdmissionRejected as e:
+            metrics.inc("admission_shed_total", reason=e.reason)
+            raise
+
+    @asynccontextmanager
+    async def admit(self, user_id: str, rate_checked: bool = False):
+        try:
+            if self._user_in_flight.get(user_id, 0) >= self.user_concurrency:
+                raise AdmissionRejected("user_concurrency", 1)
+            if not rate_checked:
+                self._take_token(user_id)
+
+            self._user_in_flight[user_id] = self._user_in_flight.get(user_id, 0) + 1
+            try:
+                await self._acquire_slot()
+            except AdmissionRejected:
+                self._release_user(user_id)
+                raise
+        except AdmissionRejected as e:
+            metrics.inc("admission_shed_total", reason=e.reason)
+            raise
+
+        metrics.inc("admission_admitted_total")
+        try:
+            yield
+        finally:
+            self._release_slot()
+            self._release_user(user_id)
+
+    def _release_user(self, user_id: str):
+        remaining = self._user_in_flight.get(user_id, 1) - 1
+        if remaining > 0:
+            self._user_in_flight[user_id] = remaining
+        else:
+            self._user_in_flight.pop(user_id, None)
+
+
+admission = AdmissionController(
+    rate_per_sec=USER_RATE_PER_SEC,
+    burst=USER_RATE_BURST,
+    user_concurrency=USER_CONCURRENCY_LIMIT,
+    max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+)
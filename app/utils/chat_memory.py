@@ -1,12 +1,29 @@
-from typing import Optional
-from app.config import chat_collection
+from typing import Any, Dict, Optional
+from app.config import (
+    chat_collection,
+    chat_dead_letters_collection,
+    CHAT_WRITE_FLUSH_INTERVAL,
+    CHAT_WRITE_MAX_ATTEMPTS,
+    CHAT_WRITE_MAX_PENDING,
+)
+from app.utils.write_behind import WriteBehindQueue
 from datetime import datetime
 import uuid
 
 
+# Per-turn chat document writes are coalesced and flushed in the background
+chat_writes = WriteBehindQueue(
+    chat_collection,
+    interval=CHAT_WRITE_FLUSH_INTERVAL,
+    max_pending=CHAT_WRITE_MAX_PENDING,
+    max_attempts=CHAT_WRITE_MAX_ATTEMPTS,
+    dead_letters=chat_dead_letters_collection,
+)
+
+
 def create_or_get_thread(user_id: str, thread_id: Optional[str] = None):
     if thread_id:
-        thread = chat_collection.find_one({"thread_id": thread_id})
+        thread = chat_collection.find_one({"thread_id": thread_id}, {"_id": 1})
         if thread:
             return thread_id
     # Create new thread
@@ -19,8 +36,42 @@ def create_or_get_thread(user_id: str, thread_id: Optional[str] = None):
     })
     return new_thread_id
 
+def update_thread(thread_id: str, update: Dict[str, Any]):
+    chat_writes.update(thread_id, update)
+
 def store_message(thread_id: str, user_message: str, bot_response: str):
-    chat_collection.update_one(
-        {"thread_id": thread_id},
-        {"$push": {"chat": {"user": user_message, "bot": bot_response, "timestamp": datetime.utcnow()}}}
-    )
+    update_thread(thread_id, {"$push": {"chat": {"user": user_message, "bot": bot_response, "timestamp": datetime.utcnow()}}})
+
+def get_turn_count(thread_id: str) -> Optional[int]:
+    """Number of stored turns in the thread (none of the chat array leaves Mongo). None if no such thread."""
+    chat_writes.flush_thread(thread_id)
+    docs = list(chat_collection.aggregate([
+        {"$match": {"thread_id": thread_id}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "total": {"$size": {"$ifNull": ["$chat", []]}}}},
+    ]))
+    return docs[0]["total"] if docs else None
+
+def get_messages(thread_id: str, after: int = 0, limit: int = 50):
+    """
+    Turns with seq > `after` (seq is the 1-based position in the thread),
+    at most `limit` of them, plus the thread's total turn count. Only the
+    requested slice of the chat array leaves Mongo. None if no such thread.
+    """
+    chat_writes.flush_thread(thread_id)
+    docs = list(chat_collection.aggregate([
+        {"$match": {"thread_id": thread_id}},
+        {"$limit": 1},
+        {"$project": {
+            "_id": 0,
+            "total": {"$size": {"$ifNull": ["$chat", []]}},
+            "chat": {"$slice": [{"$ifNull": ["$chat", []]}, after, limit]},
+        }},
+    ]))
+    if not docs:
+        return None
+    messages = [
+        {"seq": after + i, "user": m.get("user"), "bot": m.get("bot"), "timestamp": m.get("timestamp")}
+        for i, m in enumerate(docs[0]["chat"], 1)
+    ]
+    return docs[0]["total"], messages
@@ -0,0 +1,16 @@
+from datetime import datetime, timedelta, timezone
+
+from app.config import LOCAL_UTC_OFFSET_HOURS
+
+# Travel dates, departure times and "today"/"tomorrow" in chat are all
+# Bangladesh local time, whatever timezone the server runs in
+LOCAL_TZ = timezone(timedelta(hours=LOCAL_UTC_OFFSET_HOURS))
+
+
+def local_now() -> datetime:
+    """Current local time (naive, like the dates and times stored in bookings and schedules)."""
+    return datetime.now(LOCAL_TZ).replace(tzinfo=None)
+
+
+def local_today() -> str:
+    return local_now().strftime("%Y-%m-%d")
@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import Future
+from queue import Empty, Queue
+from typing import Callable, List
+
+from app.config import client, EMBEDDING_MODEL, EMBED_BATCH_WINDOW_MS, EMBED_MAX_BATCH, EMBED_TIMEOUT_SECONDS
+from app.utils import metrics
+
+
+class EmbeddingBatcher:
+    """
+    Collects embed() calls from concurrent threads and sends them upstream
+    as one embeddings request per `window` seconds (or per `max_batch`
+    inputs, whichever comes first), then hands each caller its own vector.
+
+    `create` is an OpenAI-style `embeddings.create(model=..., input=[...])`.
+    """
+
+    def __init__(self, create: Callable, model: str, window: float = 0.005, max_batch: int = 64,
+                 timeout: float = 30.0):
+        self.create = create
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue: "Queue[tuple]" = Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                    self._worker.start()
+
+    def submit(self, text: str) -> "Future[List[float]]":
+        # A bad input would fail the whole upstream request, and with it
+        # every other caller batched alongside; reject it here instead
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("Embedding input must be a non-empty string")
+        self._ensure_worker()
+        future: "Future[List[float]]" = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        return self.submit(text).result(timeout=self.timeout)
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        futures = [self.submit(t) for t in texts]
+        deadline = time.monotonic() + self.timeout
+        return [f.result(timeout=max(0.0, deadline - time.monotonic())) for f in futures]
+
+    # ---------- worker ---------- #
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Identical texts in one window share an input
+            inputs = list(dict.fromkeys(text for text, _ in batch))
+            # Nothing may escape: this is the only worker, and callers wait on it
+            try:
+                response = self.create(model=self.model, input=inputs)
+                vectors = {inputs[item.index]: item.embedding for item in response.data}
+                metrics.inc("embed_batches_total")
+                metrics.inc("embed_inputs_total", len(batch))
+                metrics.set_gauge("embed_last_batch_size", len(batch))
+                for text, future in batch:
+                    if text in vectors:
+                        future.set_result(vectors[text])
+                    else:
+                        future.set_exception(RuntimeError("Embedding response has no vector for this input"))
+            except Exception as e:
+                metrics.inc("embed_batch_errors_total")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+embedder = EmbeddingBatcher(
+    client.embeddings.create,
+    EMBEDDING_MODEL,
+    window=EMBED_BATCH_WINDOW_MS / 1000,
+    max_batch=EMBED_MAX_BATCH,
+    timeout=EMBED_TIMEOUT_SECONDS,
+)
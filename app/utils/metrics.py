@@ -0,0 +1,40 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Tuple
+
+
+# ---------- In-process metrics registry ---------- #
+# Counters only ever go up, gauges hold the latest value. Labels are a flat
+# dict, stored as a sorted tuple so the same label set always maps to one key.
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Tuple], float] = defaultdict(float)
+_gauges: Dict[Tuple[str, Tuple], float] = {}
+
+
+def _key(name: str, labels: Dict[str, str]):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def set_gauge(name: str, value: float, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def snapshot():
+    with _lock:
+        counters = list(_counters.items())
+        gauges = list(_gauges.items())
+
+    def _rows(items):
+        return [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(items)
+        ]
+
+    return {"counters": _rows(counters), "gauges": _rows(gauges)}
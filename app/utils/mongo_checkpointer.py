@@ -0,0 +1,211 @@
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+
+def _field(name: str) -> str:
+    # Channel names become document keys; keep them legal for Mongo
+    return name.replace("$", "＄").replace(".", "．")
+
+
+class MongoCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer that keeps one document per (thread_id,
+    checkpoint_ns) holding the latest checkpoint and its channel values.
+
+    Each `put` is a single update_one that `$set`s only the channels listed
+    in `new_versions`, so a turn that changes booking_data doesn't rewrite
+    the history channel and vice versa. Only the latest checkpoint is
+    kept: the chat flow resumes threads and never time-travels.
+    """
+
+    def __init__(self, collection, *, serde=None):
+        super().__init__(serde=serde)
+        self.collection = collection
+
+    def setup(self):
+        self.collection.create_index([("thread_id", 1), ("checkpoint_ns", 1)], unique=True)
+
+    # ---------- helpers ---------- #
+    @staticmethod
+    def _ids(config: RunnableConfig) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+    def _dump(self, value: Any) -> Dict[str, Any]:
+        type_, data = self.serde.dumps_typed(value)
+        return {"type": type_, "data": data}
+
+    def _load(self, blob: Dict[str, Any]) -> Any:
+        return self.serde.loads_typed((blob["type"], blob["data"]))
+
+    def _to_tuple(self, doc: Dict[str, Any]) -> CheckpointTuple:
+        checkpoint = self._load(doc["checkpoint"])
+        channels = doc.get("channels", {})
+        checkpoint["channel_values"] = {
+            channel: self._load(channels[_field(channel)])
+            for channel, version in checkpoint.get("channel_versions", {}).items()
+            if _field(channel) in channels
+            and channels[_field(channel)].get("version") == version
+            and channels[_field(channel)]["type"] != "empty"
+        }
+
+        pending = []
+        for task_id, writes in sorted((doc.get("pending_writes") or {}).items()):
+            for _, write in sorted(writes.items(), key=lambda kv: int(kv[0])):
+                pending.append((task_id, write["channel"], self._load(write["value"])))
+
+        thread_id, ns = doc["thread_id"], doc["checkpoint_ns"]
+        parent_id = doc.get("parent_checkpoint_id")
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": doc["checkpoint_id"]}},
+            checkpoint=checkpoint,
+            metadata=self._load(doc["metadata"]),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=pending,
+        )
+
+    # ---------- sync API ---------- #
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, ns = self._ids(config)
+        doc = self.collection.find_one({"thread_id": thread_id, "checkpoint_ns": ns})
+        if not doc:
+            return None
+        wanted = get_checkpoint_id(config)
+        if wanted and wanted != doc["checkpoint_id"]:
+            return None
+        return self._to_tuple(doc)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query: Dict[str, Any] = {}
+        if config:
+            thread_id, ns = self._ids(config)
+            query["thread_id"] = thread_id
+            if "checkpoint_ns" in config["configurable"]:
+                query["checkpoint_ns"] = ns
+            if get_checkpoint_id(config):
+                query["checkpoint_id"] = get_checkpoint_id(config)
+        if before and get_checkpoint_id(before):
+            query["checkpoint_id"] = {"$lt": get_checkpoint_id(before)}
+
+        cursor = self.collection.find(query).sort("checkpoint_id", -1)
+        if limit:
+            cursor = cursor.limit(limit)
+        for doc in cursor:
+            item = self._to_tuple(doc)
+            if filter and any(item.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id, ns = self._ids(config)
+        stored = dict(checkpoint)
+        values = stored.pop("channel_values", {}) or {}
+
+        changes: Dict[str, Any] = {
+            "thread_id": thread_id,
+            "checkpoint_ns": ns,
+            "checkpoint_id": checkpoint["id"],
+            "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+            "checkpoint": self._dump(stored),
+            "metadata": self._dump(metadata),
+            "updated_at": datetime.utcnow(),
+        }
+        # Delta write: only channels that got a new version this step
+        for channel, version in new_versions.items():
+            blob = self._dump(values[channel]) if channel in values else {"type": "empty", "data": None}
+            changes[f"channels.{_field(channel)}"] = dict(blob, version=version)
+
+        self.collection.update_one(
+            {"thread_id": thread_id, "checkpoint_ns": ns},
+            {"$set": changes, "$unset": {"pending_writes": ""}},
+            upsert=True,
+        )
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id, ns = self._ids(config)
+        changes = {}
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            changes[f"pending_writes.{_field(task_id)}.{idx}"] = {"channel": channel, "value": self._dump(value)}
+        if changes:
+            self.collection.update_one(
+                {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": config["configurable"]["checkpoint_id"]},
+                {"$set": changes},
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.collection.delete_many({"thread_id": thread_id})
+
+    # ---------- async API (the driver is sync; run it off the event loop) ---------- #
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
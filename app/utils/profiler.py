@@ -0,0 +1,237 @@
+import functools
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import PROFILE_BUFFER_SIZE, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_SAMPLE_RATE
+from app.utils import metrics
+from app.utils.admin_auth import is_admin
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+def _stack(frame) -> List[tuple]:
+    """Root-first (function, file, first line) of every frame up to `frame`."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class _Section:
+    def __init__(self, profile: "RequestProfile", name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        ident = threading.get_ident()
+        # Samples on this thread drop the frames above the section's caller
+        # (threadpool, anyio, ...) and are labeled with the section
+        base = len(_stack(sys._getframe(1))) - 1
+        with self.profile._lock:
+            self._previous = self.profile._threads.get(ident)
+            self.profile._threads[ident] = (self.name, base)
+        self._ident = ident
+        self._start = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = (time.perf_counter() - self._start) * 1000
+        cpu = (time.thread_time() - self._cpu) * 1000
+        with self.profile._lock:
+            if self._previous is None:
+                self.profile._threads.pop(self._ident, None)
+            else:
+                self.profile._threads[self._ident] = self._previous
+            self.profile.sections.append({
+                "name": self.name,
+                "start_ms": round((self._start - self.profile._t0) * 1000, 3),
+                "wall_ms": round(wall, 3),
+                "cpu_ms": round(cpu, 3),
+            })
+        return False
+
+
+class RequestProfile:
+    """
+    One profiled request: wall/CPU time per section (the graph, each node)
+    plus stacks of the threads running those sections, sampled every
+    `interval` seconds from sys._current_frames() by a background thread.
+    CPU time is the running thread's own (time.thread_time), so wall minus
+    CPU is what the section spent waiting (Mongo, OpenAI, the embedder).
+    """
+
+    def __init__(self, trigger: str, thread_id: Optional[str] = None, interval: float = PROFILE_SAMPLE_INTERVAL_MS / 1000):
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.thread_id = thread_id
+        self.interval = interval
+        self.started_at = datetime.utcnow()
+        self.wall_ms: Optional[float] = None
+        self.sections: List[Dict[str, Any]] = []
+        self.samples: List[List[tuple]] = []
+        self._t0 = time.perf_counter()
+        self._threads: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def section(self, name: str) -> _Section:
+        return _Section(self, name)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, (label, base) in self._threads.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self.samples.append([("[" + label + "]", "", 0)] + _stack(frame)[base:])
+
+    def finish(self):
+        self._stop.set()
+        self._sampler.join()
+        self.wall_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+        profile_store.add(self)
+        metrics.inc("profiles_captured_total", trigger=self.trigger)
+
+    # ---------- views ---------- #
+    def summary(self) -> Dict[str, Any]:
+        graph = next((s for s in self.sections if s["name"] == "graph"), None)
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "thread_id": self.thread_id,
+            "started_at": self.started_at.isoformat() + "Z",
+            "wall_ms": self.wall_ms,
+            "graph": {"wall_ms": graph["wall_ms"], "cpu_ms": graph["cpu_ms"]} if graph else None,
+            "nodes": [
+                {"node": s["name"], "wall_ms": s["wall_ms"], "cpu_ms": s["cpu_ms"]}
+                for s in sorted(self.sections, key=lambda s: s["start_ms"]) if s["name"] != "graph"
+            ],
+            "samples": len(self.samples),
+            "sample_interval_ms": self.interval * 1000,
+        }
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """Two speedscope profiles: the request's sections as a timeline, and the sampled stacks."""
+        frames: List[Dict[str, Any]] = []
+        index: Dict[tuple, int] = {}
+
+        def frame(key: tuple) -> int:
+            if key not in index:
+                index[key] = len(frames)
+                name, file, line = key
+                frames.append({"name": name, "file": file, "line": line} if file else {"name": name})
+            return index[key]
+
+        end = self.wall_ms or 0
+        request = frame(("request", "", 0))
+        marks = []
+        for s in self.sections:
+            section = frame((s["name"], "", 0))
+            # At the same instant: closes first, then the longer section opens
+            marks.append((s["start_ms"] + s["wall_ms"], 0, 0, "C", section))
+            marks.append((s["start_ms"], 1, -s["wall_ms"], "O", section))
+        events = (
+            [{"type": "O", "frame": request, "at": 0}]
+            + [{"type": kind, "frame": f, "at": at} for at, _, _, kind, f in sorted(marks)]
+            + [{"type": "C", "frame": request, "at": max([end] + [m[0] for m in marks])}]
+        )
+
+        samples = [[frame(key) for key in stack] for stack in self.samples]
+        interval_ms = self.interval * 1000
+        name = f"chat turn {self.thread_id or ''} {self.started_at.isoformat()}Z".replace("  ", " ")
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "app.utils.profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "evented",
+                    "name": "wall time by node",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": end,
+                    "events": events,
+                },
+                {
+                    "type": "sampled",
+                    "name": f"stack samples every {interval_ms:g} ms",
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": len(samples) * interval_ms,
+                    "samples": samples,
+                    "weights": [interval_ms] * len(samples),
+                },
+            ],
+        }
+
+
+class ProfileStore:
+    """The last `size` finished profiles, newest first."""
+
+    def __init__(self, size: int):
+        self._profiles: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.appendleft(profile)
+
+    def list(self) -> List[RequestProfile]:
+        with self._lock:
+            return list(self._profiles)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+
+profile_store = ProfileStore(PROFILE_BUFFER_SIZE)
+
+
+# ---------- request hooks ---------- #
+def profile_trigger(header: Optional[str]) -> Optional[str]:
+    """Why this request is profiled ("header", "sampled") or None."""
+    if header and is_admin(header):
+        return "header"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+def set_current_profile(profile: Optional[RequestProfile]):
+    """Makes `profile` the one profiled_node() records into, in this context."""
+    return _current.set(profile)
+
+
+def profiled_node(name: str, fn):
+    """A graph node that records a section when its request is being profiled."""
+    @functools.wraps(fn)
+    def node(state):
+        profile = _current.get()
+        if profile is None:
+            return fn(state)
+        with profile.section(name):
+            return fn(state)
+    return node
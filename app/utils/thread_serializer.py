@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.config import thread_leases_collection, THREAD_DEDUP, THREAD_LEASE_TTL, THREAD_LEASE_WAIT
+from app.utils import metrics
+from app.utils.admission import AdmissionRejected
+
+
+def message_hash(message: str) -> str:
+    return hashlib.sha1(" ".join((message or "").lower().split()).encode("utf-8")).hexdigest()
+
+
+class ThreadLease:
+    """
+    Cross-worker lease on a thread: one document per thread, `owner` set
+    while a turn runs. An expired lease (crashed worker) is free to take.
+    Releasing keeps the turn's result on the document for a while, so a
+    duplicate of that turn waiting on another worker can return it.
+    """
+
+    def __init__(self, collection, ttl: float):
+        self.collection = collection
+        self.ttl = ttl
+
+    def ensure_indexes(self):
+        self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    def try_acquire(self, thread_id: str, owner: str, key: str) -> bool:
+        now = datetime.utcnow()
+        try:
+            # Held (and unexpired) -> no match -> the upsert collides on _id
+            self.collection.update_one(
+                {"_id": thread_id, "$or": [{"owner": None}, {"expires_at": {"$lt": now}}]},
+                {
+                    "$set": {
+                        "owner": owner,
+                        "message_hash": key,
+                        "started_at": now,
+                        "expires_at": now + timedelta(seconds=self.ttl),
+                    },
+                    "$unset": {"result": "", "finished_at": ""},
+                },
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def renew(self, thread_id: str, owner: str) -> bool:
+        """Push out the expiry of a lease we still hold (a turn running long)."""
+        result = self.collection.update_one(
+            {"_id": thread_id, "owner": owner},
+            {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)}},
+        )
+        return result.matched_count > 0
+
+    def peek(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one({"_id": thread_id})
+
+    def release(self, thread_id: str, owner: str, result: Any = None):
+        now = datetime.utcnow()
+        self.collection.update_one(
+            {"_id": thread_id, "owner": owner},
+            {"$set": {
+                "owner": None,
+                "result": result,
+                "finished_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl),
+            }},
+        )
+
+
+class _Slot:
+    __slots__ = ("lock", "users", "in_flight")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+        self.in_flight: Dict[str, asyncio.Future] = {}
+
+
+class ThreadSerializer:
+    """
+    Runs turns of one thread strictly one after another (FIFO) while turns
+    of different threads run in parallel:
+    - in this process, one asyncio.Lock per active thread
+    - across workers, a ThreadLease taken while holding that lock
+    With `dedup`, a message identical to one already queued or running for
+    the thread waits for that turn and returns its result instead of
+    running again (a double send or a frontend retry).
+    """
+
+    def __init__(
+        self,
+        lease: Optional[ThreadLease] = None,
+        dedup: bool = True,
+        wait_timeout: float = 60.0,
+        poll_min: float = 0.05,
+        poll_max: float = 0.5,
+    ):
+        self.lease = lease
+        self.dedup = dedup
+        self.wait_timeout = wait_timeout
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._slots: Dict[str, _Slot] = {}
+
+    def active_threads(self) -> int:
+        return len(self._slots)
+
+    async def run(self, thread_id: str, message: str, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        key = message_hash(message)
+        slot = self._slots.setdefault(thread_id, _Slot())
+        if self.dedup and key in slot.in_flight:
+            metrics.inc("thread_dedup_total", scope="local")
+            return await asyncio.shield(slot.in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on it; don't warn about an unread exception
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if self.dedup:
+            slot.in_flight[key] = future
+        slot.users += 1
+        try:
+            if slot.lock.locked():
+                metrics.inc("thread_turns_queued_total")
+            async with slot.lock:
+                result = await self._leased(thread_id, key, fn, args)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        finally:
+            if slot.in_flight.get(key) is future:
+                del slot.in_flight[key]
+            slot.users -= 1
+            if not slot.users and self._slots.get(thread_id) is slot:
+                del self._slots[thread_id]
+
+    async def _leased(self, thread_id: str, key: str, fn, args) -> Any:
+        if self.lease is None:
+            return await fn(*args)
+
+        owner = f"{self.owner_prefix}:{uuid.uuid4().hex[:12]}"
+        started = time.monotonic()
+        delay = self.poll_min
+        duplicate_of = None
+        while True:
+            # While a duplicate of our message runs elsewhere, look for its result first
+            if duplicate_of is None and await asyncio.to_thread(self.lease.try_acquire, thread_id, owner, key):
+                break
+            held = await asyncio.to_thread(self.lease.peek, thread_id)
+            running = bool(held and held.get("owner") and held["expires_at"] > datetime.utcnow())
+            if running and self.dedup and held.get("message_hash") == key:
+                duplicate_of = held.get("started_at")
+            elif not running:
+                if (
+                    duplicate_of is not None
+                    and held
+                    and held.get("started_at") == duplicate_of
+                    and held.get("result") is not None
+                ):
+                    metrics.inc("thread_dedup_total", scope="lease")
+                    return held["result"]
+                duplicate_of = None
+                continue
+            if time.monotonic() - started > self.wait_timeout:
+                metrics.inc("thread_lease_timeouts_total")
+                raise AdmissionRejected("thread_busy", retry_after=5)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.poll_max)
+
+        metrics.set_gauge("thread_lease_wait_ms", (time.monotonic() - started) * 1000)
+        renewer = asyncio.create_task(self._renew(thread_id, owner))
+        result = None
+        try:
+            result = await fn(*args)
+            return result
+        finally:
+            renewer.cancel()
+            await asyncio.to_thread(self.lease.release, thread_id, owner, result)
+
+    async def _renew(self, thread_id: str, owner: str):
+        # Keeps the lease alive for as long as the turn runs; the TTL only
+        # has to cover a worker dying mid-turn
+        while True:
+            await asyncio.sleep(self.lease.ttl / 3)
+            try:
+                if not await asyncio.to_thread(self.lease.renew, thread_id, owner):
+                    metrics.inc("thread_lease_lost_total")
+                    return
+            except Exception as e:
+                print(f"Thread lease renewal failed for {thread_id}: {e}")
+                metrics.inc("thread_lease_renew_errors_total")
+
+
+thread_lease = ThreadLease(thread_leases_collection, THREAD_LEASE_TTL)
+thread_serializer = ThreadSerializer(thread_lease, dedup=THREAD_DEDUP, wait_timeout=THREAD_LEASE_WAIT)
@@ -0,0 +1,240 @@
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.utils import metrics
+
+
+def _push_items(value: Any) -> List[Any]:
+    if isinstance(value, dict) and "$each" in value:
+        return list(value["$each"])
+    return [value]
+
+
+def _merge_update(base: Dict[str, Any], update: Dict[str, Any]) -> bool:
+    """
+    Fold `update` into `base` in place. Returns False (leaving `base`
+    untouched) when either side uses an operator we can't coalesce safely.
+    """
+    mergeable = ("$set", "$unset", "$push", "$inc")
+    if any(op not in mergeable for op in list(base) + list(update)):
+        return False
+    # $push modifiers ($slice, $position, ...) don't compose across updates
+    if any(
+        isinstance(v, dict) and "$each" in v and set(v) - {"$each"}
+        for v in update.get("$push", {}).values()
+    ):
+        return False
+
+    for field, value in update.get("$set", {}).items():
+        base.setdefault("$set", {})[field] = value
+        base.get("$unset", {}).pop(field, None)
+    for field in update.get("$unset", {}):
+        base.setdefault("$unset", {})[field] = ""
+        base.get("$set", {}).pop(field, None)
+    for field, value in update.get("$push", {}).items():
+        base.setdefault("$push", {}).setdefault(field, {"$each": []})["$each"].extend(_push_items(value))
+    for field, value in update.get("$inc", {}).items():
+        incs = base.setdefault("$inc", {})
+        incs[field] = incs.get(field, 0) + value
+
+    for op in [op for op, fields in base.items() if not fields]:
+        del base[op]
+    return True
+
+
+class WriteQueueFull(Exception):
+    """The queue is at `max_pending` threads and could not be drained."""
+
+
+class WriteBehindQueue:
+    """
+    Coalesces per-thread chat document updates and writes them with one
+    bulk_write per flush interval. Reads for a thread must go through
+    `flush_thread` first so a turn always sees the previous turn's writes.
+
+    A write that the server rejects only holds up its own thread; after
+    `max_attempts` rejections it is moved to `dead_letters` (when given)
+    and dropped from the queue.
+    """
+
+    def __init__(
+        self,
+        collection,
+        key: str = "thread_id",
+        interval: float = 0.05,
+        max_pending: int = 500,
+        max_attempts: int = 3,
+        dead_letters=None,
+    ):
+        self.collection = collection
+        self.key = key
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.dead_letters = dead_letters
+
+        self._pending: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        # thread_id -> rejections of the op at the head of its queue
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = None
+
+    def update(self, thread_id: str, update: Dict[str, Any]):
+        if self._worker is not None and self._is_full(thread_id):
+            # Backpressure: drain on the caller rather than grow without bound
+            try:
+                self.flush()
+            except Exception as e:
+                raise WriteQueueFull(f"write-behind queue full ({self.max_pending} threads): {e}") from e
+
+        with self._lock:
+            queued = self._pending.setdefault(thread_id, [])
+            # never fold new writes into an op the server has already rejected
+            held = len(queued) == 1 and thread_id in self._attempts
+            if not queued or held or not _merge_update(queued[-1], update):
+                merged: Dict[str, Any] = {}
+                queued.append(merged if _merge_update(merged, update) else dict(update))
+            depth = len(self._pending)
+        metrics.set_gauge("chat_write_queue_depth", depth)
+
+        if self._worker is None:
+            # No background flusher (scripts, shutdown): write through.
+            with self._flush_lock:
+                self._write(self._take([thread_id]))
+        elif depth >= self.max_pending:
+            self._wakeup.set()
+
+    def _is_full(self, thread_id: str) -> bool:
+        with self._lock:
+            return thread_id not in self._pending and len(self._pending) >= self.max_pending
+
+    def _take(self, thread_ids=None):
+        with self._lock:
+            if thread_ids is None:
+                taken, self._pending = self._pending, OrderedDict()
+            else:
+                taken = OrderedDict(
+                    (tid, self._pending.pop(tid)) for tid in thread_ids if tid in self._pending
+                )
+        return taken
+
+    def _restore(self, taken):
+        with self._lock:
+            for tid, ops in reversed(taken.items()):
+                self._pending[tid] = ops + self._pending.get(tid, [])
+                self._pending.move_to_end(tid, last=False)
+
+    def _reject(self, thread_id: str, op: Dict[str, Any], error: str) -> bool:
+        """Count a rejection of `op`. Returns True once it has been dead-lettered."""
+        attempts = self._attempts.get(thread_id, 0) + 1
+        if attempts < self.max_attempts:
+            self._attempts[thread_id] = attempts
+            return False
+        if self.dead_letters is not None:
+            try:
+                self.dead_letters.insert_one({
+                    self.key: thread_id,
+                    # operator keys ($push, ...) can't be stored as field names
+                    "update": json.dumps(op, default=str),
+                    "error": error,
+                    "attempts": attempts,
+                    "failed_at": datetime.utcnow(),
+                })
+            except Exception as e:
+                print(f"Write-behind dead-letter insert failed for {thread_id}, will retry: {e}")
+                self._attempts[thread_id] = attempts
+                return False
+        print(f"Write-behind dropped an update for {thread_id} after {attempts} attempts: {error}")
+        metrics.inc("chat_write_dead_letters_total")
+        self._attempts.pop(thread_id, None)
+        return True
+
+    def _write(self, taken):
+        # One round per op depth: each thread sends only its oldest op, so
+        # per-thread order holds even though the batch is unordered.
+        while taken:
+            heads = [(tid, ops[0]) for tid, ops in taken.items()]
+            requests = [UpdateOne({self.key: tid}, op) for tid, op in heads]
+            failed: Dict[int, str] = {}
+            try:
+                self.collection.bulk_write(requests, ordered=False)
+            except BulkWriteError as e:
+                failed = {err["index"]: err.get("errmsg", "") for err in e.details["writeErrors"]}
+            except Exception as e:
+                print(f"Write-behind flush failed, will retry: {e}")
+                metrics.inc("chat_write_flush_errors_total")
+                self._restore(taken)
+                raise
+            metrics.inc("chat_write_flushes_total")
+            metrics.inc("chat_write_ops_total", len(requests) - len(failed))
+            if failed:
+                print(f"Write-behind flush rejected {len(failed)} of {len(requests)} ops")
+                metrics.inc("chat_write_flush_errors_total")
+
+            remaining: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+            held: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+            for i, (tid, op) in enumerate(heads):
+                if i not in failed:
+                    self._attempts.pop(tid, None)
+                elif not self._reject(tid, op, failed[i]):
+                    # this thread waits for the next flush; the others carry on
+                    held[tid] = taken[tid]
+                    continue
+                if len(taken[tid]) > 1:
+                    remaining[tid] = taken[tid][1:]
+            if held:
+                self._restore(held)
+            taken = remaining
+
+    def flush(self):
+        with self._flush_lock:
+            self._write(self._take())
+
+    def flush_thread(self, thread_id: str) -> bool:
+        """
+        Write this thread's queued updates before a read. On failure the
+        updates stay queued for the worker and the read sees what is stored.
+        """
+        # Holding the flush lock also waits out a background flush that may
+        # already have taken this thread's writes but not finished them.
+        with self._flush_lock:
+            try:
+                self._write(self._take([thread_id]))
+            except Exception:
+                return False
+        with self._lock:
+            return thread_id not in self._pending
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def start(self):
+        if self._worker is not None:
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._run, name="chat-write-behind", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        if self._worker is None:
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._worker.join()
+        self._worker = None
+        self.flush()
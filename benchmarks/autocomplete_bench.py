@@ -0,0 +1,51 @@
+"""
+Autocomplete latency over a synthetic 50k-point catalog, by prefix length,
+for the all-points scope and a single district's points.
+
+    python -m benchmarks.autocomplete_bench --names 50000
+"""
+import argparse
+import random
+import time
+
+from app.services.autocomplete import AutocompleteIndex
+from benchmarks.gazetteer_bench import make_catalog
+
+
+def run(label, index, queries, district=None):
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        index.suggest(q, "point", district)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(
+        f"{label:<22} p50={times[len(times) // 2] * 1e6:.0f}us "
+        f"p99={times[int(len(times) * 0.99)] * 1e6:.0f}us max={times[-1] * 1e6:.0f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.names)
+    start = time.perf_counter()
+    index = AutocompleteIndex(catalog)
+    print(f"built index in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(3)
+    points = [(p["name"], d["name"]) for d in catalog["districts"] for p in d["dropping_points"]]
+    sample = rng.sample(points, args.queries)
+    for length in (1, 2, 3, 5):
+        run(f"all points, {length} chars", index, [n[:length] for n, _ in sample])
+    for length in (1, 3):
+        district = sample[0][1]
+        names = [n for n, d in points if d == district]
+        run(f"one district, {length} chars", index, [rng.choice(names)[:length] for _ in range(args.queries)], district)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Exporting 1M bookings: streamed from a batched server-side cursor through
+the NDJSON/CSV chunk encoders vs materializing the result first. Reports
+throughput and peak Python heap (tracemalloc) for each.
+
+Runs against a scratch database, never the live bookings:
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.booking_export_bench --bookings 1000000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.config import mongo
+from app.services.booking_export import EXPORT_FIELDS, csv_chunks, ndjson_chunks
+
+PROVIDERS = ["Hanif", "Green Line", "Shyamoli", "Ena", "Desh Travels", "Soudia"]
+
+
+def _load(collection, count):
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(count):
+        trip = start + timedelta(days=rng.randrange(730))
+        seats = rng.randint(1, 4)
+        batch.append({
+            "booking_id": f"b{i}", "date": trip.strftime("%Y-%m-%d"),
+            "bus_provider": rng.choice(PROVIDERS), "district_from": "Dhaka", "district_to": "Rajshahi",
+            "pickup_point": "Gabtoli", "dropping_point": "Shaheb Bazar", "name": f"Passenger {i}",
+            "phone": f"017{rng.randrange(10**8):08d}", "seats": seats, "fare": 700,
+            "total_amount": 700 * seats, "status": "confirmed", "payment_status": "paid",
+            "booked_at": trip - timedelta(days=3),
+        })
+        if len(batch) >= 10_000:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def _export(collection, encoder, materialize, batch_size):
+    projection = {"_id": 0, **{f: 1 for f in EXPORT_FIELDS}}
+    rows = collection.find({}, projection, batch_size=batch_size).sort("date", 1)
+    if materialize:
+        rows = list(rows)
+    written = 0
+    for chunk in encoder(rows):
+        written += len(chunk)  # stands in for the socket write
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    args = parser.parse_args()
+
+    collection = mongo["BussTicketBD_bench"]["bookings_export"]
+    collection.drop()
+    start = time.perf_counter()
+    _load(collection, args.bookings)
+    collection.create_index("date")
+    print(f"loaded {args.bookings} bookings in {time.perf_counter() - start:.0f}s")
+
+    for label, encoder in (("ndjson", ndjson_chunks), ("csv", csv_chunks)):
+        for materialize in (False, True):
+            mode = "materialized" if materialize else "streamed"
+            start = time.perf_counter()
+            size = _export(collection, encoder, materialize, args.batch_size)
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            _export(collection, encoder, materialize, args.batch_size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{label:<7}{mode:<13} {args.bookings / elapsed:,.0f} rows/s "
+                f"{size / 2**20:.0f} MiB out, peak heap {peak / 2**20:.1f} MiB"
+            )
+
+    if not args.keep:
+        mongo.drop_database("BussTicketBD_bench")
+
+
+if __name__ == "__main__":
+    main()
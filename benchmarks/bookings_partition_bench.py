@@ -0,0 +1,141 @@
+"""
+View/cancel lookups with all bookings in one collection vs the hot
+(upcoming trips) + archive split, at 10M historical bookings.
+
+Runs against a scratch database, never the live bookings:
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bookings_partition_bench --bookings 10000000
+
+Cases, each for random phones:
+  single/regex    the old query: phone regex + status, sorted by booked_at
+  single/indexed  one collection, phone_key index
+  hot/cancel      cancel flow: upcoming confirmed trips, hot collection only
+  hot+archive     view flow: every trip for the phone across both collections
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, DESCENDING
+
+from app.config import mongo
+from app.services.bookings_store import phone_key
+
+BATCH = 10_000
+
+
+def _report(label, samples):
+    samples = sorted(samples)
+    print(
+        f"{label:<15} p50={samples[len(samples) // 2] * 1000:.2f}ms "
+        f"p99={samples[int(len(samples) * 0.99)] * 1000:.2f}ms "
+        f"mean={statistics.mean(samples) * 1000:.2f}ms"
+    )
+
+
+def _bookings(rng, count, phones, upcoming_share):
+    today = datetime.utcnow()
+    for i in range(count):
+        upcoming = rng.random() < upcoming_share
+        trip = today + timedelta(days=rng.randint(1, 60) if upcoming else -rng.randint(1, 3 * 365))
+        phone = f"017{rng.randrange(phones):08d}"
+        yield {
+            "booking_id": f"b{i}",
+            "phone": phone,
+            "phone_key": phone_key(phone),
+            "date": trip.strftime("%Y-%m-%d"),
+            "status": "confirmed" if rng.random() < 0.9 else "cancelled",
+            "booked_at": trip - timedelta(days=rng.randint(1, 30)),
+            "seats": rng.randint(1, 4),
+        }
+
+
+def _load(collections, rng, count, phones, upcoming_share):
+    """Write every booking to `single`, and to `hot` or `archive` by date."""
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    single, hot, archive = collections
+    batch = []
+
+    def flush():
+        single.insert_many([dict(b) for b in batch], ordered=False)
+        upcoming = [dict(b) for b in batch if b["date"] >= today]
+        past = [dict(b) for b in batch if b["date"] < today]
+        if upcoming:
+            hot.insert_many(upcoming, ordered=False)
+        if past:
+            archive.insert_many(past, ordered=False)
+        batch.clear()
+
+    for booking in _bookings(rng, count, phones, upcoming_share):
+        batch.append(booking)
+        if len(batch) >= BATCH:
+            flush()
+    if batch:
+        flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=10_000_000)
+    parser.add_argument("--phones", type=int, default=500_000)
+    parser.add_argument("--upcoming-share", type=float, default=0.02)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    args = parser.parse_args()
+
+    bench_db = mongo["BussTicketBD_bench"]
+    single, hot, archive = bench_db["bookings_single"], bench_db["bookings"], bench_db["bookings_archive"]
+    for c in (single, hot, archive):
+        c.drop()
+
+    rng = random.Random(5)
+    start = time.perf_counter()
+    _load((single, hot, archive), rng, args.bookings, args.phones, args.upcoming_share)
+    print(
+        f"loaded {args.bookings} bookings in {time.perf_counter() - start:.0f}s "
+        f"(hot={hot.estimated_document_count()} archive={archive.estimated_document_count()})"
+    )
+
+    # Same indexes as ensure_booking_indexes()
+    single.create_index([("phone_key", ASCENDING), ("booked_at", DESCENDING)])
+    for c in (hot, archive):
+        c.create_index([("phone_key", ASCENDING), ("booked_at", DESCENDING)])
+    hot.create_index([("phone_key", ASCENDING), ("status", ASCENDING), ("booked_at", DESCENDING)])
+
+    phones = [f"017{rng.randrange(args.phones):08d}" for _ in range(args.queries)]
+    cases = {
+        "single/regex": lambda p: list(
+            single.find({"phone": {"$regex": p, "$options": "i"}, "status": "confirmed"}, {"_id": 0})
+            .sort("booked_at", -1)
+        ),
+        "single/indexed": lambda p: list(
+            single.find({"phone_key": phone_key(p), "status": "confirmed"}, {"_id": 0}).sort("booked_at", -1)
+        ),
+        "hot/cancel": lambda p: list(
+            hot.find({"phone_key": phone_key(p), "status": "confirmed"}, {"_id": 0}).sort("booked_at", -1)
+        ),
+        "hot+archive": lambda p: sorted(
+            list(hot.find({"phone_key": phone_key(p)}, {"_id": 0}).sort("booked_at", -1))
+            + list(archive.find({"phone_key": phone_key(p)}, {"_id": 0}).sort("booked_at", -1)),
+            key=lambda b: b["booked_at"],
+            reverse=True,
+        ),
+    }
+    for label, run in cases.items():
+        # The regex scan is slow at 10M; a handful of samples is plenty
+        sample = phones[:20] if label == "single/regex" else phones
+        times = []
+        for p in sample:
+            t = time.perf_counter()
+            run(p)
+            times.append(time.perf_counter() - t)
+        _report(label, times)
+
+    if not args.keep:
+        mongo.drop_database("BussTicketBD_bench")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Ingest a synthetic catalog with 100k dropping points, then re-ingest it
+unchanged to show the hash skip. This replaces the active catalog, so point
+MONGO_URI at a scratch server.
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.catalog_ingest_bench --points 100000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from app.services.catalog_ingest import ingest_catalog, validate_catalog
+
+
+def write_catalog(path: str, districts: int, points: int, providers: int):
+    per_district = max(1, points // districts)
+    names = [f"District {i}" for i in range(districts)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"districts": [')
+        for i, name in enumerate(names):
+            district = {
+                "name": name,
+                "dropping_points": [
+                    {"name": f"{name} Point {j}", "price": random.randint(300, 1500)}
+                    for j in range(per_district)
+                ],
+            }
+            f.write(("," if i else "") + json.dumps(district))
+        f.write('], "bus_providers": [')
+        for i in range(providers):
+            provider = {"name": f"Provider {i}", "coverage_districts": random.sample(names, min(40, districts))}
+            f.write(("," if i else "") + json.dumps(provider))
+        f.write("]}")
+    return per_district * districts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--districts", type=int, default=500)
+    parser.add_argument("--providers", type=int, default=200)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        total = write_catalog(path, args.districts, args.points, args.providers)
+        print(f"catalog: {total} dropping points, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        report = validate_catalog(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"validate:      {time.perf_counter() - start:.2f}s peak={peak / 1e6:.1f}MB errors={len(report['errors'])}")
+
+        start = time.perf_counter()
+        report = ingest_catalog(path, force=True)
+        print(f"ingest:        {time.perf_counter() - start:.2f}s status={report['status']} counts={report['counts']}")
+
+        start = time.perf_counter()
+        report = ingest_catalog(path)
+        print(f"re-ingest:     {time.perf_counter() - start:.2f}s status={report['status']}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
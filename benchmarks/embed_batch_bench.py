@@ -0,0 +1,116 @@
+"""
+Concurrent embedding calls against a local fake embeddings endpoint: one
+request per input vs the micro-batcher. The fake server serves a limited
+number of requests at a time with a fixed per-request cost, like a
+rate-limited upstream; it reports how many requests it saw.
+
+    python -m benchmarks.embed_batch_bench --callers 64 --calls 20 --window-ms 5
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import OpenAI
+
+from app.utils.embed_batcher import EmbeddingBatcher
+
+DIMENSIONS = 8
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 256  # many concurrent clients
+
+
+def fake_embeddings_server(request_cost: float, per_input_cost: float, parallel: int):
+    """Start an OpenAI-compatible /embeddings server; returns (base_url, stats)."""
+    slots = threading.BoundedSemaphore(parallel)
+    stats = {"requests": 0, "inputs": 0}
+    stats_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            with slots:
+                time.sleep(request_cost + per_input_cost * len(inputs))
+            with stats_lock:
+                stats["requests"] += 1
+                stats["inputs"] += len(inputs)
+            payload = json.dumps({
+                "object": "list",
+                "model": body["model"],
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": [float(len(text))] * DIMENSIONS}
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = _Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1", stats
+
+
+def run(label, embed, callers, calls, stats):
+    before = dict(stats)
+    latencies = []
+    lock = threading.Lock()
+
+    def caller(c):
+        for i in range(calls):
+            text = f"caller {c} question {i}"
+            start = time.perf_counter()
+            vector = embed(text)
+            elapsed = time.perf_counter() - start
+            assert vector[0] == float(len(text)), "vector fanned out to the wrong caller"
+            with lock:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(callers) as pool:
+        list(pool.map(caller, range(callers)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    print(
+        f"{label:<10} {len(latencies) / wall:,.0f} embeds/s  upstream requests={stats['requests'] - before['requests']} "
+        f"p50={latencies[len(latencies) // 2] * 1000:.1f}ms p99={latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--callers", type=int, default=64)
+    parser.add_argument("--calls", type=int, default=20, help="embeds per caller")
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--request-ms", type=float, default=30, help="fixed upstream cost per request")
+    parser.add_argument("--upstream-parallel", type=int, default=8)
+    args = parser.parse_args()
+
+    base_url, stats = fake_embeddings_server(args.request_ms / 1000, 0.0002, args.upstream_parallel)
+    client = OpenAI(base_url=base_url, api_key="unused", max_retries=0)
+
+    def direct(text):
+        return client.embeddings.create(model="fake-embed", input=text).data[0].embedding
+
+    batcher = EmbeddingBatcher(
+        client.embeddings.create, "fake-embed", window=args.window_ms / 1000, max_batch=args.max_batch
+    )
+    run("direct", direct, args.callers, args.calls, stats)
+    run("batched", batcher.embed, args.callers, args.calls, stats)
+
+
+if __name__ == "__main__":
+    main()
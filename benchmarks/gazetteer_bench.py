@@ -0,0 +1,90 @@
+"""
+Gazetteer lookups against a synthetic 50k-name catalog: exact hits, alias
+hits and misspellings (one random edit), with accuracy and latency.
+
+    python -m benchmarks.gazetteer_bench --names 50000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+
+from app.services.gazetteer import Gazetteer
+
+ONSETS = ["b", "bh", "ch", "d", "dh", "g", "gh", "h", "j", "k", "kh", "l", "m", "n", "p", "r", "s", "sh", "t", "th"]
+VOWELS = ["a", "i", "u", "e", "o", "ai"]
+CODAS = ["", "", "", "n", "r", "l", "m", "t", "k"]
+SUFFIXES = ["", "", "pur", "gonj", "bad", "hat", "bari", "nagar", "ghat", "para"]
+
+
+def make_catalog(names: int, districts: int = 500):
+    rng = random.Random(7)
+    seen = set()
+    district_names = []
+    catalog = {"version": "bench", "districts": []}
+    per_district = names // districts
+    for i in range(districts):
+        district = {"name": f"District {i}", "dropping_points": []}
+        for _ in range(per_district):
+            while True:
+                stem = "".join(
+                    rng.choice(ONSETS) + rng.choice(VOWELS) + rng.choice(CODAS)
+                    for _ in range(rng.randint(2, 3))
+                )
+                name = (stem + rng.choice(SUFFIXES)).title()
+                if name not in seen:
+                    seen.add(name)
+                    break
+            district["dropping_points"].append({"name": name, "price": rng.randint(300, 1500)})
+        district_names.append(district["name"])
+        catalog["districts"].append(district)
+    return catalog
+
+
+def misspell(rng, name: str) -> str:
+    i = rng.randrange(1, len(name))
+    op = rng.choice(["drop", "swap", "replace"])
+    if op == "drop":
+        return name[:i] + name[i + 1:]
+    if op == "swap" and i < len(name) - 1:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+
+
+def run(label, gazetteer, queries):
+    times, correct = [], 0
+    for text, expected in queries:
+        start = time.perf_counter()
+        found = gazetteer.lookup(text, kind="point", limit=1)
+        times.append(time.perf_counter() - start)
+        correct += bool(found) and found[0]["name"] == expected
+    times.sort()
+    print(
+        f"{label:<12} accuracy={correct / len(queries):.1%} "
+        f"p50={times[len(times) // 2] * 1e6:.0f}us p99={times[int(len(times) * 0.99)] * 1e6:.0f}us "
+        f"mean={statistics.mean(times) * 1e6:.0f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.names)
+    start = time.perf_counter()
+    gazetteer = Gazetteer(catalog)
+    print(f"built index over {len(gazetteer.entries)} names in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(11)
+    points = [p["name"] for d in catalog["districts"] for p in d["dropping_points"]]
+    sample = rng.sample(points, args.queries)
+    run("exact", gazetteer, [(n, n) for n in sample])
+    run("lowercase", gazetteer, [(n.lower(), n) for n in sample])
+    run("misspelled", gazetteer, [(misspell(rng, n), n) for n in sample])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Model routing against local fake OpenAI-compatible endpoints: a slow,
+flaky "strong" model and a fast "cheap" one. Shows how calls get spread
+across them as the deadline shrinks and concurrency grows.
+
+    python -m benchmarks.model_router_bench --calls 400 --concurrency 32 --deadline 1.0
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.model_router import ModelRouter, deadline
+from app.utils import metrics
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 256  # many concurrent clients
+
+
+def fake_endpoint(latency: float, error_rate: float):
+    """Start an OpenAI-compatible /chat/completions server; returns its base_url."""
+    rng = random.Random(latency)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency * rng.uniform(0.5, 1.5))
+            if rng.random() < error_rate:
+                self.send_response(500)
+                self.end_headers()
+                return
+            payload = json.dumps({
+                "id": "fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "ok"},
+                    "finish_reason": "stop",
+                }],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = _Server(("127.0.0.1", 0), Handler)
+    server.handle_error = lambda *args: None  # clients that timed out hung up
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--deadline", type=float, default=1.0, help="seconds per call")
+    parser.add_argument("--strong-latency", type=float, default=0.8)
+    parser.add_argument("--strong-errors", type=float, default=0.1)
+    parser.add_argument("--cheap-latency", type=float, default=0.1)
+    parser.add_argument("--degrade-at", type=int, default=16, help="model calls in flight")
+    args = parser.parse_args()
+
+    router = ModelRouter({
+        "models": {
+            "cheap": {"name": "fake-cheap", "tier": 0, "max_retries": 0,
+                      "base_url": fake_endpoint(args.cheap_latency, 0.0)},
+            "strong": {"name": "fake-strong", "tier": 2, "max_retries": 0,
+                       "base_url": fake_endpoint(args.strong_latency, args.strong_errors)},
+        },
+        "tasks": {"book_ticket": ["strong", "cheap"]},
+        "router": {"degrade_in_flight": args.degrade_at},
+    })
+
+    def call(_):
+        start = time.perf_counter()
+        with deadline(args.deadline):
+            try:
+                router.chat_completion("book_ticket", [{"role": "user", "content": "hi"}])
+                ok = True
+            except Exception:
+                ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(call, range(args.calls)))
+    elapsed = time.perf_counter() - start
+
+    times = sorted(t for t, _ in results)
+    failed = sum(1 for _, ok in results if not ok)
+    print(
+        f"{args.calls} calls in {elapsed:.1f}s  failed={failed} "
+        f"p50={times[len(times) // 2] * 1000:.0f}ms p99={times[int(len(times) * 0.99)] * 1000:.0f}ms "
+        f"over deadline={sum(t > args.deadline for t in times)}"
+    )
+    snap = metrics.snapshot()
+    for row in snap["counters"] + snap["gauges"]:
+        if row["name"].startswith("model_") and row["name"] != "model_in_flight":
+            print(f"  {row['name']} {row['labels']} {row['value']:g}")
+
+
+if __name__ == "__main__":
+    main()
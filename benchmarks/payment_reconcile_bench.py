@@ -0,0 +1,99 @@
+"""
+Payment reconciliation over a bookings collection where most payments
+are already settled: a naive pass (scan every booking, one gateway call
+and one update_one per open payment) vs reconcile_payments() (open
+payments off the (payment_status, booked_at) index, one gateway call and
+one bulk_write per batch). Also prints the documents each plan examines.
+
+Runs against a scratch database, never the live bookings:
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.payment_reconcile_bench --bookings 200000 --open 0.02
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.config import mongo
+from app.services import payments
+from app.services.payment_gateway import FakePaymentGateway
+
+SETTLED = ("paid", "paid", "paid", "failed", "expired", "refunded")
+
+
+def _seed(collection, count, open_ratio, rng):
+    collection.drop()
+    start = datetime(2031, 1, 1)
+    batch = []
+    for i in range(count):
+        status = ("pending" if rng.random() < 0.9 else "refund_pending") if rng.random() < open_ratio else rng.choice(SETTLED)
+        batch.append({
+            "booking_id": f"b{i}", "status": "confirmed", "payment_status": status,
+            "bus_provider": "Hanif", "date": "2031-02-01", "seats": 1, "total_amount": 800,
+            "booked_at": start + timedelta(seconds=i),
+        })
+        if len(batch) >= 10_000:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def _gateway(collection, seed):
+    # Every open payment has settled on the gateway side
+    gateway = FakePaymentGateway(seed=seed)
+    for b in collection.find({"payment_status": {"$in": list(payments.OPEN_STATUSES)}}, {"booking_id": 1, "payment_status": 1}):
+        gateway.set_status(b["booking_id"], "paid" if b["payment_status"] == "pending" else "refunded")
+    return gateway
+
+
+def _naive(collection, gateway):
+    started = time.perf_counter()
+    for b in collection.find({}, {"booking_id": 1, "payment_status": 1, "status": 1}):
+        if b.get("payment_status") not in payments.OPEN_STATUSES:
+            continue
+        status = gateway.fetch_statuses([b["booking_id"]]).get(b["booking_id"])
+        new = payments._next_status(b, status)
+        if new:
+            collection.update_one({"_id": b["_id"]}, {"$set": {"payment_status": new}})
+    return time.perf_counter() - started
+
+
+def _examined(collection):
+    plan = collection.find({"payment_status": {"$in": list(payments.OPEN_STATUSES)}}).explain()
+    stats = plan.get("executionStats", {})
+    return stats.get("totalDocsExamined"), stats.get("totalKeysExamined")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=200_000)
+    parser.add_argument("--open", type=float, default=0.02, help="share of bookings with an open payment")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    db = mongo["BussTicketBD_bench"]
+    collection = db["bookings"]
+    payments.bookings_collection = collection
+    payments.bookings_archive_collection = db["bookings_archive"]
+    payments.bookings_archive_collection.drop()
+    rng = random.Random(7)
+
+    _seed(collection, args.bookings, args.open, rng)
+    gateway = _gateway(collection, 1)
+    print(f"naive  pass: {_naive(collection, gateway):.2f}s, {gateway.calls} gateway calls")
+
+    _seed(collection, args.bookings, args.open, rng)
+    collection.create_index([("payment_status", 1), ("booked_at", 1)])
+    print(f"open-payment query examines (docs, keys): {_examined(collection)} of {args.bookings} bookings")
+    gateway = _gateway(collection, 1)
+    totals = payments.reconcile_payments(gateway, args.batch)
+    print(f"batched pass: {totals['elapsed_ms'] / 1000:.2f}s, {gateway.calls} gateway calls, {totals}")
+    again = payments.reconcile_payments(gateway, args.batch)
+    print(f"second pass (nothing open): {again['elapsed_ms']} ms, checked {again['checked']}")
+
+    mongo.drop_database("BussTicketBD_bench")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Concurrency check for the per-thread serializer: many chat threads, each
+sent a burst of turns (some double-sent) to two simulated workers that
+share one lease store. Checks that no two turns of a thread ever overlap,
+that every thread's turns still run in parallel with other threads, and
+how many duplicates were answered without running again.
+
+The workers use the real ThreadLease over an in-memory stand-in for the
+thread_leases collection that behaves like MongoDB where the lease relies
+on it: a conditional upsert that finds no match inserts, and inserting an
+existing _id raises DuplicateKeyError. Before the run, the lease itself
+is checked step by step (held, expired, released, renewed).
+
+    python -m benchmarks.thread_serializer_bench --threads 50 --turns 8 --turn-ms 20 --dup-rate 0.2
+    python -m benchmarks.thread_serializer_bench --turn-ms 200 --lease-ttl 0.05   # renewal
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from pymongo.errors import DuplicateKeyError
+
+from app.utils.thread_serializer import ThreadLease, ThreadSerializer
+
+
+def _matches(doc, query):
+    for field, cond in query.items():
+        if field == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict) and "$lt" in cond:
+            if doc.get(field) is None or not doc[field] < cond["$lt"]:
+                return False
+        elif doc.get(field) != cond:
+            return False
+    return True
+
+
+class FakeLeaseCollection:
+    """The slice of a pymongo collection ThreadLease uses, with a unique _id."""
+
+    def __init__(self):
+        self.docs = {}
+        self.lock = threading.Lock()
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def find_one(self, query):
+        with self.lock:
+            doc = self.docs.get(query["_id"])
+            return dict(doc) if doc and _matches(doc, query) else None
+
+    def update_one(self, query, update, upsert=False):
+        with self.lock:
+            doc = self.docs.get(query["_id"])
+            if doc is None or not _matches(doc, query):
+                if not upsert:
+                    return SimpleNamespace(matched_count=0, modified_count=0)
+                if doc is not None:
+                    raise DuplicateKeyError("E11000 duplicate key error: _id")
+                doc = self.docs[query["_id"]] = {"_id": query["_id"]}
+            doc.update(update.get("$set", {}))
+            for field in update.get("$unset", {}):
+                doc.pop(field, None)
+            return SimpleNamespace(matched_count=1, modified_count=1)
+
+
+def check_lease():
+    lease = ThreadLease(FakeLeaseCollection(), ttl=30)
+    assert lease.try_acquire("t", "a", "k1"), "free lease not taken"
+    assert not lease.try_acquire("t", "b", "k2"), "held lease taken (DuplicateKeyError path)"
+    assert lease.peek("t")["owner"] == "a"
+
+    before = lease.peek("t")["expires_at"]
+    time.sleep(0.01)
+    assert lease.renew("t", "a") and lease.peek("t")["expires_at"] > before, "renew didn't extend"
+    assert not lease.renew("t", "b"), "renewed someone else's lease"
+
+    lease.release("t", "b", {"response": "nope"})
+    assert lease.peek("t")["owner"] == "a", "released by a non-owner"
+    lease.release("t", "a", {"response": "ok"})
+    held = lease.peek("t")
+    assert held["owner"] is None and held["result"] == {"response": "ok"}
+    assert lease.try_acquire("t", "b", "k2") and "result" not in lease.peek("t"), "stale result kept"
+
+    # A crashed worker's lease expires and can be taken over
+    lease.collection.docs["t"]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    assert lease.try_acquire("t", "c", "k3") and lease.peek("t")["owner"] == "c", "expired lease not taken"
+    print("lease checks: ok")
+
+
+async def main_async(args):
+    check_lease()
+    lease = ThreadLease(FakeLeaseCollection(), ttl=args.lease_ttl)
+    workers = [
+        ThreadSerializer(lease, dedup=not args.no_dedup, poll_min=0.002, poll_max=0.02)
+        for _ in range(args.workers)
+    ]
+    running = {}
+    overlaps = 0
+    executed = 0
+
+    async def turn(thread_id, seq, message):
+        nonlocal overlaps, executed
+        if running.get(thread_id):
+            overlaps += 1
+        running[thread_id] = True
+        executed += 1
+        await asyncio.sleep(args.turn_ms / 1000)
+        running[thread_id] = False
+        return {"thread_id": thread_id, "response": f"reply to {message}"}
+
+    async def send(worker, thread_id, seq, message, delay):
+        await asyncio.sleep(delay)
+        return await worker.run(thread_id, message, turn, thread_id, seq, message)
+
+    rng = random.Random(7)
+    sends = []
+    for t in range(args.threads):
+        thread_id = f"thread-{t}"
+        for seq in range(args.turns):
+            message = f"message {seq}"
+            # Turns of a thread arrive in order, a little apart
+            delay = seq * args.turn_ms / 4000
+            worker = rng.choice(workers)
+            sends.append(send(worker, thread_id, seq, message, delay))
+            if rng.random() < args.dup_rate:
+                # Double send / retry, possibly landing on the other worker
+                sends.append(send(rng.choice(workers), thread_id, seq, message, delay + 0.001))
+
+    started = time.perf_counter()
+    replies = await asyncio.gather(*sends)
+    elapsed = time.perf_counter() - started
+
+    serial = args.threads * args.turns * args.turn_ms / 1000
+    per_thread = args.turns * args.turn_ms / 1000
+    print(f"sends: {len(sends)}  turns executed: {executed}  deduplicated: {len(sends) - executed}")
+    print(f"overlapping turns within a thread: {overlaps}")
+    print(f"wall time: {elapsed:.2f}s  (one thread's turns back to back: {per_thread:.2f}s, "
+          f"everything serial: {serial:.2f}s)")
+    print(f"replies: {len(replies)}  active slots left: {sum(w.active_threads() for w in workers)}")
+    if overlaps:
+        raise SystemExit("FAILED: turns of one thread overlapped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--turn-ms", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--dup-rate", type=float, default=0.2)
+    parser.add_argument("--no-dedup", action="store_true")
+    parser.add_argument("--lease-ttl", type=float, default=30,
+                        help="set below --turn-ms to check that running turns renew their lease")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Operator cancel / reschedule of one trip with tens of thousands of
+bookings: a per-booking loop (update_one + notice insert each, what
+cancelling one by one costs) vs the chunked bulk path in
+app/services/trip_operations.py.
+
+Runs against a scratch database, never the live bookings; the service
+modules' collections are pointed at it for the run:
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.trip_operations_bench --bookings 20000 --chunk 1000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.config import mongo
+from app.services import booking_rollups, schedules, thread_notices, trip_operations
+
+PROVIDER, FROM, TO = "Hanif", "Dhaka", "Sylhet"
+
+
+def _seed(db, count, date, rng):
+    db["bookings"].drop()
+    db["thread_notices"].drop()
+    db["schedules"].drop()
+    db["booking_rollups"].drop()
+    db["bookings"].create_index([("bus_provider", 1), ("date", 1), ("booked_at", 1)])
+    thread_notices.ensure_notice_indexes()
+
+    # Enough 40-seat coaches for everyone, every 15 minutes
+    coaches = count // 10 + 1
+    start = datetime(2000, 1, 1, 6, 0)
+    db["schedules"].insert_many([
+        {"provider": PROVIDER, "from_district": FROM, "to_district": TO, "date": date,
+         "departure": (start + timedelta(minutes=15 * (i % 64))).strftime("%H:%M"),
+         "coach_type": f"coach-{i}", "capacity": 40, "seats_booked": 0}
+        for i in range(coaches)
+    ])
+    schedule_ids = [s["_id"] for s in db["schedules"].find({}, {"_id": 1})]
+
+    batch = []
+    for i in range(count):
+        seats = rng.randint(1, 4)
+        batch.append({
+            "booking_id": f"b{i}", "thread_id": f"t{i}", "bus_provider": PROVIDER,
+            "district_from": FROM, "district_to": TO, "date": date, "seats": seats,
+            "fare": 800, "total_amount": 800 * seats, "status": "confirmed",
+            "schedule_id": schedule_ids[i % len(schedule_ids)], "booked_at": datetime.utcnow(),
+        })
+        if len(batch) >= 10_000:
+            db["bookings"].insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        db["bookings"].insert_many(batch, ordered=False)
+
+
+def _one_by_one(db, date):
+    started = time.perf_counter()
+    for b in db["bookings"].find({"bus_provider": PROVIDER, "date": date, "status": "confirmed"},
+                                 {"_id": 1, "thread_id": 1, "seats": 1, "schedule_id": 1}):
+        db["bookings"].update_one({"_id": b["_id"]}, {"$set": {"status": "cancelled"}})
+        db["schedules"].update_one({"_id": b["schedule_id"]}, {"$inc": {"seats_booked": -b["seats"]}})
+        db["thread_notices"].insert_one({"thread_id": b["thread_id"], "text": "cancelled", "delivered_at": None})
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=20_000)
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    db = mongo["BussTicketBD_bench"]
+    trip_operations.bookings_collection = db["bookings"]
+    thread_notices.thread_notices_collection = db["thread_notices"]
+    schedules.schedules_collection = db["schedules"]
+    booking_rollups.booking_rollups_collection = db["booking_rollups"]
+    rng = random.Random(42)
+    date, new_date = "2031-01-10", "2031-01-11"
+
+    if not args.skip_baseline:
+        _seed(db, args.bookings, date, rng)
+        print(f"one by one   cancel {args.bookings} bookings: {_one_by_one(db, date):.2f}s")
+
+    _seed(db, args.bookings, date, rng)
+    result = trip_operations.cancel_trip(PROVIDER, FROM, TO, date, "bench", chunk_size=args.chunk)
+    print(f"bulk         cancel {result['modified']} bookings: {result['elapsed_ms'] / 1000:.2f}s "
+          f"({result['notices']} notices)")
+
+    _seed(db, args.bookings, date, rng)
+    result = trip_operations.reschedule_trip(PROVIDER, FROM, TO, date, new_date, "bench", chunk_size=args.chunk)
+    print(f"bulk     reschedule {result['modified']} bookings: {result['elapsed_ms'] / 1000:.2f}s "
+          f"({result['notices']} notices)")
+
+    mongo.drop_database("BussTicketBD_bench")
+
+
+if __name__ == "__main__":
+    main()
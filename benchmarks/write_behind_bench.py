@@ -0,0 +1,100 @@
+"""
+Per-turn write latency: synchronous update_one calls vs the write-behind queue.
+
+Each simulated turn does what a booking turn does on the latency path: a
+`$set` of booking_data from the node, then the `$push` of the chat message.
+With --poison, one extra thread has a non-array `chat`, so every push to it
+is rejected; the other threads' transcripts must still come out complete.
+
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.write_behind_bench --turns 2000 --poison
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from app.config import db
+from app.utils.write_behind import WriteBehindQueue
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _report(label, samples):
+    print(
+        f"{label:<13} p50={_percentile(samples, 50) * 1000:.3f}ms "
+        f"p99={_percentile(samples, 99) * 1000:.3f}ms "
+        f"mean={statistics.mean(samples) * 1000:.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--max-pending", type=int, default=500)
+    parser.add_argument("--poison", action="store_true", help="add a thread whose writes always fail")
+    args = parser.parse_args()
+
+    collection = db["bench_chat_memory"]
+    collection.drop()
+    collection.create_index("thread_id")
+    thread_ids = [str(uuid.uuid4()) for _ in range(args.threads)]
+    collection.insert_many([{"thread_id": t, "chat": []} for t in thread_ids])
+    dead_letters = db["bench_chat_dead_letters"]
+    dead_letters.drop()
+    poisoned = str(uuid.uuid4())
+    if args.poison:
+        collection.insert_one({"thread_id": poisoned, "chat": "not an array"})
+
+    def turn_updates(i):
+        return (
+            {"$set": {"booking_data": {"seats": i}}},
+            {"$push": {"chat": {"user": f"msg {i}", "bot": "ok"}}},
+        )
+
+    sync_samples = []
+    for i in range(args.turns):
+        tid = thread_ids[i % args.threads]
+        start = time.perf_counter()
+        for update in turn_updates(i):
+            collection.update_one({"thread_id": tid}, update)
+        sync_samples.append(time.perf_counter() - start)
+
+    queue = WriteBehindQueue(collection, max_pending=args.max_pending, dead_letters=dead_letters)
+    queue.start()
+    queued_samples = []
+    for i in range(args.turns):
+        tid = thread_ids[i % args.threads]
+        start = time.perf_counter()
+        for update in turn_updates(i):
+            queue.update(tid, update)
+        queued_samples.append(time.perf_counter() - start)
+        if args.poison and i % args.threads == 0:
+            queue.update(poisoned, turn_updates(i)[1])
+    if args.poison:
+        # give the worker enough flushes to dead-letter the rejected pushes
+        time.sleep(queue.interval * (queue.max_attempts + 2))
+    flush_start = time.perf_counter()
+    queue.stop()
+    drain = time.perf_counter() - flush_start
+
+    _report("synchronous", sync_samples)
+    _report("write-behind", queued_samples)
+    print(f"final drain on shutdown: {drain * 1000:.1f}ms")
+
+    expected = 2 * args.turns // args.threads
+    lengths = {
+        len(d["chat"]) for d in collection.find({"thread_id": {"$in": thread_ids}}, {"chat": 1})
+    }
+    print(f"chat lengths per thread: {sorted(lengths)} (expected {expected})")
+    if args.poison:
+        print(f"dead-lettered updates: {dead_letters.count_documents({})}")
+    collection.drop()
+    dead_letters.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,101 @@
 import streamlit as st
 import requests
 
-API_URL = "http://localhost:8000/chat"  # your FastAPI endpoint
+API_BASE = "http://localhost:8000"  # your FastAPI server
+API_URL = f"{API_BASE}/chat"  # your FastAPI endpoint
+PAGE_SIZE = 100  # turns per history request
 st.set_page_config(page_title="Chat", page_icon="💬")
 
+
+@st.cache_resource
+def get_session():
+    # One keep-alive connection pool for every rerun instead of a new
+    # connection per message
+    return requests.Session()
+
+
+session = get_session()
+
 # ======================================
 # Session State
 # ======================================
 if "thread_id" not in st.session_state:
-    st.session_state.thread_id = None
+    # Survive page reloads: the thread id lives in the URL
+    st.session_state.thread_id = st.query_params.get("thread_id")
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+if "last_seq" not in st.session_state:
+    st.session_state.last_seq = 0  # seq of the newest stored turn we have
+    st.session_state.etag = None  # (after, ETag) of the last page we fetched
+
 USER_ID = "himel"  # static for demo; replace with login if needed
 
+
+def sync_messages():
+    """
+    Fetch turns stored after the newest one we already have and append them
+    to the session. Returns the new messages (user and assistant entries).
+    """
+    new_messages = []
+    thread_id = st.session_state.thread_id
+    if not thread_id:
+        return new_messages
+
+    while True:
+        # The ETag belongs to one `after`; only revalidate when asking for the same page again
+        cached = st.session_state.etag
+        headers = {"If-None-Match": cached[1]} if cached and cached[0] == st.session_state.last_seq else {}
+        res = session.get(
+            f"{API_BASE}/threads/{thread_id}/messages",
+            params={"after": st.session_state.last_seq, "limit": PAGE_SIZE},
+            headers=headers,
+            timeout=10,
+        )
+        if res.status_code == 304:
+            break
+        if res.status_code == 404:
+            # Thread is gone; start a new one on the next message
+            st.session_state.thread_id = None
+            st.query_params.clear()
+            break
+        res.raise_for_status()
+        data = res.json()
+        if res.headers.get("ETag"):
+            st.session_state.etag = (st.session_state.last_seq, res.headers["ETag"])
+
+        for turn in data["messages"]:
+            new_messages.append({"role": "user", "text": turn["user"]})
+            new_messages.append({"role": "assistant", "text": turn["bot"]})
+        st.session_state.last_seq = data["next_after"]
+        if not data["has_more"]:
+            break
+
+    st.session_state.messages.extend(new_messages)
+    return new_messages
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def suggestions(kind, district=None, q=""):
+    """Catalog names for the sidebar pickers (GET /autocomplete)."""
+    # Failures raise, so they aren't cached
+    res = session.get(
+        f"{API_BASE}/autocomplete",
+        params={"kind": kind, "district": district, "q": q, "limit": 100},
+        timeout=5,
+    )
+    res.raise_for_status()
+    return [s["name"] for s in res.json()["suggestions"]]
+
+
+# Hydrate a reloaded page from the server
+if st.session_state.thread_id and not st.session_state.messages:
+    try:
+        sync_messages()
+    except Exception as e:
+        st.warning(f"Couldn't load earlier messages: {e}")
+
 # ======================================
 # Chat History UI
 # ======================================
@@ -24,14 +105,43 @@ for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.write(msg["text"])
 
+# ======================================
+# Route picker (exact catalog names, no back-and-forth over spellings)
+# ======================================
+picked_message = None
+with st.sidebar:
+    st.header("Pick a route")
+    try:
+        districts = suggestions("district")
+    except requests.RequestException:
+        districts = []
+    if districts:
+        from_district = st.selectbox("From district", districts, index=None)
+        to_district = st.selectbox("To district", districts, index=None)
+        try:
+            pickup = st.selectbox("Pickup point", suggestions("point", from_district), index=None) if from_district else None
+            dropping = st.selectbox("Dropping point", suggestions("point", to_district), index=None) if to_district else None
+        except requests.RequestException:
+            pickup = dropping = None
+
+        if from_district and to_district:
+            if st.button("Show buses on this route"):
+                picked_message = f"Which buses go from {from_district} to {to_district}?"
+            if pickup and dropping and st.button("Book this trip"):
+                picked_message = (
+                    f"I want to book a ticket from {pickup} ({from_district}) "
+                    f"to {dropping} ({to_district})."
+                )
+    else:
+        st.caption("Route list unavailable right now; just type your request.")
+
 # ======================================
 # User Input
 # ======================================
-user_input = st.chat_input("Type your message")
+user_input = st.chat_input("Type your message") or picked_message
 
 if user_input:
     # Show user message
-    st.session_state.messages.append({"role": "user", "text": user_input})
     with st.chat_message("user"):
         st.write(user_input)
 
@@ -42,19 +152,44 @@ if user_input:
         "thread_id": st.session_state.thread_id
     }
 
+    synced = []
     try:
-        res = requests.post(API_URL, json=payload, timeout=30)
-        res.raise_for_status()
-        data = res.json()
+        res = session.post(API_URL, json=payload, timeout=30)
+        if res.status_code == 429:
+            # Backend is shedding load; don't hammer it with retries
+            retry_after = res.headers.get("Retry-After", "a few")
+            assistant_reply = f"The assistant is busy right now. Please try again in {retry_after} seconds."
+        else:
+            res.raise_for_status()
+            data = res.json()
+
+            # Extract thread_id and response
+            if data.get("thread_id") != st.session_state.thread_id:
+                st.session_state.thread_id = data.get("thread_id")
+                st.session_state.last_seq = 0
+                st.session_state.etag = None
+                st.query_params["thread_id"] = st.session_state.thread_id
+            assistant_reply = data.get("response", "")
 
-        # Extract thread_id and response
-        st.session_state.thread_id = data.get("thread_id")
-        assistant_reply = data.get("response", "")
+            # Pull the stored turn (and anything another tab added) as a delta
+            try:
+                synced = sync_messages()
+            except requests.RequestException:
+                synced = []
 
     except Exception as e:
         assistant_reply = f"Error contacting backend: {e}"
 
-    # Show reply
-    st.session_state.messages.append({"role": "assistant", "text": assistant_reply})
-    with st.chat_message("assistant"):
-        st.write(assistant_reply)
+    if synced:
+        # The user message for this turn is already on screen
+        for msg in synced[:-2]:
+            with st.chat_message(msg["role"]):
+                st.write(msg["text"])
+        with st.chat_message("assistant"):
+            st.write(synced[-1]["text"])
+    else:
+        # Not stored on the server (busy/error); keep it for this session only
+        st.session_state.messages.append({"role": "user", "text": user_input})
+        st.session_state.messages.append({"role": "assistant", "text": assistant_reply})
+        with st.chat_message("assistant"):
+            st.write(assistant_reply)